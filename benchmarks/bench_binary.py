@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare parsing binary telemetry frames (a header of `struct` fields and a
+length-prefixed payload) with `struct_fmt` and `length_prefixed` against
+`count` of single bytes and `bind`, the only way before them.
+
+Run with `PYTHONPATH=src python benchmarks/bench_binary.py [frames]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import struct
+import sys
+import time
+
+from parsec import *
+
+# sensor id, sequence number, timestamp, then a payload of readings.
+header = '<HIQ'
+
+fields = struct_fmt(header) + length_prefixed(u16le)
+
+
+def _int(data):
+    return int.from_bytes(bytes(data), 'little')
+
+
+def _payload(n):
+    return count(any(), n).parsecmap(bytes)
+
+
+by_bytes = (count(any(), 2).parsecmap(_int) + count(any(), 4).parsecmap(_int) + count(any(), 8).parsecmap(_int)
+            + count(any(), 2).parsecmap(_int).bind(_payload))
+
+
+def bench(name, parser, data):
+    start = time.perf_counter()
+    frames = parser.parse(data)
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.3f} s {:8} frames'.format(name, seconds, len(frames)))
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+    data = b''.join(struct.pack(header, random.randrange(100), i, 1700000000000 + i)
+                    + struct.pack('<H', n) + bytes(random.randrange(256) for _ in range(n))
+                    for i, n in enumerate(random.randrange(16, 256) for _ in range(number)))
+    print('{} frames, {} bytes'.format(number, len(data)))
+    bench('count(any(), n) and bind', many(by_bytes), data)
+    bench('struct_fmt and length_prefixed', many(fields), data)
+    bench('..., on a memoryview', many(fields), memoryview(data))
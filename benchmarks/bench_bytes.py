@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Measure scanning buffers of bytes (`bytes`, a `memoryview` of them and, when
+NumPy is installed, an array of `uint8`) with `take_while`, `skip_while` and
+`take_until`, against `many` taking a byte at a time.
+
+Run with `PYTHONPATH=src python benchmarks/bench_bytes.py [lines]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import sys
+import time
+
+from parsec import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+hexdigits = b'0123456789abcdef'
+
+
+def records(field):
+    return many(sepBy(field, string(b',')) << skip_while(b' \t') << string(b'\n'))
+
+
+def bench(name, parser, text):
+    start = time.perf_counter()
+    parser.parse(text)
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.3f} s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(0)
+    text = b''.join(b','.join(bytes(random.choice(hexdigits) for _ in range(random.randrange(8, 64)))
+                              for _ in range(20)) + b' ' * random.randrange(100) + b'\n'
+                    for _ in range(count))
+    print('{} lines, {} bytes'.format(count, len(text)))
+    bench('many(one_of(...))', records(many(one_of(hexdigits))), text)
+    bench('take_while(predicate)', records(take_while(lambda c: c in hexdigits)), text)
+    bench('take_while(bytes)', records(take_while(hexdigits)), text)
+    bench('take_while(bytes), memoryview', records(take_while(hexdigits)), memoryview(text))
+    if numpy is not None:
+        array = numpy.frombuffer(text, dtype=numpy.uint8)
+        bench('take_while(bytes), numpy.uint8', records(take_while(hexdigits)), array)
+    bench('take_until(last line)', take_until(text[-100:]), text)
+    blank = b' \t' * (len(text) // 2) + b'x'
+    bench('skip_while(bytes), one run', skip_while(b' \t') << string(b'x'), blank)
+    bench('many(one_of(...)), one run', many(one_of(b' \t')) << string(b'x'), blank)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare the cold and warm start of a process using a large cached grammar.
+
+Run with `PYTHONPATH=src python benchmarks/bench_cache.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from functools import reduce
+
+from parsec import *
+from parsec.cache import cached
+
+
+def build():
+    '''A grammar of some thousands of combinators: a command language with
+    2000 keywords taking typed arguments.'''
+    spaces = regex(r'\s*')
+    lexeme = lambda p: p << spaces
+    integer = lexeme(regex(r'-?[0-9]+'))
+    word = lexeme(regex(r'[a-z_][a-z0-9_]*'))
+    quoted = lexeme(regex(r'"[^"]*"'))
+    argument = integer | quoted | word
+    commands = []
+    for i in range(2000):
+        keyword = lexeme(string('cmd{}'.format(i)) + regex(r'(?![a-z0-9_])'))
+        commands.append(keyword + times(argument, 0, i % 4 + 1) + lexeme(string(';')))
+    return spaces >> many(reduce(try_choice, commands))
+
+
+def start(directory, compile):
+    '''What a process using the grammar does at startup.'''
+    begin = time.perf_counter()
+    grammar = cached(build, directory, compile=compile)
+    grammar.parse('cmd12 1 "a"; cmd1999 x y z 2;')
+    return time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        print(start(sys.argv[1], sys.argv[2] == 'compile'))
+        sys.exit(0)
+    for mode in ('optimize', 'compile'):
+        directory = tempfile.mkdtemp()
+        try:
+            for run in ('cold', 'warm', 'warm'):
+                output = subprocess.check_output([sys.executable, __file__, directory, mode], env=os.environ)
+                print('{:<10} {:<5} {:8.1f} ms'.format(mode, run, float(output) * 1000))
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare interpreted, optimized and compiled grammars on JSON text.
+
+Run with `PYTHONPATH=src:examples python benchmarks/bench_codegen.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import re
+import timeit
+
+from parsec import *
+from jsonc import jsonc
+
+whitespace = regex(r'\s*', re.MULTILINE)
+lexeme = lambda p: p << whitespace
+
+# The same grammar as examples/jsonc.py without `generate`: the recursion goes
+# through `value`, which is bound to the grammar being measured.
+grammar = [None]
+value = Parser(lambda text, index: grammar[0](text, index))
+
+quoted = lexeme(string('"') >> regex(r'(?:[^"\\]|\\.)*') << string('"'))
+number = lexeme(regex(r'-?(0|[1-9][0-9]*)([.][0-9]+)?([eE][+-]?[0-9]+)?')).parsecmap(float)
+array = lexeme(string('[')) >> sepBy(value, lexeme(string(','))) << lexeme(string(']'))
+pair = quoted + (lexeme(string(':')) >> value)
+json_object = (lexeme(string('{')) >> sepBy(pair, lexeme(string(','))) << lexeme(string('}'))).parsecmap(dict)
+combinators = (quoted | number | json_object | array
+               | lexeme(string('true')).result(True)
+               | lexeme(string('false')).result(False)
+               | lexeme(string('null')).result(None))
+
+text = '{"items": [%s]}' % ', '.join(
+    ['{"id": %d, "name": "item %d", "tags": ["a", "b"], "price": %d.5, "stock": null, "ok": true}' % (i, i, i)
+     for i in range(500)])
+
+
+def bench(name, parser, number=5):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=3)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    print('{} characters of JSON'.format(len(text)))
+    bench('examples/jsonc.py', jsonc)
+    bench('examples/jsonc.py, optimized', jsonc.optimize())
+    bench('examples/jsonc.py, compiled', jsonc.compile())
+    for name, parser in [('combinators', combinators), ('combinators, optimized', combinators.optimize()),
+                         ('combinators, compiled', combinators.compile())]:
+        grammar[0] = parser
+        bench(name, whitespace >> value)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Measure building grammars whose rules call the same factories (`spaces()`,
+`string('(')`, `regex(...)`) over and over, and the number of distinct
+parsers they end up made of.
+
+Run with `PYTHONPATH=src python benchmarks/bench_construction.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import timeit
+from functools import reduce
+
+from parsec import *
+from parsec.contrib.json import value
+
+
+def lexeme(p):
+    return p << spaces()
+
+
+def statement(i):
+    name = lexeme(regex(r'[A-Za-z_][A-Za-z0-9_]*'))
+    call = name + between(lexeme(string('(')), lexeme(string(')')), sepBy(name, lexeme(string(','))))
+    return lexeme(string('let{}'.format(i % 10))) >> name + (lexeme(string('=')) >> call) << lexeme(string(';'))
+
+
+def program():
+    return many(choice_of(*[statement(i) for i in range(50)])) << eof()
+
+
+def choice_of(*parsers):
+    return reduce(lambda p, q: p ^ q, parsers)
+
+
+def bench(name, build, number=20):
+    seconds = min(timeit.repeat(build, number=number, repeat=5)) / number
+    nodes = len({id(p) for p in walk(build())})
+    print('{:<40} {:8.2f} ms {:8} parsers'.format(name, seconds * 1000, nodes))
+
+
+if __name__ == '__main__':
+    bench('50 statements', program)
+    bench('50 statements, optimized', lambda: program().optimize())
+    bench('parsec.contrib.json.value()', value)
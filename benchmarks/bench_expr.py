@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare one parser per precedence level (`chainl1` of the next level) with
+`build_expression_parser`, on a table of 10 levels of binary operators.
+
+Run with `PYTHONPATH=src python benchmarks/bench_expr.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import operator
+import random
+import timeit
+
+from parsec import *
+
+symbols = ['or', 'and', '|', '^', '&', '==', '<<', '+', '*', '%']
+
+
+def token(s):
+    return string(s) << spaces()
+
+
+number = regex(r'[0-9]+').parsecmap(int) << spaces()
+
+# one parser per level, from the loosest to the tightest.
+by_levels = forward_declare()
+level = number | (token('(') >> by_levels << token(')'))
+for s in reversed(symbols):
+    level = chainl1(level, token(s).result(operator.add))
+by_levels.define(level)
+
+climbing = forward_declare()
+climbing.define(build_expression_parser([[Infix(token(s).result(operator.add))] for s in reversed(symbols)],
+                                        number | (token('(') >> climbing << token(')'))))
+
+
+def expression(depth):
+    if depth == 0 or random.random() < 0.3:
+        return str(random.randint(0, 99))
+    return '{} {} {}'.format(expression(depth - 1), random.choice(symbols), expression(depth - 1)) \
+        if random.random() < 0.8 else '({})'.format(expression(depth - 1))
+
+
+def bench(name, parser, text, number=5):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=5)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    text = ' + '.join(expression(6) for _ in range(200))
+    assert by_levels.parse(text) == climbing.parse(text)
+    print('{} characters of expressions'.format(len(text)))
+    bench('chainl1 per level', by_levels, text)
+    bench('build_expression_parser', climbing, text)
+    bench('chainl1 per level, optimized', by_levels.optimize(), text)
+    bench('build_expression_parser, optimized', climbing.optimize(), text)
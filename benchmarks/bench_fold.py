@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare reducing the list of `many`/`sepBy` with folding the values as they
+are parsed (`many_fold`, `chainl1`).
+
+Run with `PYTHONPATH=src python benchmarks/bench_fold.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import timeit
+from functools import reduce
+from operator import add, sub
+
+from parsec import *
+
+number = regex(r'[0-9]+').parsecmap(int) << spaces()
+numbers = '12 ' * 50000
+sign = (string('+').result(add) | string('-').result(sub)) << spaces()
+terms = ' + '.join(['12 - 3'] * 25000)
+
+
+def apply_op(x, operation):
+    op, y = operation
+    return op(x, y)
+
+
+def bench(name, parser, text, number=5):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=5)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    summed = many(number).parsecmap(lambda values: reduce(add, values, 0))
+    folded = many_fold(number, 0, add)
+    assert summed.parse(numbers) == folded.parse(numbers)
+    bench('many, then reduce', summed, numbers)
+    bench('many_fold', folded, numbers)
+    bench('many, then reduce, compiled', summed.compile(), numbers)
+    bench('many_fold, compiled', folded.compile(), numbers)
+
+    reduced = (number + many(sign + number)).parsecmap(lambda t: reduce(apply_op, t[1], t[0]))
+    chained = chainl1(number, sign)
+    assert reduced.parse(terms) == chained.parse(terms)
+    bench('number + many(sign + number), reduce', reduced, terms)
+    bench('chainl1(number, sign)', chained, terms)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare recursion through the Y combinator with forward declared parsers, on
+nested S-expressions.
+
+Run with `PYTHONPATH=src python benchmarks/bench_forward.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import timeit
+
+from parsec import *
+
+atom = regex(r'[a-z0-9]+') << spaces()
+open_paren = string('(') << spaces()
+close_paren = string(')') << spaces()
+
+
+def y_combinator(fn):
+    '''`fix` as it used to be: `fn` is called again on every recursive call.'''
+    return (lambda x: x(x))(lambda y: fn(lambda *args: y(y)(*args)))
+
+
+def sexpr_of(recur):
+    return atom | (open_paren >> many(Parser(recur)) << close_paren)
+
+
+fixed = Parser(y_combinator(sexpr_of))
+
+sexpr = forward_declare()
+sexpr.define(atom | (open_paren >> many(sexpr) << close_paren))
+
+
+def corpus(depth, width):
+    if depth == 0 or random.random() < 0.3:
+        return random.choice(['x', 'foo', '42', 'lambda'])
+    return '(' + ' '.join(corpus(depth - 1, width) for _ in range(random.randint(1, width))) + ')'
+
+
+def bench(name, parser, text, number=10):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=7)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    text = '(' + ' '.join(corpus(8, 4) for _ in range(40)) + ')'
+    assert fixed.parse(text) == sexpr.parse(text)
+    print('{} characters of S-expressions'.format(len(text)))
+    bench('Y combinator', fixed, text)
+    bench('forward_declare', sexpr, text)
+    bench('forward_declare, optimized', sexpr.optimize(), text)
+    bench('forward_declare, compiled', sexpr.compile(), text)
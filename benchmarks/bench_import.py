@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Measure `import parsec` in a fresh interpreter by `-X importtime` (Python
+3.7 and later): the time of parsec itself and the cumulative one, with the
+modules it imports, against that of `re` alone.
+
+Run with `PYTHONPATH=src python benchmarks/bench_import.py [runs]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import os
+import subprocess
+import sys
+
+
+def import_time(module):
+    '''The self and cumulative time of importing `module`, in µs.'''
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # time the import, not the compilation.
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], env=env,
+                         check=True, stderr=subprocess.PIPE, universal_newlines=True)
+    # lines of `-X importtime` are "import time: self [us] | cumulative | name".
+    for line in res.stderr.splitlines():
+        fields = line.split('|')
+        if fields[-1].strip() == module:
+            return int(fields[0].split(':')[1]), int(fields[1])
+    raise ValueError('no import time of {}'.format(module))
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for module in ('re', 'parsec'):
+        import_time(module)  # compiled once.
+        own, cumulative = [min(times) for times in zip(*[import_time(module) for _ in range(runs)])]
+        print('{:<40} {:8.2f} ms'.format('import {}'.format(module), cumulative / 1e3))
+        print('{:<40} {:8.2f} ms'.format('import {}, itself'.format(module), own / 1e3))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare `parsec.contrib.json` with `json.loads` and examples/jsonc.py.
+
+The target of `parsec.contrib.json.loads` is to stay within 25x of the time
+of the C accelerated `json.loads`, and within 2x of the pure Python decoder
+of the standard library (about 19x and 1.4x on CPython 3.11).
+
+Run with `PYTHONPATH=src:examples python benchmarks/bench_json.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import json
+import json.decoder
+import json.scanner
+import timeit
+from collections import OrderedDict
+from decimal import Decimal
+
+from parsec.contrib.json import loads, document
+from jsonc import jsonc
+
+
+def item(i):
+    return {'id': i, 'name': 'item {}'.format(i), 'tags': ['a', 'b\n', 'é'], 'price': i + 0.5,
+            'stock': None, 'ok': i % 2 == 0, 'nested': {'depth': [1, [2, [3]]]}}
+
+
+def bench(name, fn, text, baseline=None, number=5):
+    seconds = min(timeit.repeat(lambda: fn(text), number=number, repeat=5)) / number
+    ratio = '' if baseline is None else '{:8.1f}x'.format(seconds / baseline)
+    print('{:<40} {:8.2f} ms {:8.2f} MB/s {}'.format(name, seconds * 1000, len(text) / seconds / 1e6, ratio))
+    return seconds
+
+
+if __name__ == '__main__':
+    text = json.dumps({'items': [item(i) for i in range(2000)]}, indent=2)
+    document()  # built and compiled once
+    assert loads(text) == json.loads(text)
+
+    python_decoder = json.JSONDecoder()
+    python_decoder.scan_once = json.scanner.py_make_scanner(python_decoder)
+    python_decoder.parse_string = json.decoder.py_scanstring
+
+    print('{} characters of JSON'.format(len(text)))
+    baseline = bench('json.loads', json.loads, text)
+    bench('json, pure Python decoder', python_decoder.decode, text, baseline)
+    bench('parsec.contrib.json.loads', loads, text, baseline)
+    hooks = dict(object_pairs_hook=OrderedDict, parse_float=Decimal)
+    baseline = bench('json.loads, hooks', lambda t: json.loads(t, **hooks), text)
+    bench('parsec.contrib.json.loads, hooks', lambda t: loads(t, **hooks), text, baseline)
+    bench('examples/jsonc.py', jsonc.parse, text)
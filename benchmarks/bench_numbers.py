@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare the number parsers with the ones built digit by digit, on a million
+numbers.
+
+Run with `PYTHONPATH=src python benchmarks/bench_numbers.py [count]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import sys
+import time
+from functools import reduce
+
+from parsec import *
+
+
+def digits_value(base, digits):
+    return reduce(lambda accumulation, digit: accumulation * base + int(digit, base), digits, 0)
+
+
+# `Text.Parsec.Number` as it used to be.
+old_decimal = many1(digit()).parsecmap(lambda digits: digits_value(10, digits))
+old_hexadecimal = one_of('xX') >> many1(one_of('0123456789ABCDEFabcdef')).parsecmap(lambda ds: digits_value(16, ds))
+old_natural = (string('0') >> (old_hexadecimal | old_decimal | success_with(0))) | old_decimal
+old_integer = sign.apply(old_natural)
+old_floating = regex(r'[-+]?[0-9]+(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?').parsecmap(float)
+
+
+def bench(name, parser, text, expected):
+    parser = sepBy(parser, string(' '))
+    start = time.perf_counter()
+    values = parser.parse(text)
+    seconds = time.perf_counter() - start
+    assert values == expected
+    print('{:<40} {:8.2f} s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(0)
+    integers = [random.choice([random.randrange(-10 ** 12, 10 ** 12), random.randrange(100)]) for _ in range(count)]
+    floats = [random.uniform(-1e6, 1e6) for _ in range(count)]
+    text = ' '.join(str(i) if random.random() < 0.8 else '{}0x{:x}'.format('-' if i < 0 else '', abs(i))
+                    for i in integers)
+    print('{} integers, {} characters'.format(count, len(text)))
+    bench('integer, digit by digit', old_integer, text, integers)
+    bench('integer', integer, text, integers)
+    text = ' '.join(repr(f) for f in floats)
+    print('{} floats, {} characters'.format(count, len(text)))
+    bench('regex(...).parsecmap(float)', old_floating, text, floats)
+    bench('floating', floating, text, floats)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Measure grammars that build parsers while parsing: `generate` bodies calling
+`string(...)` and `sepBy(...)` at every step, as in examples/jsonc.py, and a
+recursive grammar tied by a Y combinator, which builds its parsers anew at
+every level of nesting.
+
+Run with `PYTHONPATH=src python benchmarks/bench_parse_construction.py [size]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import json
+import random
+import sys
+import time
+
+from parsec import *
+
+
+@generate
+def items():
+    '''A list of numbers, whose parsers are built at every call.'''
+    yield string('[')
+    values = yield sepBy(regex(r'-?\d+').parsecmap(int), string(',') << spaces())
+    yield string(']')
+    return values
+
+
+@generate
+def rows():
+    values = yield sepBy(items, string(',') << spaces())
+    return values
+
+
+def Y(f):
+    return (lambda x: x(x))(lambda y: f(lambda text, index: y(y)(text, index)))
+
+
+# `(` nested `)`s, or a number: `Y` gives `nested` the grammar anew at every level.
+nested = Y(lambda self: (string('(') >> Parser(self) << string(')')) | regex(r'\d+').parsecmap(int))
+
+
+def bench(name, parser, text):
+    start = time.perf_counter()
+    result = parser.parse(text)
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.3f} s'.format(name, seconds))
+    return result
+
+
+def nesting(depth):
+    return '(' * depth + str(depth) + ')' * depth
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+    text = json.dumps([[random.randrange(-1000, 1000) for _ in range(random.randrange(1, 8))]
+                       for _ in range(size)])
+    print('{} lists, {} characters'.format(size, len(text)))
+    assert bench('generate, inline string/sepBy', string('[') >> rows << string(']'), text) == json.loads(text)
+    bench('Y combinator, 20 levels x {}'.format(size // 20), many(nested << spaces()),
+          ' '.join(nesting(20) for _ in range(size // 20)))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare parsing log lines, most of which are repeated heartbeats, with and
+without `cache_results`.
+
+Run with `PYTHONPATH=src python benchmarks/bench_result_cache.py [lines]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import sys
+import time
+
+from parsec import *
+
+word = regex(r'[^ =]+')
+field = (word << string('=')) + (regex(r'"[^"]*"') | word)
+line = regex(r'[A-Z]+') + (string(' ') >> sepBy(field, string(' ')))
+
+
+def bench(name, parser, lines):
+    start = time.perf_counter()
+    for text in lines:
+        parser.parse_strict(text)
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.2f} s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(0)
+    heartbeats = ['INFO service=health status=ok path="/healthz" latency_ms={}'.format(i) for i in range(20)]
+    lines = [random.choice(heartbeats) if random.random() < 0.8 else
+             'WARN service=api user={} path="/items/{}" latency_ms={}'.format(
+                 random.randrange(10 ** 6), random.randrange(10 ** 6), random.randrange(1000))
+             for _ in range(count)]
+    print('{} lines, {} distinct'.format(count, len(set(lines))))
+    bench('parse_strict', line, lines)
+    bench('compiled', line.compile(), lines)
+    cached = line.compile().cache_results()
+    bench('compiled, cache_results()', cached, lines)
+    print('{} hits, {} misses, {} evictions'.format(cached.hits, cached.misses, cached.evictions))
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare `many` of characters with the span scanners on long runs.
+
+Run with `PYTHONPATH=src python benchmarks/bench_scanners.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import timeit
+from functools import reduce
+
+from parsec import *
+
+quoted = 'x' * 100000 + '"'
+blank = ' \t\n' * 30000 + 'x'
+digits = '1234567890' * 400
+
+
+def bench(name, parser, text, number=5):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=5)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    bench("many(none_of('\"')) joined", many(none_of('"')).parsecmap(''.join), quoted)
+    bench("many_str(none_of('\"'))", many_str(none_of('"')), quoted)
+    bench("take_until('\"')", take_until('"'), quoted)
+    bench('many(space())', many(space()), blank)
+    bench('spaces()', spaces(), blank)
+    bench('skip_while(str.isspace)', skip_while(str.isspace), blank)
+    bench('many1(digit()) folded digit by digit',
+          many1(digit()).parsecmap(lambda ds: reduce(lambda acc, d: acc * 10 + int(d), ds, 0)), digits)
+    bench('decimal_number', decimal_number, digits)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare the peak memory of `sepBy` collecting a hundred thousand records into a list
+with handing them to a `sink` one by one (under tracemalloc, which slows
+the parses down).
+
+Run with `PYTHONPATH=src python benchmarks/bench_sink.py [count]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import sys
+import time
+import tracemalloc
+
+from parsec import *
+
+field = regex(r'[^,\n]*')
+
+
+record = sepBy(field, string(',')).parsecmap(tuple)
+
+
+def bench(name, parser, text):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = parser.parse(text)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<40} {:8.2f} s {:10.1f} MB'.format(name, seconds, peak / 1e6))
+    return value
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = ''.join('{},item {},{}\n'.format(i, i, i * 0.5) for i in range(count))
+    print('{} records, {} characters'.format(count, len(text)))
+    records = bench('endBy(record, newline)', endBy(record, string('\n')), text)
+    assert len(records) == count
+    del records
+
+    total = [0]
+
+    def consume(fields):
+        total[0] += int(fields[0])
+
+    assert bench('endBy(record, newline, sink=consume)', endBy(record, string('\n'), sink=consume), text) == count
+    assert total[0] == count * (count - 1) // 2
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare skipping whitespace and comments after every token with the `lexeme`
+idiom (`p << ignore`, as in examples/) against tokens built in a `skipping`
+block, on S-expressions and JSON.
+
+Run with `PYTHONPATH=src python benchmarks/bench_skipping.py [size]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import json
+import random
+import sys
+import time
+
+from parsec import *
+
+
+def sexpr_tokens(lexeme):
+    return dict(lparen=lexeme(string('(')), rparen=lexeme(string(')')),
+                number=lexeme(regex(r'\d+')).parsecmap(int), symbol=lexeme(regex(r'[\w_-]+')))
+
+
+def sexpr_grammar(ignore, tokens):
+    form = forward_declare()
+    atom = tokens['number'] | tokens['symbol']
+    form.define(atom | (tokens['lparen'] >> many(form) << tokens['rparen']))
+    return ignore >> many(form) << eof()
+
+
+def json_tokens(lexeme):
+    token = lambda s: lexeme(string(s))
+    return dict(lbrace=token('{'), rbrace=token('}'), lbrack=token('['), rbrack=token(']'),
+                colon=token(':'), comma=token(','), true=token('true').result(True),
+                false=token('false').result(False), null=token('null').result(None),
+                number=lexeme(regex(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')).parsecmap(float),
+                quoted=lexeme(regex(r'"[^"\\]*"')).parsecmap(lambda s: s[1:-1]))
+
+
+def json_grammar(ignore, t):
+    value = forward_declare()
+    array = t['lbrack'] >> sepBy(value, t['comma']) << t['rbrack']
+    pair = t['quoted'] + (t['colon'] >> value)
+    obj = (t['lbrace'] >> sepBy(pair, t['comma']) << t['rbrace']).parsecmap(dict)
+    value.define(t['quoted'] | t['number'] | obj | array | t['true'] | t['false'] | t['null'])
+    return ignore >> value << eof()
+
+
+def grammars(tokens, grammar, comment):
+    ignore = many(regex(r'\s+') | regex(comment))
+    lexemes = grammar(ignore, tokens(lambda p: p << ignore))
+    with skipping(r'\s+|' + comment) as skipper:
+        skipped = grammar(skipper, tokens(lambda p: p))
+    return lexemes, skipped
+
+
+def bench(name, parser, text):
+    start = time.perf_counter()
+    result = parser.parse(text)
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.3f} s'.format(name, seconds))
+    return result
+
+
+def sexpr(depth):
+    if depth == 0 or random.random() < 0.3:
+        return random.choice([str(random.randrange(1000)), 'sym-{}'.format(random.randrange(100))])
+    body = ' '.join(sexpr(depth - 1) for _ in range(random.randrange(1, 5)))
+    return '({} ; depth {}\n  )'.format(body, depth) if random.random() < 0.1 else '({})'.format(body)
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(0)
+    texts = {
+        'S-expressions': ' '.join(sexpr(6) for _ in range(size)),
+        'JSON': json.dumps([{'id': i, 'name': 'item {}'.format(i), 'tags': ['a', 'b'], 'ok': i % 2 == 0}
+                            for i in range(size * 5)], indent=2),
+    }
+    cases = [('S-expressions', sexpr_tokens, sexpr_grammar, r';[^\n]*'),
+             ('JSON', json_tokens, json_grammar, r'//[^\n]*')]
+    for name, tokens, grammar, comment in cases:
+        text = texts[name]
+        print('{}: {} characters'.format(name, len(text)))
+        lexemes, skipped = grammars(tokens, grammar, comment)
+        expected = bench('lexeme', lexemes, text)
+        assert bench('skipping', skipped, text) == expected
+        bench('lexeme, compiled', lexemes.compile(), text)
+        bench('skipping, compiled', skipped.compile(), text)
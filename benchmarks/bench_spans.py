@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare `mark()` as it used to be, which computes the line and column of
+both ends of every match, with `spanned()`, on the identifiers of a long
+text.
+
+Run with `PYTHONPATH=src python benchmarks/bench_spans.py`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import timeit
+
+from parsec import *
+
+
+def old_mark(p):
+    '''`Parser.mark()` as it used to be.'''
+    def pos(text, index):
+        return ParseError.loc_info(text, index)
+
+    def mark(value, index):
+        @Parser
+        def mark(text, resultant_index):
+            return Value.success(resultant_index, (pos(text, index), value, pos(text, resultant_index)))
+        return mark
+
+    return p >= mark
+
+
+identifier = regex(r'[a-z]+')
+separator = regex(r'[ \n]')
+text = ('lorem ipsum dolor sit amet\n' * 4000).rstrip()
+
+
+def bench(name, parser, text, number=3):
+    seconds = min(timeit.repeat(lambda: parser.parse(text), number=number, repeat=3)) / number
+    print('{:<40} {:8.2f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    print('{} characters, {} identifiers'.format(len(text), len(text.split())))
+    assert sepBy(old_mark(identifier), separator).parse(text) == sepBy(mark(identifier), separator).parse(text)
+    bench('mark, as it used to be', sepBy(old_mark(identifier), separator), text)
+    bench('mark', sepBy(mark(identifier), separator), text)
+    bench('spanned', sepBy(spanned(identifier), separator), text)
+    bench('spanned, compiled', sepBy(spanned(identifier), separator).compile(), text)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare parsing JSON documents with one grammar shared by a thread pool with
+a process pool, for a growing number of workers.
+
+Threads only scale on a free-threaded build of CPython (3.13t and later, run
+with `PYTHON_GIL=0`); with the GIL they show the cost of contention instead.
+Processes scale everywhere but pay for sending every document and result.
+
+Run with `PYTHONPATH=src python benchmarks/bench_threads.py [documents]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from parsec.contrib.json import loads
+
+
+def item(i):
+    return {'id': i, 'name': 'item {}'.format(i), 'tags': ['a', 'b'], 'price': i + 0.5, 'ok': i % 2 == 0}
+
+
+def bench(name, pool, texts):
+    list(pool.map(loads, texts[:len(texts) // 10]))  # warm up the workers.
+    start = time.perf_counter()
+    list(pool.map(loads, texts))
+    seconds = time.perf_counter() - start
+    print('{:<40} {:8.2f} s'.format(name, seconds))
+    return seconds
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    texts = [json.dumps([item(i + j) for j in range(200)]) for i in range(count)]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('{} documents, {} CPUs, GIL {}'.format(count, os.cpu_count(), 'enabled' if gil else 'disabled'))
+    start = time.perf_counter()
+    for text in texts:
+        loads(text)
+    print('{:<40} {:8.2f} s'.format('serial', time.perf_counter() - start))
+    for workers in (1, 2, 4, 8):
+        with ThreadPoolExecutor(workers) as pool:
+            bench('{} threads'.format(workers), pool, texts)
+        with ProcessPoolExecutor(workers) as pool:
+            bench('{} processes'.format(workers), pool, texts)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compare the memory held by parse results with and without `interned` keys
+and `as_view` values, on records of repeated keys and long quoted values.
+
+Run with `PYTHONPATH=src python benchmarks/bench_views.py [count]`.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import random
+import sys
+import time
+import tracemalloc
+
+from parsec import *
+
+key = regex(r'[a-z_]+')
+quoted = regex(r'"[^"]*"')
+
+
+def records(key, value):
+    field = (key << string('=')) + value
+    return sepBy(sepBy(field, string(' ')), string('\n'))
+
+
+def bench(name, parser, text):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = parser.parse(text)
+    seconds = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{:<40} {:8.2f} s {:8.1f} MB'.format(name, seconds, held / 1e6))
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+    keys = ['id', 'name', 'description', 'created_at', 'owner']
+    text = '\n'.join(' '.join('{}="{}"'.format(k, 'x' * random.randrange(20, 200)) for k in keys)
+                     for _ in range(count))
+    print('{} records, {} characters'.format(count, len(text)))
+    bench('regex', records(key, quoted), text)
+    bench('interned(regex) keys', records(interned(key), quoted), text)
+    bench('interned keys, as_view(regex) values', records(interned(key), as_view(quoted)), text)
+    bench('compiled', records(interned(key), as_view(quoted)).compile(), text)
@@ -1,6 +1,7 @@
+import re
+
 from parsec import *
-from operator import add, sub, mul
-from functools import partial, reduce
+from operator import add, sub, mul, truediv
 
 
 whitespace = regex(r'\s*', re.MULTILINE)
@@ -11,7 +12,7 @@ rparen = lexeme(string(')'))
 
 plus = lexeme(string('+'))
 minus = lexeme(string('-'))
-add_or_sub = plus | minus
+add_or_sub = plus.result(add) | minus.result(sub)
 asterisk = lexeme(string('*'))
 div = lexeme(string('/'))
 
@@ -19,7 +20,7 @@ base_number = lexeme(regex(r'\d+').parsecmap(int))
 neg_number = lexeme(string('-') >> base_number).parsecmap(lambda n: n*-1)
 number = neg_number | base_number
 
-mult_or_div = asterisk | div
+mult_or_div = asterisk.result(mul) | div.result(truediv)
 peek_ops = lookahead(mult_or_div | add_or_sub | eof())
 
 @generate
@@ -34,26 +35,8 @@ def primary():
     val = yield number | braced | exclude(expr, peek_ops)
     return val
 
-def addition_reducer(x,y):
-    op, val = y
-    if op == '+':
-        return x + val
-    elif op == '-':
-        return x - val
-    else:
-        raise ValueError('unexpected op: {}'.format(op))
-
-def mult_reducer(x,y):
-    op, val = y
-    if op == '*':
-        return x * val
-    elif op == '/':
-        return x / val
-    else:
-        raise ValueError('unexpected op: {}'.format(op))
-
-mult = (primary + sepBy(mult_or_div + primary, whitespace)).parsecmap(lambda t: reduce(mult_reducer, t[1], t[0]))
-expr = (mult + sepBy(add_or_sub + mult, whitespace)).parsecmap(lambda t: reduce(addition_reducer, t[1], t[0]))
+mult = chainl1(primary, mult_or_div)
+expr = chainl1(mult, add_or_sub)
 
 full_expr = whitespace >> expr << eof()
 
@@ -7,28 +7,20 @@ Use parsec.py to parse $-expression (like expression in LISP).
 
 __author__ = 'He Tao, sighingnow@gmail.com'
 
-import re
-
 from parsec import *
 
-# ignore cases.
-whitespace = regex(r'\s+', re.MULTILINE)
-comment = regex(r';.*')
-ignore = many((whitespace | comment))
-
-# lexer for words.
-
-lexeme = lambda p: p << ignore  # skip all ignored characters.
-
-lparen = lexeme(string('('))
-rparen = lexeme(string(')'))
-number = lexeme(regex(r'\d+')).parsecmap(int)
-symbol = lexeme(regex(r'[\d\w_-]+'))
-true = lexeme(string('#t')).result(True)
+# lexer for words, each skipping all the ignored characters (whitespace and
+# comments) after it.
+with skipping(r'\s+|;.*') as ignore:
+    lparen = string('(')
+    rparen = string(')')
+    number = regex(r'\d+').parsecmap(int)
+    symbol = regex(r'[\d\w_-]+')
+    true = string('#t').result(True)
 
-false = lexeme(string('#f')).result(False)
+    false = string('#f').result(False)
 
-op = lexeme(regex(r'[\+\-*/]'))
+    op = regex(r'[\+\-*/]')
 
 
 atom = op | number | symbol | (true ^ false)
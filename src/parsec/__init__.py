@@ -3,31 +3,42 @@
 
 '''
 A universal Python parser combinator library inspired by Parsec library of Haskell.
+
+Parsers are immutable once built (and a `forward_declare`d parser once it is
+defined), so one grammar can be shared by any number of threads, including on
+free-threaded builds of CPython. The state of a parse -- its budget and
+statistics, the tables of `interned` -- lives in the thread running it.
 '''
 
 __author__ = 'He Tao, sighingnow@gmail.com'
+__version__ = '3.17'
 
-try:
-    from inspect import getfullargspec as getargspec
-except ImportError:
-    from inspect import getargspec as getargspec
-
+import mmap
 import operator
 import re
-import inspect
-import warnings
-from functools import reduce, wraps
-from collections import namedtuple
+import struct
+import sys
+import threading
+import time
+import types
+import weakref
+from bisect import bisect_right
+from functools import partial, reduce, wraps
+from collections import namedtuple, OrderedDict
 
 ##########################################################################
 # Text.Parsec.Error
 ##########################################################################
 
 def expected_arguments(callable):
+    if type(callable) is types.FunctionType:
+        return callable.__code__.co_argcount
+    # `inspect` is slow to import, and only needed for other callables.
+    import inspect
     if inspect.isbuiltin(callable):
         # NOTE: we cannot perform introspection on builtins
         return 1
-    return len(getargspec(callable).args)
+    return len(inspect.getfullargspec(callable).args)
 
 class ParseError(RuntimeError):
     '''Type for parse error.'''
@@ -61,6 +72,101 @@ class ParseError(RuntimeError):
         return 'expected: {!r} at {}'.format(self.expected, self.loc())
 
 
+class ParseBudgetExceeded(ParseError):
+    '''The parse has been aborted by one of its limits (`limit` names the
+    argument of `Parser.parse_partial`), at the furthest `index` it reached.'''
+
+    def __init__(self, limit, text, index, stats):
+        super(ParseBudgetExceeded, self).__init__('parse within {}'.format(limit), text, index)
+        self.limit = limit
+        self.stats = stats
+
+
+class _LineIndex(object):
+    '''The offsets `starts` at which the lines of `text` start.'''
+
+    __slots__ = ('text', 'starts', '__weakref__')
+
+    def __init__(self, text):
+        self.text, self.starts = text, [0]
+        self.starts.extend(m.end() for m in re.finditer('\n', text))
+
+
+_lines = None  # a weak reference to the `_LineIndex` of the last text indexed
+
+
+def _line_index(text):
+    '''The `_LineIndex` of `text`, the same one for as long as it is in use
+    and no other text has been indexed since: the spans keep it alive, and
+    the parse running in this thread, not this cache, so that it does not
+    keep the text alive.'''
+    global _lines
+    lines = None if _lines is None else _lines()
+    if lines is None or lines.text is not text:
+        lines = _LineIndex(text)
+        _lines = weakref.ref(lines)
+    if _context.parsing:
+        _context.lines = lines  # e.g. for `mark`, which drops its spans.
+    return lines
+
+
+class Span(object):
+    '''The offsets `start` and `end` of a match in `text`, see `spanned`. The
+    line and column of either end, as told by `ParseError.loc_info` (or line
+    0 and the offset if `text` is not a string), are computed on first access
+    from an index of the lines of `text`, which the spans of the last text
+    asked share. The matched text itself is only copied out by `fragment`
+    or `str()`, nor are texts compared: spans are equal when they are the
+    same offsets of the same text object.'''
+
+    __slots__ = ('text', 'start', 'end', '_locs', '_lines')
+
+    def __init__(self, text, start, end):
+        self.text, self.start, self.end, self._locs, self._lines = text, start, end, None, None
+
+    def locs(self):
+        if self._locs is None:
+            if isinstance(self.text, str):
+                self._lines = _line_index(self.text)
+                starts = self._lines.starts
+                first, last = bisect_right(starts, self.start) - 1, bisect_right(starts, self.end) - 1
+                self._locs = ((first, self.start - starts[first]), (last, self.end - starts[last]))
+            else:
+                self._locs = ((0, self.start), (0, self.end))
+        return self._locs
+
+    @property
+    def start_loc(self):
+        '''The `(line, column)` of `start`.'''
+        return self.locs()[0]
+
+    @property
+    def end_loc(self):
+        '''The `(line, column)` of `end`.'''
+        return self.locs()[1]
+
+    @property
+    def fragment(self):
+        '''The matched part of `text`.'''
+        return self.text[self.start:self.end]
+
+    def __str__(self):
+        return str(self.fragment)
+
+    def __eq__(self, other):
+        return (isinstance(other, Span) and self.text is other.text
+                and (self.start, self.end) == (other.start, other.end))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.text), self.start, self.end))
+
+    def __repr__(self):
+        return 'Span({}, {})'.format(self.start, self.end)
+
+
 ##########################################################################
 # Definition the Value model of parsec.py.
 ##########################################################################
@@ -110,12 +216,348 @@ class Value(namedtuple('Value', 'status index value expected')):
         return 'Value: state: {},  @index: {}, values: {}, expected: {}'.format(
             self.status, self.index, self.value, self.expected)
 
+##########################################################################
+# Execution budgets
+#
+# The limits of a parse are kept per thread while it runs. Choices, loops and
+# described parsers count as steps, and parsers that may recurse (forward
+# declarations, bodies of `generate` and parsers wrapping functions) also
+# count the depth. When no parse has limits, all of this costs one test of
+# `_metering`. `find_backtracking` runs a parse with a budget that also counts
+# the steps of every parser at every index.
+##########################################################################
+
+
+class ParseStats(object):
+    '''What a parse has done: the number of `steps` (choices, repetitions,
+    described and recursive parsers run), the `max_depth` of recursive parsers and the
+    `peak_index` it got to. See `Parser.parse_partial`.'''
+
+    def __init__(self):
+        self.steps, self.max_depth, self.peak_index = 0, 0, 0
+
+    def __repr__(self):
+        return 'ParseStats(steps={}, max_depth={}, peak_index={})'.format(
+            self.steps, self.max_depth, self.peak_index)
+
+
+class _Budget(object):
+    '''The limits of a running parse.'''
+
+    def __init__(self, text, max_steps=None, max_depth=None, timeout=None, stats=None):
+        self.text, self.depth = text, 0
+        self.stats = ParseStats() if stats is None else stats
+        self.max_steps = float('inf') if max_steps is None else max_steps
+        self.max_depth = float('inf') if max_depth is None else max_depth
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def step(self, parser, index):
+        stats = self.stats
+        stats.steps += 1
+        if index > stats.peak_index:
+            stats.peak_index = index
+        if stats.steps > self.max_steps:
+            self.exceeded('max_steps')
+        # the clock is read every 1024 steps.
+        if self.deadline is not None and not stats.steps & 1023 and time.monotonic() > self.deadline:
+            self.exceeded('timeout')
+
+    def exceeded(self, limit):
+        raise ParseBudgetExceeded(limit, self.text, self.stats.peak_index, self.stats)
+
+
+class _Context(threading.local):
+    '''The state of the parse running in this thread, kept out of the parsers
+    so that they can be shared between threads.'''
+
+    budget = None
+    parsing = 0  # the depth of the calls of `parse_partial`
+    lines = None  # the `_LineIndex` the spans of this parse have used last
+
+
+_context = _Context()
+_metering = 0  # the number of parses with a budget, in any thread
+_metering_lock = threading.Lock()
+
+
+def _step(parser, index):
+    budget = _context.budget
+    if budget is not None:
+        budget.step(parser, index)
+
+
+def _metered(parser, fn, text, index):
+    '''Run `parser`, which may recurse, by `fn`, counting its depth.'''
+    budget = _context.budget
+    if budget is None:
+        return fn(text, index)
+    budget.step(parser, index)
+    budget.depth += 1
+    if budget.depth > budget.stats.max_depth:
+        budget.stats.max_depth = budget.depth
+        if budget.depth > budget.max_depth:
+            budget.exceeded('max_depth')
+    res = fn(text, index)
+    budget.depth -= 1
+    if res.index > budget.stats.peak_index:
+        budget.stats.peak_index = res.index
+    return res
+
+
+def _current_budget():
+    return _context.budget if _metering else None
+
+
+def _run_with_budget(parser, budget):
+    global _metering
+    outer = _context.budget
+    _context.budget = budget
+    with _metering_lock:
+        _metering += 1
+    try:
+        res = parser(budget.text, 0)
+    finally:
+        _context.budget = outer
+        with _metering_lock:
+            _metering -= 1
+    if res.index > budget.stats.peak_index:
+        budget.stats.peak_index = res.index
+    return res
+
+
+class _Evaluations(_Budget):
+    '''A budget counting the evaluations of every parser at every index.'''
+
+    def __init__(self, text, max_steps=None, timeout=None):
+        super(_Evaluations, self).__init__(text, max_steps, None, timeout)
+        self.parsers, self.counts = {}, {}
+
+    def step(self, parser, index):
+        key = (id(parser), index)
+        count = self.counts.get(key)
+        if count is None:
+            self.parsers[id(parser)] = parser
+            self.counts[key] = 1
+        else:
+            self.counts[key] = count + 1
+        super(_Evaluations, self).step(parser, index)
+
+
+class Backtracking(object):
+    '''A parser evaluated again and again at the same `positions` of a text,
+    as `(index, evaluations)` pairs, see `find_backtracking`. `rule` names the
+    parser by its description or the function it is defined by.'''
+
+    def __init__(self, parser, text, positions):
+        self.parser, self.text, self.positions = parser, text, positions
+        self.rule = _rule_name(parser) or _shorten(repr(parser))
+
+    @property
+    def evaluations(self):
+        '''The number of evaluations at all `positions`.'''
+        return sum(count for _, count in self.positions)
+
+    def __repr__(self):
+        return 'Backtracking({!r}, evaluations={}, positions={})'.format(
+            self.rule, self.evaluations, len(self.positions))
+
+    def __str__(self):
+        locations = ', '.join('{}:{} ({} times)'.format(line, col, count) for (line, col), count in
+                              ((ParseError.loc_info(self.text, index), count) for index, count in self.positions[:5]))
+        more = ', ...' if len(self.positions) > 5 else ''
+        return '{} evaluated {} times at {} positions: {}{}'.format(
+            self.rule, self.evaluations, len(self.positions), locations, more)
+
+
+def _rule_name(parser):
+    '''The description of `parser`, or the name of the function defining it.'''
+    if isinstance(parser, Desc):
+        return parser.description
+    if type(parser) in (Parser, Generate):
+        return getattr(parser.fn, '__name__', None)
+    return None
+
+
+def _shorten(s, width=60):
+    return s if len(s) <= width else s[:width - 3] + '...'
+
+
+def find_backtracking(parser, text, threshold=2, max_steps=None, timeout=None):
+    '''Parse `text` counting how many times every choice, loop, described and
+    recursive parser is evaluated at every index, and report those evaluated
+    more than `threshold` times at an index, most evaluated first, as a list
+    of `Backtracking`. These are where memoization or factoring the common
+    prefixes of alternatives out of `^` pays off.
+
+    Whether the parse succeeds does not matter, and it stops early, with the
+    evaluations counted so far, after `max_steps` steps or `timeout` seconds,
+    as grammars backtracking exponentially may never finish otherwise.'''
+    evaluations = _Evaluations(text, max_steps, timeout)
+    try:
+        _run_with_budget(parser, evaluations)
+    except ParseError:
+        pass
+    positions = {}
+    for (key, index), count in evaluations.counts.items():
+        if count > threshold:
+            positions.setdefault(key, []).append((index, count))
+    found = [Backtracking(evaluations.parsers[key], text, sorted(ps, key=lambda p: (-p[1], p[0])))
+             for key, ps in positions.items()]
+    # named rules first, and once: `generate` describes its parser by the name of the function.
+    found.sort(key=lambda b: (-b.evaluations, _rule_name(b.parser) is None))
+    reported, unique = set(), []
+    for b in found:
+        key = (b.rule, tuple(b.positions))
+        if key not in reported:
+            reported.add(key)
+            unique.append(b)
+    return unique
+
+
 ##########################################################################
 # Text.Parsec.Prim
 ##########################################################################
 
 
-class Parser(object):
+class _Unshared(Exception):
+    '''Raised for constructor arguments that parsers are not shared by.'''
+
+
+# the types of arguments equal only to themselves, or to the same value of
+# the same type, parsers included (see `_HashConsed`).
+_plain = {str, bytes, type(None), type(re.compile('')), types.FunctionType, types.BuiltinFunctionType,
+          types.MethodType, type(str.join), partial, type}
+
+
+def _share_key(value):
+    '''A key equal for arguments that build the same parser, or `_Unshared`.'''
+    t = type(value)
+    if t in _plain:
+        return value
+    if t is int or t is bool:
+        return (t, value)  # `string(1)` is not `string(True)`.
+    if t is float:
+        return (t, repr(value))  # nor `result(0.0)` `result(-0.0)`.
+    if t is tuple:
+        if _plain.issuperset(map(type, value)):
+            return value  # no tuples in it, unlike in the keys below.
+        return (t,) + tuple([v if type(v) in _plain else _share_key(v) for v in value])
+    raise _Unshared()
+
+
+_shared = {}  # weak references to the living parsers, by their class and arguments
+_sweep_at = 1024
+
+
+def _sweep():
+    '''Forget the parsers that are gone, once `_shared` has grown to twice
+    the size it had after the last sweep.'''
+    global _sweep_at
+    for key, ref in list(_shared.items()):
+        if ref() is None and _shared.get(key) is ref:
+            _shared.pop(key, None)
+    _sweep_at = max(1024, 2 * len(_shared))
+
+
+class _HashConsed(type):
+    '''The type of parsers, which hash-conses those of this module:
+    constructing one with the same arguments as a living one gives that one,
+    so that a grammar calling `spaces()` or `string('(')` at every use holds
+    a single parser for each. Parsers are immutable, so sharing them is safe.
+    Arguments must be equal exactly when they are the same value (strings,
+    numbers, compiled expressions, functions, parsers, and tuples of these):
+    parsers built from any other are not shared, nor are forward
+    declarations. Nor are the parsers built while a grammar that builds
+    parsers as it runs (in the body of a `generate` or `bind`) is parsing, in
+    any thread: they would only pay for looking them up, see `_Building`.'''
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        _plain.add(cls)
+        if 'shared' not in namespace:
+            # parsers defined elsewhere may keep state of their own.
+            cls.shared = cls.__module__ == __name__
+
+    def __call__(cls, *args, **kwargs):
+        if not cls.shared:
+            return type.__call__(cls, *args, **kwargs)
+        if not kwargs and _plain.issuperset(map(type, args)):
+            key = (cls,) + args
+        else:
+            key = [cls]
+            try:
+                for value in args:
+                    t = type(value)
+                    if t in _plain or t is tuple and _plain.issuperset(map(type, value)):
+                        key.append(value)
+                    else:
+                        key.append((_share_key(value),))  # apart from the tuples of plain values.
+                if kwargs:
+                    key.append(_share_key(tuple(sorted(kwargs.items()))))
+            except _Unshared:
+                return type.__call__(cls, *args, **kwargs)
+            key = tuple(key)
+        try:
+            ref = _shared.get(key)
+        except TypeError:  # e.g. a method of an object that cannot be hashed.
+            return type.__call__(cls, *args, **kwargs)
+        p = None if ref is None else ref()
+        if p is None:
+            # threads racing to build it may each get their own: that is only less sharing.
+            p = type.__call__(cls, *args, **kwargs)
+            _shared[key] = weakref.ref(p)
+            if len(_shared) > _sweep_at:
+                _sweep()
+        return p
+
+
+class _Building(object):
+    '''Stops hash-consing parsers while `parser` parses, if it builds parsers
+    as it runs: looking up every one of them in `_shared` costs more than
+    building it, and grammars like that build new ones at every step. The
+    construction of the parsers is left to `type`, in every thread, until the
+    last parse of such a grammar ends.'''
+
+    running = 0  # the number of such parses, in any thread
+    lock = threading.Lock()
+
+    def __init__(self, parser):
+        self.builds = _builds_parsers(parser)
+
+    def __enter__(self):
+        if self.builds:
+            with _Building.lock:
+                _Building.running += 1
+                if _Building.running == 1:
+                    del _HashConsed.__call__
+
+    def __exit__(self, *exc_info):
+        if self.builds:
+            with _Building.lock:
+                _Building.running -= 1
+                if _Building.running == 0:
+                    _HashConsed.__call__ = _hash_consed
+
+
+_hash_consed = _HashConsed.__call__
+
+
+def _builds_parsers(p):
+    '''Whether the grammar `p` runs code that may build parsers while it
+    parses: the body of a `generate`, the function of a `bind`, or a function
+    wrapped as a parser. It is worked out once, and kept on `p`.'''
+    builds = p.__dict__.get('_builds')
+    if builds is None:
+        builds = False
+        for q in walk(p):
+            if isinstance(q, (Generate, Bind)) or type(q) is Parser:
+                builds = True
+                break
+        p._builds = builds
+    return builds
+
+
+class Parser(object, metaclass=_HashConsed):
     '''
     A Parser is an object that wraps a function to do the parsing work.
     Arguments of the function should be a string to be parsed and the index on
@@ -123,75 +565,126 @@ class Parser(object):
 
     The function should return either Value.success(next_index, value) if
     parsing successfully, or Value.failure(index, expected) on the failure.
+
+    The combinators of this module build instances of the subclasses of Parser,
+    one per combinator, which do the parsing work in `__call__` and keep their
+    operands as attributes (named in `params`) rather than hiding them in a
+    closure, so that a grammar can be inspected and rewritten, see `walk()`,
+    `transform()` and `optimize()`.
     '''
 
+    # Names of the constructor arguments, kept as attributes of the same names,
+    # and those of them holding a parser (or a tuple of parsers).
+    params = ()
+    child_params = ()
+
     def __init__(self, fn):
         '''`fn` is the function to wrap.'''
         self.fn = fn
 
     def __call__(self, text, index):
         '''call wrapped function.'''
+        if _metering:
+            return _metered(self, self.fn, text, index)
         return self.fn(text, index)
 
     def __repr__(self):
-        if hasattr(self.fn, "__name__"):
-            return self.fn.__name__
-        return super().__repr__()
-
-    def parse(self, text):
-        '''Parses a given string `text`.'''
-        return self.parse_partial(text)[0]
+        if type(self) is Parser:
+            if hasattr(self.fn, "__name__"):
+                return self.fn.__name__
+            return super().__repr__()
+        return '{}({})'.format(type(self).__name__, ', '.join(repr(arg) for arg in self.args))
+
+    @property
+    def args(self):
+        '''The arguments this parser has been constructed with.'''
+        return tuple(getattr(self, name) for name in self.params)
+
+    @property
+    def children(self):
+        '''The parsers this parser is built from.'''
+        children = []
+        for name in self.child_params:
+            child = getattr(self, name)
+            if isinstance(child, tuple):
+                children.extend(child)
+            else:
+                children.append(child)
+        return tuple(children)
 
-    def parse_partial(self, text):
+    def with_children(self, children):
+        '''Return a parser like this one but built from `children` instead,
+        or this parser itself if nothing changed.'''
+        if all(new is old for new, old in zip(children, self.children)):
+            return self
+        children, args = iter(children), []
+        for name in self.params:
+            arg = getattr(self, name)
+            if name in self.child_params:
+                arg = tuple(next(children) for _ in arg) if isinstance(arg, tuple) else next(children)
+            args.append(arg)
+        return type(self)(*args)
+
+    def parse(self, text, **limits):
+        '''Parses a given string `text`, see `parse_partial` for the `limits`.'''
+        return self.parse_partial(text, **limits)[0]
+
+    def parse_partial(self, text, max_steps=None, max_depth=None, max_length=None, timeout=None, stats=None):
         '''Parse the longest possible prefix of a given string.
 
         Return a tuple of the result value and the rest of the string.
 
-        If failed, raise a ParseError. '''
-        res = self(text, 0)
+        If failed, raise a ParseError.
+
+        The parse is aborted with a `ParseBudgetExceeded` error when it takes
+        more than `max_steps` steps, nests recursive parsers deeper than
+        `max_depth`, runs for more than `timeout` seconds, or when the text is
+        longer than `max_length`. What the parse did is counted into `stats`,
+        if given a `ParseStats`.'''
+        _context.parsing += 1
+        try:
+            with _Building(self):
+                if max_steps is None and max_depth is None and max_length is None and timeout is None and stats is None:
+                    res = self(text, 0)
+                else:
+                    budget = _Budget(text, max_steps, max_depth, timeout, stats)
+                    if max_length is not None and len(text) > max_length:
+                        raise ParseBudgetExceeded('max_length', text, max_length, budget.stats)
+                    res = _run_with_budget(self, budget)
+        finally:
+            _context.parsing -= 1
+            if not _context.parsing:
+                _context.lines = None
         if res.status:
             return (res.value, text[res.index:])
         else:
             raise ParseError(res.expected, text, res.index)
 
-    def parse_strict(self, text):
+    def parse_strict(self, text, **limits):
         '''Parse the longest possible prefix of the entire given string.
 
         If the parser worked successfully and NONE text was rested, return the
         result value, else raise a ParseError.
 
         The difference between `parse` and `parse_strict` is that whether entire
-        given text must be used.'''
+        given text must be used. See `parse_partial` for the `limits`.'''
         # pylint: disable=comparison-with-callable
         # Here the `<` is not comparison.
-        return (self < eof()).parse_partial(text)[0]
+        strict = self < eof()
+        strict._builds = _builds_parsers(self)  # a new parser, maybe, unlike `self`.
+        return strict.parse_partial(text, **limits)[0]
 
     def bind(self, fn):
         '''This is the monadic binding operation. Returns a parser which, if
         parser is successful, passes the result to fn, and continues with the
         parser returned from fn.
         '''
-        args_count = expected_arguments(fn)
-        if not 1 <= args_count <= 2:
-            raise TypeError("can only bind on a function with one or two arguments, fn/{}".format(args_count))
-
-        @Parser
-        def bind_parser(text, index):
-            res = self(text, index)
-            if not res.status:
-                return res
-
-            return (fn(res.value, index) if args_count == 2 else fn(res.value))(text, res.index)
-        return bind_parser
+        return Bind(self, fn)
 
     def compose(self, other):
         '''(>>) Sequentially compose two actions, discarding any value produced
         by the first.'''
-        @Parser
-        def compose_parser(text, index):
-            res = self(text, index)
-            return res if not res.status else other(text, res.index)
-        return compose_parser
+        return Compose((self, other))
 
     def joint(self, *parsers):
         '''(+) Joint two or more parsers into one. Return the aggregate of two results
@@ -205,11 +698,7 @@ class Parser(object):
         - If p fails **without consuming any input**, parser q is tried.
 
         NOTICE: without backtrack.'''
-        @Parser
-        def choice_parser(text, index):
-            res = self(text, index)
-            return res if res.status or res.index != index else other(text, index)
-        return choice_parser
+        return Choice((self, other))
 
     def try_choice(self, other):
         '''(^) Choice with backtrack. This combinator is used whenever arbitrary
@@ -217,63 +706,25 @@ class Parser(object):
         the value of p is returned. If p fails, it pretends that it hasn't consumed
         any input, and then parser q is tried.
         '''
-        @Parser
-        def try_choice_parser(text, index):
-            res = self(text, index)
-            return res if res.status else other(text, index)
-        return try_choice_parser
+        return TryChoice((self, other))
 
     def skip(self, other):
         '''(<<) Ends with a specified parser, and at the end parser consumed the
         end flag.'''
-        @Parser
-        def skip_parser(text, index):
-            res = self(text, index)
-            if not res.status:
-                return res
-            end = other(text, res.index)
-            if end.status:
-                return Value.success(end.index, res.value)
-            else:
-                return Value.failure(end.index, 'ends with {}'.format(end.expected))
-        return skip_parser
+        return Skip(self, other)
 
     def ends_with(self, other):
         '''(<) Ends with a specified parser, and at the end parser hasn't consumed
         any input.'''
-        @Parser
-        def ends_with_parser(text, index):
-            res = self(text, index)
-            if not res.status:
-                return res
-            end = other(text, res.index)
-            if end.status:
-                return res
-            else:
-                return Value.failure(end.index, 'ends with {}'.format(end.expected))
-        return ends_with_parser
+        return EndsWith(self, other)
 
     def excepts(self, other):
         '''Fail though matched when the consecutive parser `other` success for the rest text.'''
-        @Parser
-        def excepts_parser(text, index):
-            res = self(text, index)
-            if not res.status:
-                return res
-            lookahead = other(text, res.index)
-            if lookahead.status:
-                return Value.failure(res.index, 'should not be "{}"'.format(lookahead.value))
-            else:
-                return res
-        return excepts_parser
+        return Excepts(self, other)
 
     def parsecmap(self, fn, star=False):
         '''Returns a parser that transforms the produced value of parser with `fn`.'''
-        def mapper(res):
-            # unpack tuple
-            result = fn(*res) if star else fn(res)
-            return success_with(result, advance=False)
-        return self.bind(mapper)
+        return Map(self, fn, star)
 
     def map(self, fn, star=False):
         '''Functor map on the parsed value with `fn`.
@@ -294,24 +745,51 @@ class Parser(object):
 
     def result(self, res):
         '''Return a value according to the parameter `res` when parse successfully.'''
-        return self >> success_with(res, advance=False)
+        return Result(self, res)
 
     def mark(self):
         '''Mark the line and column information of the result of this parser.'''
-        def pos(text, index):
-            return ParseError.loc_info(text, index)
-
-        def mark(value, index):
-            @Parser
-            def mark(text, resultant_index):
-                return Value.success(resultant_index, (pos(text, index), value, pos(text, resultant_index)))
-            return mark
+        return Map(Spanned(self), _marked)
 
-        return self >= mark
+    def spanned(self):
+        '''Pair the result of this parser with its `Span`, see `spanned`.'''
+        return Spanned(self)
 
     def desc(self, description):
         '''Describe a parser, when it failed, print out the description text.'''
-        return self | fail_with(description)
+        return Desc(self, description)
+
+    def cache_results(self, max_entries=1024, max_bytes=64 << 20, failures=True):
+        '''Remember what `parse`, `parse_partial` and `parse_strict` of this
+        parser give for the last `max_entries` inputs (strings or bytes) of at
+        most `max_bytes` in all, so that parsing one of them again is a lookup.
+        Failures are remembered too (as the `ParseError` to raise again) unless
+        not `failures`. Parses with limits are always run.
+
+        Every hit returns the same value: mutating it changes what later hits
+        return. The cache can be shared between threads. Compile the grammar
+        before, not after: `p.compile().cache_results()`.'''
+        return ResultCache(self, max_entries, max_bytes, failures)
+
+    def optimize(self):
+        '''Rewrite this grammar into an equivalent one that is cheaper to run.
+        See `optimize()`.'''
+        return optimize(self)
+
+    def analyze(self):
+        '''Find the performance hazards of this grammar. See `analyze()`.'''
+        return analyze(self)
+
+    @staticmethod
+    def forward():
+        '''Declare a parser to be defined later, see `forward_declare`.'''
+        return Forward()
+
+    def compile(self):
+        '''Compile this grammar into specialized Python code.
+        See `parsec.codegen.compile_parser()`.'''
+        from .codegen import compile_parser
+        return compile_parser(self)
 
     def __or__(self, other):
         '''Implements the `(|)` operator, means `choice`.'''
@@ -335,6 +813,7 @@ class Parser(object):
 
     def __irshift__(self, other):
         '''Implements the `(>>=)` operator, means `bind`.'''
+        import warnings
         warnings.warn('Call to deprecated operator (`>>=`) as it is an in-place '
                       'operator and offten causing misleading, using (`>=`) for '
                       'bind() instead.', category=DeprecationWarning)
@@ -357,6 +836,353 @@ class Parser(object):
         return self.excepts(other)
 
 
+class Bind(Parser):
+    '''`parser >= fn`, see `Parser.bind`.'''
+
+    params, child_params = ('parser', 'fn'), ('parser',)
+
+    def __init__(self, parser, fn):
+        self.args_count = expected_arguments(fn)
+        if not 1 <= self.args_count <= 2:
+            raise TypeError("can only bind on a function with one or two arguments, fn/{}".format(self.args_count))
+        self.parser, self.fn = parser, fn
+        self.cut_at = _cut_position((parser,))
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+
+        res = (self.fn(res.value, index) if self.args_count == 2 else self.fn(res.value))(text, res.index)
+        if not res.status and self.cut_at is not None:
+            _cut_failure(text, res)
+        return res
+
+
+class Compose(Parser):
+    '''`p1 >> p2 >> ... >> pn`, see `Parser.compose`.'''
+
+    params = child_params = ('parsers',)
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+        self.cut_at = _cut_position(parsers)
+
+    def __call__(self, text, index):
+        if self.cut_at is not None:
+            return _call_with_cut(self.parsers, self.cut_at, text, index)[0]
+        for p in self.parsers:
+            res = p(text, index)
+            if not res.status:
+                return res
+            index = res.index
+        return res
+
+
+class Sequence(Parser):
+    '''`p1 + p2 + ... + pn`, see `joint`. `shape` tells how the result tuples
+    nest, by indices into `parsers`: `(a + b) + c` is `Sequence((a, b, c), ((0, 1), 2))`.'''
+
+    params, child_params = ('parsers', 'shape'), ('parsers',)
+
+    def __init__(self, parsers, shape=None):
+        self.parsers = parsers
+        self.shape = tuple(range(len(parsers))) if shape is None else shape
+        self.flat = bool(parsers) and self.shape == tuple(range(len(parsers)))
+        self.cut_at = _cut_position(parsers)
+
+    def __call__(self, text, index):
+        if self.cut_at is not None:
+            res, values = _call_with_cut(self.parsers, self.cut_at, text, index)
+            if not res.status:
+                return res
+            index = res.index
+        else:
+            values = []
+            for p in self.parsers:
+                res = p(text, index)
+                if not res.status:
+                    return res
+                values.append(res.value)
+                index = res.index
+        if self.flat:
+            return Value.success(index, tuple(values))
+        if not values:
+            return Value.combinate(values)
+        return Value.success(index, _build_shape(self.shape, values))
+
+
+def _build_shape(shape, values):
+    return tuple(values[s] if isinstance(s, int) else _build_shape(s, values) for s in shape)
+
+
+class Choice(Parser):
+    '''`p1 | p2 | ... | pn`, see `Parser.choice`.'''
+
+    params = child_params = ('parsers',)
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        for p in self.parsers:
+            res = p(text, index)
+            if res.status or res.index != index:
+                return res
+        return res
+
+
+class TryChoice(Parser):
+    '''`p1 ^ p2 ^ ... ^ pn`, see `Parser.try_choice`.'''
+
+    params = child_params = ('parsers',)
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        for p in self.parsers:
+            res = p(text, index)
+            if res.status:
+                return res
+        return res
+
+
+class Longest(Parser):
+    '''The longest match of `parsers`, see `try_choices_longest`.'''
+
+    params = child_params = ('parsers',)
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        choices = self.parsers
+        results = list(map(lambda choice: choice(text, index), choices))
+        if all(not result.status for result in results):
+            return Value.failure(index, 'does not match with any choices {}'.format(list(zip(choices, results))))
+
+        successful_results = list(filter(lambda result: result.status, results))
+        return max(successful_results, key=lambda result: result.index)
+
+
+class Skip(Parser):
+    '''`parser << other`, see `Parser.skip`.'''
+
+    params = child_params = ('parser', 'other')
+
+    def __init__(self, parser, other):
+        self.parser, self.other = parser, other
+        self.cut_at = _cut_position((parser, other))
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        end = self.other(text, res.index)
+        if end.status:
+            return Value.success(end.index, res.value)
+        end = Value.failure(end.index, 'ends with {}'.format(end.expected))
+        if self.cut_at == 0:
+            _cut_failure(text, end)
+        return end
+
+
+class EndsWith(Parser):
+    '''`parser < other`, see `Parser.ends_with`.'''
+
+    params = child_params = ('parser', 'other')
+
+    def __init__(self, parser, other):
+        self.parser, self.other = parser, other
+        self.cut_at = _cut_position((parser, other))
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        end = self.other(text, res.index)
+        if end.status:
+            return res
+        end = Value.failure(end.index, 'ends with {}'.format(end.expected))
+        if self.cut_at == 0:
+            _cut_failure(text, end)
+        return end
+
+
+class Excepts(Parser):
+    '''`parser / other`, see `Parser.excepts`.'''
+
+    params = child_params = ('parser', 'other')
+
+    def __init__(self, parser, other):
+        self.parser, self.other = parser, other
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        lookahead = self.other(text, res.index)
+        if lookahead.status:
+            return Value.failure(res.index, 'should not be "{}"'.format(lookahead.value))
+        else:
+            return res
+
+
+class Map(Parser):
+    '''`parser.parsecmap(fn, star)`, see `Parser.parsecmap`.'''
+
+    params, child_params = ('parser', 'fn', 'star'), ('parser',)
+
+    def __init__(self, parser, fn, star=False):
+        self.parser, self.fn, self.star = parser, fn, star
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        # unpack tuple
+        return Value.success(res.index, self.fn(*res.value) if self.star else self.fn(res.value))
+
+
+class Result(Parser):
+    '''`parser.result(value)`, see `Parser.result`.'''
+
+    params, child_params = ('parser', 'value'), ('parser',)
+
+    def __init__(self, parser, value):
+        self.parser, self.value = parser, value
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        return Value.success(res.index, self.value) if res.status else res
+
+
+class Spanned(Parser):
+    '''`parser.spanned()`, see `spanned`.'''
+
+    params = child_params = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        return Value.success(res.index, (res.value, Span(text, index, res.index)))
+
+
+def _marked(spanned):
+    value, span = spanned
+    return (span.start_loc, value, span.end_loc)
+
+
+class Desc(Parser):
+    '''`parser.desc(description)`, see `Parser.desc`.'''
+
+    params, child_params = ('parser', 'description'), ('parser',)
+
+    def __init__(self, parser, description):
+        self.parser, self.description = parser, description
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        res = self.parser(text, index)
+        return res if res.status or res.index != index else Value.failure(index, self.description)
+
+
+class ResultCache(Parser):
+    '''`parser`, remembering the outcome of its whole parses, see
+    `Parser.cache_results`. Counts its `hits`, `misses` and `evictions`.'''
+
+    params, child_params = ('parser', 'max_entries', 'max_bytes', 'failures'), ('parser',)
+    shared = False  # each keeps results of its own.
+
+    def __init__(self, parser, max_entries=1024, max_bytes=64 << 20, failures=True):
+        self.parser, self.max_entries, self.max_bytes, self.failures = parser, max_entries, max_bytes, failures
+        self.clear()
+
+    def clear(self):
+        '''Forget all the results, and reset the counts.'''
+        self.lock = threading.Lock()
+        self.entries, self.size = OrderedDict(), 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def __call__(self, text, index):
+        # within a larger grammar, nothing is cached.
+        return self.parser(text, index)
+
+    def __getstate__(self):
+        return dict(self.__dict__, lock=None, entries=None)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.clear()
+
+    def __repr__(self):
+        return 'ResultCache({!r}, hits={}, misses={}, entries={}, bytes={})'.format(
+            self.parser, self.hits, self.misses, len(self.entries), self.size)
+
+    def parse_partial(self, text, **limits):
+        '''`parser.parse_partial(text)`, or what it gave for `text` last time.'''
+        return self.remembered('partial', self.parser.parse_partial, text, limits)
+
+    def parse_strict(self, text, **limits):
+        '''`parser.parse_strict(text)`, or what it gave for `text` last time.'''
+        return self.remembered('strict', self.parser.parse_strict, text, limits)
+
+    def remembered(self, kind, parse, text, limits):
+        try:
+            key = (kind, text)
+            hash(key)
+        except TypeError:  # e.g. a list of tokens.
+            key = None
+        if key is None or limits:
+            # the limits are those of a parse that is run.
+            return parse(text, **limits)
+        with self.lock:
+            outcome = self.entries.get(key)
+            if outcome is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if outcome is not None:
+            ok, value = outcome
+            if not ok:
+                raise ParseError(value[0], text, value[1])
+            return value
+        try:
+            value = parse(text)
+        except ParseError as e:
+            if self.failures:
+                self.remember(key, text, (False, (e.expected, e.index)))
+            raise
+        self.remember(key, text, (True, value))
+        return value
+
+    def remember(self, key, text, outcome):
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key not in self.entries:
+                self.size += size
+            self.entries[key] = outcome
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                (_, evicted), _ = self.entries.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+
 def parse(p, text, index=0):
     '''Parse a string and return the result or raise a ParseError.'''
     return p.parse(text[index:])
@@ -374,19 +1200,7 @@ def compose(pa, pb):
 
 def joint(*parsers):
     '''Joint two or more parsers, implements the operator of `(+)`.'''
-    @Parser
-    def joint_parser(text, index):
-        values = []
-        prev_v = None
-        for p in parsers:
-            if prev_v:
-                index = prev_v.index
-            prev_v = v = p(text, index)
-            if not v.status:
-                return v
-            values.append(v)
-        return Value.combinate(values)
-    return joint_parser
+    return Sequence(parsers)
 
 
 def choice(pa, pb):
@@ -409,15 +1223,7 @@ def try_choices_longest(*choices):
     if not all(isinstance(choice, Parser) for choice in choices):
         raise TypeError("choices can only be Parsers")
 
-    @Parser
-    def longest(text, index):
-        results = list(map(lambda choice: choice(text, index), choices))
-        if all(not result.status for result in results):
-            return Value.failure(index, 'does not match with any choices {}'.format(list(zip(choices, results))))
-
-        successful_results = list(filter(lambda result: result.status, results))
-        return max(successful_results, key=lambda result: result.index)
-    return longest
+    return Longest(choices)
 
 def skip(pa, pb):
     '''Ends with a specified parser, and at the end parser consumed the end flag.
@@ -436,9 +1242,9 @@ def excepts(pa, pb):
     return pa.excepts(pb)
 
 
-def parsecmap(p, fn):
+def parsecmap(p, fn, star=False):
     '''Returns a parser that transforms the produced value of parser with `fn`.'''
-    return p.parsecmap(fn)
+    return p.parsecmap(fn, star=star)
 
 
 def parsecapp(p, other):
@@ -460,11 +1266,75 @@ def mark(p):
     return p.mark()
 
 
+def spanned(p):
+    '''Return the result of the parser `p` with where it has been found, as
+    `(value, span)`. Unlike `mark`, the `Span` only keeps the offsets of the
+    match: lines and columns are computed if asked for.'''
+    return p.spanned()
+
+
 def desc(p, description):
     '''Describe a parser, when it failed, print out the description text.'''
     return p.desc(description)
 
 
+##########################################################################
+# Combinator graph
+#
+# A grammar is a graph of parsers linked through their `children`; a parser
+# may be shared by several others. These utilities visit and rebuild such
+# graphs, each parser once.
+##########################################################################
+
+
+def walk(p):
+    '''Iterate over the parsers reachable from `p` (including `p` itself),
+    each once, parents before their children.'''
+    seen, pending = set(), [p]
+    while pending:
+        p = pending.pop()
+        if id(p) in seen:
+            continue
+        seen.add(id(p))
+        yield p
+        pending.extend(reversed(p.children))
+
+
+def transform(p, fn, expand=None):
+    '''Rebuild the grammar `p` bottom-up, replacing every parser by `fn` of it
+    once its children have been transformed. Shared parsers stay shared.
+
+    `expand`, if given, is applied to every parser before its children are
+    visited, and may replace it with an equivalent parser of other children.
+
+    A `Forward` parser becomes a new one defined by the transformed definition,
+    which keeps recursive grammars recursive.'''
+    # iterative, so that long chains like `p1 | p2 | ... | pn` don't overflow the stack.
+    memo, stack = {}, [(p, None)]
+    while stack:
+        q, expanded = stack[-1]
+        if expanded is None:
+            if id(q) in memo:
+                stack.pop()
+                continue
+            expanded = q if expand is None else expand(q)
+            stack[-1] = (q, expanded)
+            if isinstance(expanded, Forward) and expanded.parser is not None:
+                # recursive references get the new forward parser, defined below.
+                memo[id(q)] = Forward()
+            pending = [child for child in expanded.children if id(child) not in memo]
+            if pending:
+                stack.extend((child, None) for child in reversed(pending))
+                continue
+        stack.pop()
+        children = tuple(memo[id(child)] for child in expanded.children)
+        if isinstance(expanded, Forward) and expanded.parser is not None:
+            memo[id(q)].define(children[0])
+        elif id(q) not in memo:  # or it has been transformed inside a cycle.
+            memo[id(q)] = fn(expanded.with_children(children))
+    return memo[id(p)]
+
+
 ##########################################################################
 # Parser Generator
 #
@@ -481,39 +1351,66 @@ def desc(p, description):
 ##########################################################################
 
 
-def generate(fn):
-    '''Parser generator. (combinator syntax).'''
-    if isinstance(fn, str):
-        return lambda f: generate(f).desc(fn)
+class Generate(Parser):
+    '''A parser defined by the generator function `fn`, see `generate`.'''
+
+    params = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
 
-    @wraps(fn)
-    @Parser
-    def generated(text, index):
+    def __repr__(self):
+        return 'Generate({})'.format(getattr(self.fn, '__name__', self.fn))
+
+    def __call__(self, text, index):
+        if _metering:
+            return _metered(self, self.run, text, index)
+        return self.run(text, index)
+
+    def run(self, text, index):
+        committed = False
         try:
-            iterator, value = fn(), None
+            iterator, value = self.fn(), None
             while True:
                 parser = iterator.send(value)
                 res = parser(text, index)
                 if not res.status:  # this parser failed.
+                    if committed:
+                        _cut_failure(text, res)
                     return res
+                committed = committed or _commits(parser)
                 value, index = res.value, res.index  # iterate
         except StopIteration as stop:
             endval = stop.value
             if isinstance(endval, Parser):
-                return endval(text, index)
+                return self.run_end(endval, text, index, committed)
             else:
                 return Value.success(index, endval)
         except RuntimeError as error:
             stop = error.__cause__
-            if isinstance(stop, StopIteration) and hasattr(stop, "value"): 
+            if isinstance(stop, StopIteration) and hasattr(stop, "value"):
                 endval = stop.value
                 if isinstance(endval, Parser):
-                    return endval(text, index)
+                    return self.run_end(endval, text, index, committed)
                 else:
                     return Value.success(index, endval)
             # not what we want
             raise error from None
-    return generated.desc(fn.__name__)
+
+    @staticmethod
+    def run_end(parser, text, index, committed):
+        res = parser(text, index)
+        if not res.status and committed:
+            _cut_failure(text, res)
+        return res
+
+
+def generate(fn):
+    '''Parser generator. (combinator syntax).'''
+    if isinstance(fn, str):
+        return lambda f: generate(f).desc(fn)
+
+    return wraps(fn)(Generate(fn)).desc(fn.__name__)
 
 
 ##########################################################################
@@ -521,14 +1418,39 @@ def generate(fn):
 ##########################################################################
 
 
-def times(p, mint, maxt=None):
-    '''Repeat a parser between `mint` and `maxt` times. DO AS MUCH MATCH AS IT CAN.
-    Return a list of values.'''
-    maxt = maxt if maxt else mint
+class _Sink(object):
+    '''Stands for the list of values of a repetition, handing every value to
+    the function `sink` instead of keeping it, see `times`.'''
+
+    __slots__ = ('sink', 'count')
 
-    @Parser
-    def times_parser(text, index):
-        cnt, values, res = 0, [], None
+    def __init__(self, sink):
+        self.sink, self.count = sink, 0
+
+    def append(self, value):
+        self.sink(value)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+class Times(Parser):
+    '''`parser` repeated between `mint` and `maxt` times, see `times`.'''
+
+    params, child_params = ('parser', 'mint', 'maxt', 'sink'), ('parser',)
+
+    def __init__(self, parser, mint, maxt, sink=None):
+        self.parser, self.mint, self.maxt, self.sink = parser, mint, maxt, sink
+
+    def __call__(self, text, index, values=None):
+        '''`values` collects the values instead of a new list, see `Fold`.'''
+        if _metering:
+            _step(self, index)
+        p, mint, maxt = self.parser, self.mint, self.maxt
+        if values is None:
+            values = [] if self.sink is None else _Sink(self.sink)
+        cnt, res = 0, None
         while cnt < maxt:
             res = p(text, index)
             if res.status:
@@ -559,59 +1481,103 @@ def times(p, mint, maxt=None):
                     r = p(text, index)
                     if index != r.index:  # report error when the parser cannot success with no text
                         return Value.failure(index, "already meets the end, no enough text")
-        return Value.success(index, values)
-    return times_parser
+        return Value.success(index, values if self.sink is None else len(values))
 
 
-def count(p, n):
+def times(p, mint, maxt=None, sink=None):
+    '''Repeat a parser between `mint` and `maxt` times. DO AS MUCH MATCH AS IT CAN.
+    Return a list of values.
+
+    Given a function `sink`, the values are not kept in a list but handed to
+    `sink` one by one as soon as they are parsed, and the number of values
+    is returned instead, so that long repetitions run in constant memory.
+    The values of a repetition that fails in the end (or is backtracked
+    over) have been handed to `sink` all the same.'''
+    maxt = maxt if maxt else mint
+    return Times(p, mint, maxt, sink)
+
+
+def count(p, n):
     '''`count p n` parses n occurrences of p. If n is smaller or equal to zero,
     the parser equals to return []. Returns a list of n values returned by p.'''
     return times(p, n, n)
 
 
+class Option(Parser):
+    '''`parser` or `default_value`, see `optional`.'''
+
+    params, child_params = ('parser', 'default_value'), ('parser',)
+
+    def __init__(self, parser, default_value=None):
+        self.parser, self.default_value = parser, default_value
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if res.status:
+            return Value.success(res.index, res.value)
+        else:
+            # Return the maybe existing default value without doing anything.
+            return Value.success(index, self.default_value)
+
+
 def optional(p, default_value=None):
     '''`Make a parser as optional. If success, return the result, otherwise return
     default_value silently, without raising any exception. If default_value is not
     provided None is returned instead.
     '''
-    @Parser
-    def optional_parser(text, index):
-        res = p(text, index)
-        if res.status:
-            return Value.success(res.index, res.value)
-        else:
-            # Return the maybe existing default value without doing anything.
-            return Value.success(index, default_value)
-    return optional_parser
+    return Option(p, default_value)
 
 
-def many(p):
+def many(p, sink=None):
     '''Repeat a parser 0 to infinity times. DO AS MUCH MATCH AS IT CAN.
-    Return a list of values.'''
-    return times(p, 0, float('inf'))
+    Return a list of values, or hand them to `sink`, see `times`.'''
+    return times(p, 0, float('inf'), sink)
 
 
-def many1(p):
+def many1(p, sink=None):
     '''Repeat a parser 1 to infinity times. DO AS MUCH MATCH AS IT CAN.
-    Return a list of values.'''
-    return times(p, 1, float('inf'))
+    Return a list of values, or hand them to `sink`, see `times`.'''
+    return times(p, 1, float('inf'), sink)
 
 
-def separated(p, sep, mint, maxt=None, end=None):
-    '''Repeat a parser `p` separated by `s` between `mint` and `maxt` times.
+def _many_str(p, mint):
+    char = p.parser if isinstance(p, Desc) else p
+    if isinstance(char, (Satisfy, OneOf, NoneOf)):
+        scanner = TakeWhile(char, mint)
+        return Desc(scanner, p.description) if p is not char else scanner
+    return times(p, mint, float('inf')).parsecmap(''.join)
 
-    - When `end` is None, a trailing separator is optional.
-    - When `end` is True, a trailing separator is required.
-    - When `end` is False, a trailing separator will not be parsed.
 
-    MATCHES AS MUCH AS POSSIBLE.
+def many_str(p):
+    '''Like `many`, but return the string joined from the values. Runs of
+    characters (`satisfy`, `one_of`, `none_of`) are scanned as one slice of
+    the input, see `take_while`.'''
+    return _many_str(p, 0)
 
-    Return list of values returned by `p`.'''
-    maxt = maxt if maxt else mint
 
-    @Parser
-    def sep_parser(text, index):
-        cnt, values_index, values, res = 0, index, [], None
+def many1_str(p):
+    '''Like `many1`, but return the string joined from the values, see
+    `many_str`.'''
+    return _many_str(p, 1)
+
+
+class Separated(Parser):
+    '''`parser` repeated between `mint` and `maxt` times, separated by `sep`,
+    see `separated`.'''
+
+    params, child_params = ('parser', 'sep', 'mint', 'maxt', 'end', 'sink'), ('parser', 'sep')
+
+    def __init__(self, parser, sep, mint, maxt, end=None, sink=None):
+        self.parser, self.sep, self.mint, self.maxt, self.end, self.sink = parser, sep, mint, maxt, end, sink
+
+    def __call__(self, text, index, values=None):
+        '''`values` collects the values instead of a new list, see `Fold`.'''
+        if _metering:
+            _step(self, index)
+        p, sep, mint, maxt, end = self.parser, self.sep, self.mint, self.maxt, self.end
+        if values is None:
+            values = [] if self.sink is None else _Sink(self.sink)
+        cnt, values_index, res = 0, index, None
         while cnt < maxt:
             res = p(text, index)
             if res.status:
@@ -622,7 +1588,7 @@ def separated(p, sep, mint, maxt=None, end=None):
                 if cnt < mint:
                     return res  # error: need more elements, but no `p` found.
                 else:
-                    return Value.success(values_index, values)
+                    return Value.success(values_index, values if self.sink is None else len(values))
 
             # consume the sep
             res = sep(text, index)
@@ -636,80 +1602,419 @@ def separated(p, sep, mint, maxt=None, end=None):
                 else:
                     if end is True:
                         # step back
-                        return Value.success(values_index, values)
+                        return Value.success(values_index, values if self.sink is None else len(values))
                     else:
                         values_index = current_value_index
                         values.append(current_value)
-                        return Value.success(values_index, values)
+                        return Value.success(values_index, values if self.sink is None else len(values))
 
             # record the new value
             values_index = current_value_index
             values.append(current_value)
-        return Value.success(values_index, values)
-    return sep_parser
+        return Value.success(values_index, values if self.sink is None else len(values))
 
 
-def sepBy(p, sep):
+def separated(p, sep, mint, maxt=None, end=None, sink=None):
+    '''Repeat a parser `p` separated by `s` between `mint` and `maxt` times.
+
+    - When `end` is None, a trailing separator is optional.
+    - When `end` is True, a trailing separator is required.
+    - When `end` is False, a trailing separator will not be parsed.
+
+    MATCHES AS MUCH AS POSSIBLE.
+
+    Return list of values returned by `p`, or hand them to `sink`, see
+    `times`.'''
+    maxt = maxt if maxt else mint
+    return Separated(p, sep, mint, maxt, end, sink)
+
+
+def sepBy(p, sep, sink=None):
     '''`sepBy(p, sep)` parses zero or more occurrences of p, separated by `sep`.
     Returns a list of values returned by `p`.'''
-    return separated(p, sep, 0, maxt=float('inf'), end=False)
+    return separated(p, sep, 0, maxt=float('inf'), end=False, sink=sink)
 
 
-def sepBy1(p, sep):
+def sepBy1(p, sep, sink=None):
     '''`sepBy1(p, sep)` parses one or more occurrences of `p`, separated by
     `sep`. Returns a list of values returned by `p`.'''
-    return separated(p, sep, 1, maxt=float('inf'), end=False)
+    return separated(p, sep, 1, maxt=float('inf'), end=False, sink=sink)
 
 
-def endBy(p, sep):
+def endBy(p, sep, sink=None):
     '''`endBy(p, sep)` parses zero or more occurrences of `p`, separated and
     ended by `sep`. Returns a list of values returned by `p`.'''
-    return separated(p, sep, 0, maxt=float('inf'), end=True)
+    return separated(p, sep, 0, maxt=float('inf'), end=True, sink=sink)
 
 
-def endBy1(p, sep):
+def endBy1(p, sep, sink=None):
     '''`endBy1(p, sep) parses one or more occurrences of `p`, separated and
     ended by `sep`. Returns a list of values returned by `p`.'''
-    return separated(p, sep, 1, maxt=float('inf'), end=True)
+    return separated(p, sep, 1, maxt=float('inf'), end=True, sink=sink)
 
 
-def sepEndBy(p, sep):
+def sepEndBy(p, sep, sink=None):
     '''`sepEndBy(p, sep)` parses zero or more occurrences of `p`, separated and
     optionally ended by `sep`. Returns a list of
     values returned by `p`.'''
-    return separated(p, sep, 0, maxt=float('inf'))
+    return separated(p, sep, 0, maxt=float('inf'), sink=sink)
 
 
-def sepEndBy1(p, sep):
+def sepEndBy1(p, sep, sink=None):
     '''`sepEndBy1(p, sep)` parses one or more occurrences of `p`, separated and
     optionally ended by `sep`. Returns a list of values returned by `p`.'''
-    return separated(p, sep, 1, maxt=float('inf'))
+    return separated(p, sep, 1, maxt=float('inf'), sink=sink)
+
+
+class _Folding(object):
+    '''Stands for the list of values of a repetition, folding every value
+    into `value` by `step` instead of keeping it, see `Fold`.'''
+
+    __slots__ = ('step', 'value')
+
+    def __init__(self, step, value):
+        self.step, self.value = step, value
+
+    def append(self, value):
+        self.value = self.step(self.value, value)
+
+
+class Fold(Parser):
+    '''The values of the repetition `parser` (a `Times` or `Separated`) folded
+    by `step` into the value of `init`, see `many_fold`.'''
+
+    params, child_params = ('init', 'parser', 'step'), ('init', 'parser')
+
+    def __init__(self, init, parser, step):
+        self.init, self.parser, self.step = init, parser, step
+
+    def __call__(self, text, index):
+        res = self.init(text, index)
+        if not res.status:
+            return res
+        res = self.parser(text, res.index, _Folding(self.step, res.value))
+        return Value.success(res.index, res.value.value) if res.status else res
+
+
+def many_fold(p, init, step):
+    '''Repeat a parser 0 to infinity times, like `many`, but fold the values
+    into `init` by `step` (`step(accumulation, value)` returns the new
+    accumulation) as soon as they are parsed, and return the accumulation
+    instead of a list.'''
+    return Fold(success_with(init), times(p, 0, float('inf')), step)
+
+
+def sepBy_fold(p, sep, init, step):
+    '''Like `sepBy(p, sep)`, but fold the values of `p` into `init` by `step`
+    like `many_fold`.'''
+    return Fold(success_with(init), sepBy(p, sep), step)
+
+
+def _apply_left(accumulation, operation):
+    fn, value = operation
+    return fn(accumulation, value)
+
+
+def _apply_right(first, rest):
+    if not rest:
+        return first
+    accumulation = rest[-1][1]
+    for i in range(len(rest) - 1, 0, -1):
+        accumulation = rest[i][0](rest[i - 1][1], accumulation)
+    return rest[0][0](first, accumulation)
+
+
+def chainl1(p, op):
+    '''`chainl1(p, op)` parses one or more occurrences of `p`, separated by
+    `op`, and returns the value of applying the functions returned by `op`
+    from left to right: `x op y op z` is `op(op(x, y), z)`. Each value is
+    folded in as soon as it is parsed. Eliminates the left recursion of
+    grammars like `expr = expr op term | term`.'''
+    return Fold(p, many(op + p), _apply_left)
+
+
+def chainr1(p, op):
+    '''`chainr1(p, op)` parses one or more occurrences of `p`, separated by
+    `op`, and returns the value of applying the functions returned by `op`
+    from right to left: `x op y op z` is `op(x, op(y, z))`.'''
+    return (p + many(op + p)).parsecmap(_apply_right, star=True)
 
 
 ##########################################################################
 # Text.Parsec.Char
 ##########################################################################
 
-def satisfy(predicate, failure=None):
-    @Parser
-    def satisfy_parser(text, index=0):
-        if index < len(text) and predicate(text[index]):
+class Satisfy(Parser):
+    '''A char satisfying `predicate`, see `satisfy`.'''
+
+    params = ('predicate', 'failure')
+
+    def __init__(self, predicate, failure=None):
+        self.predicate, self.failure = predicate, failure
+
+    def __call__(self, text, index=0):
+        if index < len(text) and self.predicate(text[index]):
+            return Value.success(index + 1, text[index])
+        else:
+            return Value.failure(index, self.failure or "does not satisfy predicate")
+
+
+class OneOf(Parser):
+    '''A char in `chars`, see `one_of`.'''
+
+    params = ('chars',)
+
+    def __init__(self, chars):
+        self.chars = chars
+        self.failure = 'one of {}'.format(chars)
+
+    def __call__(self, text, index=0):
+        if index < len(text) and text[index] in self.chars:
             return Value.success(index + 1, text[index])
         else:
-            return Value.failure(index, failure or "does not satisfy predicate")
-    return satisfy_parser
+            return Value.failure(index, self.failure)
+
+
+class NoneOf(Parser):
+    '''A char not in `chars`, see `none_of`.'''
+
+    params = ('chars',)
+
+    def __init__(self, chars):
+        self.chars = chars
+        self.failure = 'none of {}'.format(chars)
+
+    def __call__(self, text, index=0):
+        if index < len(text) and text[index] not in self.chars:
+            return Value.success(index + 1, text[index])
+        else:
+            return Value.failure(index, self.failure)
+
+
+class Eof(Parser):
+    '''The end of the input, see `eof`.'''
+
+    def __init__(self):
+        pass
+
+    def __call__(self, text, index=0):
+        if index >= len(text):
+            return Value.success(index, None)
+        else:
+            return Value.failure(index, 'EOF')
+
+
+class Literal(Parser):
+    '''The string `s`, and then what the regular expression `skips` matches,
+    see `string`.'''
+
+    params = ('s',)
+
+    def __init__(self, s, skips=None):
+        self.s, self.skips = s, skips
+        if skips is not None:  # left out of `args` (and the `repr`) otherwise.
+            self.params = ('s', 'skips')
+        self.in_bytes = isinstance(s, (bytes, bytearray))
+
+    def __call__(self, text, index=0):
+        s = self.s
+        slen, tlen = len(s), len(text)
+        buffer = _byte_buffer(text) if self.in_bytes else None
+        if buffer is not None:
+            prefix = buffer[index:index + slen]
+        else:
+            prefix = ''.join(text[index:index + slen])
+        if prefix == s:
+            if self.skips is not None:
+                return Value.success(self.skips.match(text, index + slen).end(), s)
+            return Value.success(index + slen, s)
+        else:
+            matched = 0
+            while matched < slen and index + matched < tlen and text[index + matched] == s[matched]:
+                matched = matched + 1
+            return Value.failure(index + matched, s)
+
+
+class Regex(Parser):
+    '''A match of the compiled regular expression `exp`, and then what the
+    regular expression `skips` matches, see `regex`.'''
+
+    params = ('exp',)
+
+    def __init__(self, exp, skips=None):
+        self.exp, self.skips = exp, skips
+        if skips is not None:
+            self.params = ('exp', 'skips')
+        # both in one match when they can be, `skips` being the group after
+        # the groups of `exp`.
+        self.combined = None if skips is None else _combined(exp, skips)
+
+    def __call__(self, text, index):
+        if not isinstance(text, str):
+            return Value.failure(index, "`regex` combinator only accepts string as input, "
+                                 "but got type {!r}, value is {!r}".format(type(text), text))
+
+        if self.combined is not None:
+            match = self.combined.match(text, index)
+            if match:
+                return Value.success(match.end(), text[index:match.start(self.exp.groups + 1)])
+            return Value.failure(index, self.exp.pattern)
+        match = self.exp.match(text, index)
+        if match:
+            if self.skips is not None:
+                return Value.success(self.skips.match(text, match.end()).end(), match.group(0))
+            return Value.success(match.end(), match.group(0))
+        else:
+            return Value.failure(index, self.exp.pattern)
+
+
+def _combined(exp, skip):
+    '''`exp` and then `skip` as one regular expression, if they can be.'''
+    if type(exp.pattern) is not type(skip.pattern) or exp.flags != skip.flags:
+        return None
+    template = '(?:%s)(%s)' if isinstance(exp.pattern, str) else b'(?:%s)(%s)'
+    try:
+        return _compile(template % (exp.pattern, skip.pattern), exp.flags)
+    except re.error:  # e.g. the same named group in both, or inline flags.
+        return None
+
+
+class TakeWhile(Parser):
+    '''The longest run (of at least `mint`) of matches of `parser`, as one
+    slice of the input, or None if `discard`, see `take_while`.'''
+
+    params, child_params = ('parser', 'mint', 'discard'), ('parser',)
+
+    def __init__(self, parser, mint=0, discard=False):
+        self.parser, self.mint, self.discard = parser, mint, discard
+        # regular expressions doing the same scan in C, over strings and over
+        # buffers of bytes, when there are some.
+        self.pattern = _scan_pattern(parser)
+        self.byte_pattern = _scan_byte_pattern(parser)
+
+    def __call__(self, text, index):
+        p, end, n = self.parser, index, len(text)
+        scan = self.pattern is not None and isinstance(text, str)
+        buffer = None if scan or self.byte_pattern is None else _byte_buffer(text)
+        if scan:
+            end = self.pattern.match(text, index).end()
+        elif buffer is not None:
+            end = self.byte_pattern.match(buffer, index).end()
+        elif isinstance(p, Satisfy):
+            predicate = p.predicate
+            while end < n and predicate(text[end]):
+                end = end + 1
+        elif isinstance(p, (OneOf, NoneOf)):
+            chars, expected = p.chars, isinstance(p, OneOf)
+            while end < n and (text[end] in chars) is expected:
+                end = end + 1
+        else:
+            return self.repeat(text, index)
+        if end - index < self.mint:
+            return p(text, end)
+        return Value.success(end, None if self.discard else text[index:end])
+
+    def repeat(self, text, index):
+        '''Run any other `parser` as long as it consumes input.'''
+        p, end, cnt = self.parser, index, 0
+        while True:
+            res = p(text, end)
+            if not res.status or res.index == end:
+                break
+            end, cnt = res.index, cnt + 1
+        if cnt < self.mint and not res.status:
+            return res
+        return Value.success(end, None if self.discard else text[index:end])
+
+
+_scan_predicates = {str.isspace: r'\s*', str.isdecimal: r'\d*'}
+
+
+def _scan_pattern(p):
+    if isinstance(p, Satisfy) and isinstance(p.predicate, type(str.isspace)) and p.predicate in _scan_predicates:
+        return _compile(_scan_predicates[p.predicate])
+    if isinstance(p, (OneOf, NoneOf)) and isinstance(p.chars, str) and p.chars:
+        chars = ''.join(re.escape(c) for c in p.chars)
+        return _compile(('[{}]*' if isinstance(p, OneOf) else '[^{}]*').format(chars))
+    return None
+
+
+def _byte_class(p):
+    '''The set of byte values the character parser `p` accepts, if it is
+    one of some bytes (or none of them), or None: predicates are left to be
+    called on the bytes of the input, one by one.'''
+    if isinstance(p, (OneOf, NoneOf)) and isinstance(p.chars, (bytes, bytearray)):
+        accepted = set(p.chars)
+        return accepted if isinstance(p, OneOf) else set(range(256)) - accepted
+    return None
+
+
+def _scan_byte_pattern(p):
+    accepted = _byte_class(p)
+    if accepted is None:
+        return None
+    return _compile(b'[' + b''.join(re.escape(bytes([b])) for b in sorted(accepted)) + b']*'
+                    if accepted else b'')
+
+
+def _byte_buffer(text):
+    '''`text` as something `re` can scan, if it is a flat buffer of bytes:
+    `bytes`, `bytearray`, a `memoryview`, an `mmap` or a NumPy array of
+    `uint8`.'''
+    if isinstance(text, (bytes, bytearray)):
+        return text
+    if isinstance(text, (memoryview, mmap.mmap)) or hasattr(text, '__array_interface__'):
+        try:
+            view = memoryview(text)
+        except TypeError:
+            return None
+        if view.ndim == 1 and view.itemsize == 1 and view.c_contiguous and view.format in 'Bbc':
+            return view
+    return None
+
+
+class TakeUntil(Parser):
+    '''The input up to the next occurrence of the string `s`, see `take_until`.'''
+
+    params = ('s',)
+
+    def __init__(self, s):
+        self.s = s
+
+    def __call__(self, text, index):
+        s = self.s
+        if isinstance(text, str):
+            end = text.find(s, index)
+        else:
+            buffer = _byte_buffer(text) if isinstance(s, (bytes, bytearray)) else None
+            if buffer is not None:
+                found = _compile(re.escape(bytes(s))).search(buffer, index)
+                end = -1 if found is None else found.start()
+            else:
+                end = next((i for i in range(index, len(text) - len(s) + 1)
+                            if ''.join(text[i:i + len(s)]) == s), -1)
+        if end < 0:
+            return Value.failure(index, s)
+        return Value.success(end, text[index:end])
+
+
+def satisfy(predicate, failure=None):
+    return Satisfy(predicate, failure)
+
+def _any_char(_):
+    return True
 
 def any():
     '''Parses a arbitrary character.'''
-    return satisfy(lambda _: True, 'a random char')
+    return satisfy(_any_char, 'a random char')
 
 def one_of(s):
     '''Parses a char from specified string.'''
-    return satisfy(lambda c: c in s, 'one of {}'.format(s))
+    return OneOf(s)
 
 def none_of(s):
     '''Parses a char NOT from specified string.'''
-    return satisfy(lambda c: c not in s, 'none of {}'.format(s))
+    return NoneOf(s)
 
 def space():
     '''Parses a whitespace character.'''
@@ -717,7 +2022,7 @@ def space():
 
 def spaces():
     '''Parses zero or more whitespace characters.'''
-    return many(space())
+    return take_while(str.isspace).parsecmap(list)
 
 def letter():
     '''Parse a letter in alphabet.'''
@@ -729,46 +2034,118 @@ def digit():
 
 def eof():
     '''Parses EOF flag of a string.'''
-    @Parser
-    def eof_parser(text, index=0):
-        if index >= len(text):
-            return Value.success(index, None)
-        else:
-            return Value.failure(index, 'EOF')
-    return eof_parser
+    return Eof()
 
 def string(s):
-    '''Parses a string.'''
-    @Parser
-    def string_parser(text, index=0):
-        slen, tlen = len(s), len(text)
-        if ''.join(text[index:index + slen]) == s:
-            return Value.success(index + slen, s)
-        else:
-            matched = 0
-            while matched < slen and index + matched < tlen and text[index + matched] == s[matched]:
-                matched = matched + 1
-            return Value.failure(index + matched, s)
-    return string_parser
+    '''Parses a string (and what is skipped after it, see `skipping`).'''
+    return Literal(s, _lexing.skip)
+
+
+_regexes = {}  # compiled regular expressions, by pattern and flags
+_MAX_REGEXES = 1024
+
+
+def _compile(pattern, flags=0):
+    '''`re.compile`, with a cache of its own that the other regular
+    expressions of a program do not evict grammars from.'''
+    key = (pattern, flags)
+    exp = _regexes.get(key)
+    if exp is None:
+        if len(_regexes) >= _MAX_REGEXES:
+            try:  # the oldest goes, as in `re`.
+                del _regexes[next(iter(_regexes))]
+            except (StopIteration, RuntimeError, KeyError):
+                pass
+        exp = _regexes[key] = re.compile(pattern, flags)
+    return exp
 
 
 def regex(exp, flags=0):
-    '''Parses according to a regular expression.'''
+    '''Parses according to a regular expression (and what is skipped after
+    it, see `skipping`).'''
     if isinstance(exp, str):
-        exp = re.compile(exp, flags)
+        exp = _compile(exp, flags)
+    return Regex(exp, _lexing.skip)
 
-    @Parser
-    def regex_parser(text, index):
-        if not isinstance(text, str):
-            return Value.failure(index, "`regex` combinator only accepts string as input, "
-                                 "but got type {!r}, value is {!r}".format(type(text), text))
+def keyword(word):
+    '''Parses the string `word` unless a letter, digit or '_' follows it
+    (and what is skipped after it, see `skipping`), e.g. `keyword('if')`
+    does not parse the start of "iffy".'''
+    return regex(re.escape(word) + r'(?!\w)')
 
-        match = exp.match(text, index)
-        if match:
-            return Value.success(match.end(), match.group(0))
-        else:
-            return Value.failure(index, exp.pattern)
-    return regex_parser
+
+class _Lexing(threading.local):
+    '''What the tokens built by every thread skip after themselves.'''
+
+    skip = None
+
+
+_lexing = _Lexing()
+
+
+class Skipping(object):
+    '''A block building tokens that skip `skip`, see `skipping`.'''
+
+    def __init__(self, skip):
+        self.skip, self.outer = skip, []
+        # the parser skipping it anywhere else, e.g. before the first token.
+        self.parser = SuccessWith(None) if skip is None else Regex(skip)
+
+    def __enter__(self):
+        self.outer.append(_lexing.skip)
+        _lexing.skip = self.skip
+        return self.parser
+
+    def __exit__(self, *exc_info):
+        _lexing.skip = self.outer.pop()
+
+
+def skipping(pattern, flags=0):
+    '''Make the tokens (`string`, `regex` and `keyword`) built in a `with`
+    block skip whatever the regular expression `pattern` matches right after
+    them, e.g. whitespace and comments:
+
+        with skipping(r'\\s+|;[^\\n]*') as ignore:
+            lparen, rparen = string('('), string(')')
+            number = regex(r'\\d+').parsecmap(int)
+            program = ignore >> many(number | lparen | rparen)
+
+    `pattern` matches one piece of what is skipped, and is repeated. The
+    skipping is done by the tokens themselves, in the same regular
+    expression as a `regex` when possible, rather than by parsers added
+    after them as `p << many(whitespace | comment)` would do. The block
+    gives the parser skipping `pattern` anywhere else, e.g. before the first
+    token. `skipping(None)` builds tokens that do not skip, e.g. inside of
+    string literals.'''
+    if pattern is None:
+        return Skipping(None)
+    if not isinstance(pattern, (str, bytes)):
+        pattern, flags = pattern.pattern, pattern.flags
+    return Skipping(_compile(('(?:%s)*' if isinstance(pattern, str) else b'(?:%s)*') % pattern, flags))
+
+def _char_parser(predicate):
+    return satisfy(predicate) if callable(predicate) else one_of(predicate)
+
+def take_while(predicate):
+    '''Parses the longest run of characters satisfying `predicate`, or in the
+    string (or set) `predicate`, returned as one slice of the input.
+
+    Buffers of bytes (`bytes`, `bytearray`, `memoryview` or NumPy `uint8`
+    arrays) are scanned in C when `predicate` is bytes.'''
+    return TakeWhile(_char_parser(predicate), 0)
+
+def take_while1(predicate):
+    '''Like `take_while`, but fails unless there is at least one character.'''
+    return TakeWhile(_char_parser(predicate), 1)
+
+def skip_while(predicate):
+    '''Like `take_while`, but returns None.'''
+    return TakeWhile(_char_parser(predicate), 0, discard=True)
+
+def take_until(s):
+    '''Parses the input up to (but not including) the next occurrence of
+    the string `s`, which must occur.'''
+    return TakeUntil(s)
 
 def newline():
     return string("\n").desc("LF")
@@ -779,68 +2156,426 @@ def crlf():
 def end_of_line():
     return (newline() | crlf()).desc("EOL")
 
+##########################################################################
+# Binary data
+#
+# Fixed-width fields (by `struct`) and slices of buffers of bytes: `bytes`,
+# `bytearray`, `memoryview` or `mmap`. Slices are `memoryview`s of the input,
+# so, like a `Span`, they keep all of it alive (and a `bytearray` or `mmap`
+# cannot be resized or closed) while they are held.
+##########################################################################
+
+class Unpack(Parser):
+    '''The fields of the `struct` format `fmt`, as a tuple or, if `single`,
+    the only one, see `struct_fmt`.'''
+
+    params = ('fmt', 'single')
+
+    def __init__(self, fmt, single=False):
+        self.fmt, self.single = fmt, single
+        self.struct = struct.Struct(fmt)
+
+    def __call__(self, text, index):
+        s = self.struct
+        if len(text) - index < s.size:
+            return Value.failure(index, '{} bytes'.format(s.size))
+        try:
+            fields = s.unpack_from(text, index)
+        except TypeError:
+            return Value.failure(index, "`struct_fmt` combinator only accepts buffers of bytes as input, "
+                                 "but got type {!r}".format(type(text)))
+        return Value.success(index + s.size, fields[0] if self.single else fields)
+
+    def __getstate__(self):
+        return dict(self.__dict__, struct=None)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, struct=struct.Struct(state['fmt']))
+
+
+def _view(text, index, end):
+    '''`text[index:end]`, a `memoryview` rather than a copy for buffers.'''
+    if isinstance(text, (bytes, bytearray, mmap.mmap)):
+        return memoryview(text)[index:end]
+    return text[index:end]
+
+
+class Take(Parser):
+    '''The next `n` items of the input, or all the rest if `n` is None, see
+    `take`.'''
+
+    params = ('n',)
+
+    def __init__(self, n=None):
+        self.n = n
+
+    def __call__(self, text, index):
+        end = len(text) if self.n is None else index + self.n
+        if end > len(text):
+            return Value.failure(index, '{} bytes'.format(self.n))
+        return Value.success(end, _view(text, index, end))
+
+
+class LengthPrefixed(Parser):
+    '''`body` run on as many bytes as `prefix` gives, see `length_prefixed`.'''
+
+    params = child_params = ('prefix', 'body')
+
+    def __init__(self, prefix, body):
+        self.prefix, self.body = prefix, body
+
+    def __call__(self, text, index):
+        res = self.prefix(text, index)
+        if not res.status:
+            return res
+        start, end = res.index, res.index + res.value
+        if res.value < 0 or end > len(text):
+            return Value.failure(start, '{} bytes'.format(res.value))
+        res = self.body(_view(text, start, end), 0)
+        if not res.status:
+            return Value.failure(start + res.index, res.expected)
+        return Value.success(end, res.value)
+
+
+def struct_fmt(fmt):
+    '''Parses the fields of the `struct` format `fmt` (e.g. '<IHH') into a
+    tuple, from a buffer of bytes.'''
+    return Unpack(fmt)
+
+def take(n=None):
+    '''Parses the next `n` bytes (or items of other inputs), or all the rest
+    of the input if `n` is None. Buffers of bytes give a `memoryview` of the
+    input, without copying it.'''
+    if n is not None and n < 0:
+        raise ValueError('cannot take a negative number of bytes, {}'.format(n))
+    return Take(n)
+
+def length_prefixed(prefix, body=None):
+    '''Parses a number of bytes by `prefix` (e.g. `u32le`) and then `body` on
+    just that many bytes, as an input of its own: `body` cannot read past
+    them, and fails at an index of the whole input. By default, the bytes are
+    returned as with `take`. To insist that `body` reads all of them, end it
+    with `eof()`.'''
+    return LengthPrefixed(prefix, Take() if body is None else body)
+
+# the `struct` formats of the fixed-width fields: unsigned or signed integers
+# and floating point numbers of 8 to 64 bits, little endian (le) or big endian
+# (be). The module level parsers `u8`, `u16le`, ... are built on first access,
+# as those of numbers are (see `_builders`).
+_fields = {
+    'u8': 'B', 'i8': 'b',
+    'u16le': '<H', 'u16be': '>H', 'i16le': '<h', 'i16be': '>h',
+    'u32le': '<I', 'u32be': '>I', 'i32le': '<i', 'i32be': '>i',
+    'u64le': '<Q', 'u64be': '>Q', 'i64le': '<q', 'i64be': '>q',
+    'f32le': '<f', 'f32be': '>f', 'f64le': '<d', 'f64be': '>d',
+}
+
 ##########################################################################
 # Useful utility parsers
 ##########################################################################
 
-def success_with(value, advance=False):
-    return Parser(lambda _, index: Value.success(index + int(advance), value))
+class SuccessWith(Parser):
+    '''Always succeed with `value`, see `success_with`.'''
 
-def fail_with(message):
-    return Parser(lambda _, index: Value.failure(index, message))
+    params = ('value', 'advance')
 
-def exclude(p, exclude):
-    '''Fails parser p if parser `exclude` matches'''
-    @Parser
-    def exclude_parser(text, index):
-        res = exclude(text, index)
+    def __init__(self, value, advance=False):
+        self.value, self.advance = value, advance
+
+    def __call__(self, text, index):
+        return Value.success(index + int(self.advance), self.value)
+
+
+class FailWith(Parser):
+    '''Always fail with `message`, see `fail_with`.'''
+
+    params = ('message',)
+
+    def __init__(self, message):
+        self.message = message
+
+    def __call__(self, text, index):
+        return Value.failure(index, self.message)
+
+
+class Exclude(Parser):
+    '''`parser` unless `exclude` matches, see `exclude`.'''
+
+    params = child_params = ('parser', 'exclude')
+
+    def __init__(self, parser, exclude):
+        self.parser, self.exclude = parser, exclude
+
+    def __call__(self, text, index):
+        res = self.exclude(text, index)
         if res.status:
             return Value.failure(index, 'something other than {}'.format(res.value))
         else:
-            return p(text, index)
-    return exclude_parser
+            return self.parser(text, index)
 
-def lookahead(p):
-    '''Parses without consuming'''
-    @Parser
-    def lookahead_parser(text, index):
-        res = p(text, index)
+
+class Lookahead(Parser):
+    '''`parser` without consuming input, see `lookahead`.'''
+
+    params = child_params = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
         if res.status:
             return Value.success(index, res.value)
         else:
             return Value.failure(index, res.expected)
-    return lookahead_parser
 
 
-def unit(p):
-    '''Converts a parser into a single unit. Only consumes input if the parser succeeds'''
-    @Parser
-    def unit_parser(text, index):
-        res = p(text, index)
+class Unit(Parser):
+    '''`parser` consuming input only on success, see `unit`.'''
+
+    params = child_params = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
         if res.status:
             return Value.success(res.index, res.value)
         else:
             return Value.failure(index, res.expected)
-    return unit_parser
+
+
+class Viewed(Parser):
+    '''The match of `parser` as a `Span`, see `as_view`.'''
+
+    params = child_params = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+        # a regular expression is matched without copying the match out.
+        self.exp = parser.exp if type(parser) is Regex and parser.skips is None else None
+
+    def __call__(self, text, index):
+        if self.exp is not None and isinstance(text, str):
+            match = self.exp.match(text, index)
+            if match is None:
+                return Value.failure(index, self.exp.pattern)
+            return Value.success(match.end(), Span(text, index, match.end()))
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        return Value.success(res.index, Span(text, index, res.index))
+
+
+class _Tables(threading.local):
+    '''The intern table of every thread, for the input it was filled from.'''
+
+    table, text_id = None, None
+
+
+class Interned(Parser):
+    '''The values of `parser`, equal ones being the same object, see
+    `interned`.'''
+
+    params, child_params = ('parser', 'max_size'), ('parser',)
+
+    def __init__(self, parser, max_size=65536):
+        self.parser, self.max_size = parser, max_size
+        self.tables = _Tables()
+
+    def intern(self, text, value):
+        tables = self.tables
+        if id(text) != tables.text_id:
+            # a new input: the values of the last one are let go.
+            tables.table, tables.text_id = {}, id(text)
+        table = tables.table
+        try:
+            return table[value]
+        except KeyError:
+            if len(table) < self.max_size:
+                table[value] = value
+            return value
+
+    def __call__(self, text, index):
+        res = self.parser(text, index)
+        if not res.status:
+            return res
+        return Value.success(res.index, self.intern(text, res.value))
+
+    def __getstate__(self):
+        return dict(self.__dict__, tables=None)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, tables=_Tables())
+
+
+class Between(Parser):
+    '''`parser` between `open` and `close`, see `between`.'''
+
+    params = child_params = ('open', 'close', 'parser')
+
+    def __init__(self, open, close, parser):
+        self.open, self.close, self.parser = open, close, parser
+        self.cut_at = _cut_position((open, parser, close))
+
+    def __call__(self, text, index):
+        if self.cut_at is not None:
+            res, values = _call_with_cut((self.open, self.parser, self.close), self.cut_at, text, index)
+            return Value.success(res.index, values[1]) if res.status else res
+        res = self.open(text, index)
+        if not res.status:
+            return res
+        res = self.parser(text, res.index)
+        if not res.status:
+            return res
+        end = self.close(text, res.index)
+        return Value.success(end.index, res.value) if end.status else end
+
+
+class Forward(Parser):
+    '''A placeholder for a parser defined later with `define()`, so that a
+    grammar may refer to itself, see `forward_declare`.'''
+
+    params, child_params = ('parser',), ('parser',)
+    shared = False  # `define()` changes it.
+
+    def __init__(self, parser=None):
+        self.parser = parser
+
+    def __repr__(self):
+        # the definition usually refers back to this parser.
+        return 'Forward()'
+
+    @property
+    def children(self):
+        return () if self.parser is None else (self.parser,)
+
+    def define(self, parser):
+        '''Define this parser as `parser`, once.'''
+        if self.parser is not None:
+            raise ValueError('the forward declared parser is already defined')
+        self.parser = parser
+        return self
+
+    def __call__(self, text, index):
+        if self.parser is None:
+            raise ValueError('the forward declared parser is used before being defined')
+        if _metering:
+            return _metered(self, self.parser, text, index)
+        return self.parser(text, index)
+
+
+class Cut(Parser):
+    '''Succeeds without consuming input, and commits the parsers running it
+    in a sequence, see `cut`.'''
+
+    def __init__(self):
+        pass
+
+    def __call__(self, text, index):
+        return Value.success(index, None)
+
+
+def _commits(p):
+    '''Whether a failure after `p` in a sequence is a hard error.'''
+    while isinstance(p, (Desc, Map, Result)):
+        p = p.parser
+    return isinstance(p, Cut) or getattr(p, 'cut_at', None) is not None
+
+
+def _cut_position(parsers):
+    '''The position of the first of a sequence of parsers that commits.'''
+    return next((i for i, p in enumerate(parsers) if _commits(p)), None)
+
+
+def _cut_failure(text, res):
+    raise ParseError(res.expected, text, res.index)
+
+
+def _call_with_cut(parsers, cut_at, text, index):
+    '''Run `parsers` one after another, failures after the parser at
+    `cut_at` being hard errors. Returns the last result and the values.'''
+    values = []
+    for i, p in enumerate(parsers):
+        res = p(text, index)
+        if not res.status:
+            if i > cut_at:
+                _cut_failure(text, res)
+            return res, values
+        values.append(res.value)
+        index = res.index
+    return res, values
+
+
+def success_with(value, advance=False):
+    return SuccessWith(value, advance)
+
+def fail_with(message):
+    return FailWith(message)
+
+def exclude(p, exclude):
+    '''Fails parser p if parser `exclude` matches'''
+    return Exclude(p, exclude)
+
+def lookahead(p):
+    '''Parses without consuming'''
+    return Lookahead(p)
+
+
+def unit(p):
+    '''Converts a parser into a single unit. Only consumes input if the parser succeeds'''
+    return Unit(p)
+
+def as_view(p):
+    '''Return where `p` matches as a `Span` of the input rather than the value
+    of `p`: the matched text is only copied out of the input by `str(span)`
+    or `span.fragment`. A `regex` is matched without taking its match at all.
+    The span keeps the whole input alive, so this saves memory on long
+    matches (e.g. string literals) when most of them are never looked at.'''
+    return Viewed(p)
+
+def interned(p, max_size=65536):
+    '''Return the same object for equal values of `p` (which must be
+    hashable) while parsing an input, e.g. for the keys of records or the
+    identifiers of a program, of which a large result would otherwise hold
+    many copies. At most `max_size` distinct values are kept in the table of
+    each thread, which is emptied when the parser is run on another input.'''
+    return Interned(p, max_size)
 
 def between(open, close, parser):
-    @generate
-    def between_parser():
-        yield open
-        results = yield parser
-        yield close
-        return results
-    return between_parser
+    return Between(open, close, parser).desc('between_parser')
+
+def forward_declare():
+    '''Declare a parser to be defined later, to build recursive grammars:
+
+        expr = forward_declare()
+        expr.define(number | between(string('('), string(')'), many(expr)))
+    '''
+    return Forward()
+
+def cut():
+    '''Commit to the current branch of the grammar: once the parsers before
+    the cut in a sequence (`>>`, `+`, `<<`, `<`, `>=`, `between` or the body
+    of `generate`) have succeeded, a failure of the rest of the sequence is
+    raised as a `ParseError` at once, instead of letting `^`, `|`, `many`,
+    `optional` etc. try something else from an earlier position.
+
+    Such a failure ends the parse, so no parser ever goes back before the
+    input a cut has been passed at.'''
+    return Cut()
 
 def fix(fn):
-    '''Allow recursive parser using the Y combinator trick.
+    '''Allow recursive parser: `fn` is given the parser it returns.
 
-       Note that this version still yields the stack overflow problem, and will be fixed
-       in later version.
+       The parser is built once, see `forward_declare`.
 
        See also: https://github.com/sighingnow/parsec.py/issues/39.
     '''
-    return (lambda x: x(x))(lambda y: fn(lambda *args: y(y)(*args)))
+    forward = Forward()
+    parser = fn(forward)
+    forward.define(parser if isinstance(parser, Parser) else Parser(parser))
+    return parser
 
 def validate(predicate):
     def validator(value):
@@ -850,32 +2585,856 @@ def validate(predicate):
             return fail_with(f"{value} does not satisfy the given predicate {predicate}")
     return validator
 
+
 ##########################################################################
-# Text.Parsec.Number
+# Text.Parsec.Expr
+#
+# `build_expression_parser` turns a table of prefix, infix and postfix
+# operators, from the tightest binding level to the loosest, into a parser
+# of expressions. Rather than one parser per level, it climbs precedences:
+# after every operand, a single choice over all operators (dispatched on the
+# next character when possible, see `optimize`) finds the next operator and
+# its level, so that parsing a term costs the same however many levels the
+# table has.
 ##########################################################################
 
-sign = string("-").result(operator.neg).desc("'-'") | optional(string("+").desc("'+'")).result(lambda x: x)
 
-def number(base, digit):
-    return many1(digit).parsecmap(
-        lambda digits: reduce(lambda accumulation, digit: accumulation * base + int(digit, base), digits, 0),
-    )
+class Infix(namedtuple('Infix', 'parser assoc')):
+    '''A binary operator of `build_expression_parser`: `parser` returns the
+    function of two arguments to apply, and `assoc` is `'left'`, `'right'`
+    or `'none'` (non associative).'''
+
+    def __new__(cls, parser, assoc='left'):
+        if assoc not in ('left', 'right', 'none'):
+            raise ValueError("the associativity should be 'left', 'right' or 'none', not {!r}".format(assoc))
+        return super(Infix, cls).__new__(cls, parser, assoc)
+
+
+Prefix = namedtuple('Prefix', 'parser')
+Prefix.__doc__ = '''A prefix operator of `build_expression_parser`, `parser`
+returns the function of one argument to apply.'''
+
+Postfix = namedtuple('Postfix', 'parser')
+Postfix.__doc__ = '''A postfix operator of `build_expression_parser`,
+`parser` returns the function of one argument to apply.'''
+
+
+def _tagged(tag, value):
+    return (tag, value)
 
-binary_digit = one_of("01").desc("binary_digit")
-binary_number = number(2, binary_digit).desc("binary_number")
-binary = (one_of("bB") >> binary_number).desc("binary")
 
-octal_digit = one_of("01234567").desc("octal_digit")
-octal_number = number(8, octal_digit).desc("octal_number")
-octal = (one_of("oO") >> octal_number).desc("octal")
+class Expression(Parser):
+    '''Expressions of `term` and `operators`, see `build_expression_parser`.
+    `fixities` tell the `(kind, level, assoc)` of every operator, where
+    `kind` is `'prefix'`, `'infix'` or `'postfix'` and higher levels bind
+    tighter.'''
+
+    params, child_params = ('term', 'operators', 'fixities'), ('term', 'operators')
+
+    def __init__(self, term, operators, fixities):
+        self.term, self.operators, self.fixities = term, operators, fixities
+        self.prefix = self.choice_of(('prefix',))
+        self.suffix = self.choice_of(('infix', 'postfix'))
+
+    def choice_of(self, kinds):
+        '''One parser of the operators of `kinds`, returning the position of
+        the operator found and its value.'''
+        tagged = tuple(Map(op, partial(_tagged, i)) for i, (op, fixity) in
+                       enumerate(zip(self.operators, self.fixities)) if fixity[0] in kinds)
+        if not tagged:
+            return None
+        return tagged[0] if len(tagged) == 1 else optimize(TryChoice(tagged))
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        return self.climb(text, index, 0)
+
+    def climb(self, text, index, min_level):
+        '''Parse an expression whose operators bind at `min_level` at least.'''
+        fixities, res = self.fixities, None
+        if self.prefix is not None:
+            op = self.prefix(text, index)
+            if op.status and fixities[op.value[0]][1] >= min_level:
+                res = self.climb(text, op.index, fixities[op.value[0]][1] + 1)
+                if not res.status:
+                    return res
+                res = Value.success(res.index, op.value[1](res.value))
+        if res is None:
+            res = self.term(text, index)
+            if not res.status:
+                return res
+        index, value, suffix, blocked = res.index, res.value, self.suffix, None
+        while suffix is not None:
+            op = suffix(text, index)
+            if not op.status:
+                break
+            i, fn = op.value
+            kind, level, assoc = fixities[i]
+            if level < min_level or level == blocked:
+                break
+            if kind == 'postfix':
+                index, value = op.index, fn(value)
+                continue
+            res = self.climb(text, op.index, level if assoc == 'right' else level + 1)
+            if not res.status:
+                return res
+            index, value = res.index, fn(value, res.value)
+            if assoc == 'none':
+                blocked = level
+        return Value.success(index, value)
+
+
+def build_expression_parser(table, term):
+    '''`build_expression_parser(table, term)` parses expressions of `term`s
+    and the operators of `table`, like `buildExpressionParser` of Haskell's
+    `Text.Parsec.Expr`. `table` is a list of levels of operators (`Prefix`,
+    `Infix` or `Postfix`), from the one binding tightest to the one binding
+    loosest, for example:
+
+        table = [[Prefix(string('-').result(operator.neg))],
+                 [Infix(string('^').result(operator.pow), 'right')],
+                 [Infix(string('*').result(operator.mul)), Infix(string('/').result(operator.truediv))],
+                 [Infix(string('+').result(operator.add)), Infix(string('-').result(operator.sub))]]
+
+    Operators are tried in the order of the table, so an operator starting
+    another, looser one should not match it (`regex(r'\\|(?!\\|)')` rather
+    than `string('|')` if there is `||` too). A non associative operator
+    (`'none'`) is not applied twice in a row: `a == b == c` stops after
+    `a == b`. Unlike Parsec, postfix operators may follow each other.'''
+    operators, fixities = [], []
+    for i, level in enumerate(table):
+        for operator in level:
+            if isinstance(operator, Infix):
+                fixities.append(('infix', len(table) - i, operator.assoc))
+            elif isinstance(operator, Prefix):
+                fixities.append(('prefix', len(table) - i, None))
+            elif isinstance(operator, Postfix):
+                fixities.append(('postfix', len(table) - i, None))
+            else:
+                raise TypeError('expect a Prefix, Infix or Postfix operator, got {!r}'.format(operator))
+            operators.append(operator.parser)
+    return Expression(term, tuple(operators), tuple(fixities))
+
+##########################################################################
+# Grammar optimization
+#
+# `optimize()` rewrites a finished grammar into an equivalent one that does
+# less work per character: n-ary `|`, `^`, `>>` and `+` chains are flattened
+# into a single loop, redundant `desc` wrappers are dropped and constant
+# results of `result`/`success_with` are folded into their producers. The
+# optimized parser yields exactly the same values and errors as the original.
+##########################################################################
+
 
-hexadecimal_digit = one_of("0123456789ABCDEFabcdef").desc("hexadecimal_digit")
-hexadecimal_number = number(16, hexadecimal_digit).desc("hexadecimal_number")
-hexadecimal = (one_of("xX") >> hexadecimal_number).desc("hexadecimal")
+class _Then(object):
+    '''Function applying `then` (with unpacking if `star`) to the result of `fn`.'''
 
-decimal_number = number(10, digit()).desc("decimal_number")
-decimal = decimal_number
+    def __init__(self, fn, then, star):
+        self.fn, self.then, self.star = fn, then, star
 
-zero_number = string("0") >> (hexadecimal | octal | binary | decimal | success_with(0))
-natural = zero_number | decimal
-integer = sign.apply(natural)
+    def __call__(self, *args):
+        value = self.fn(*args)
+        return self.then(*value) if self.star else self.then(value)
+
+
+##########################################################################
+# FIRST sets
+#
+# The FIRST set of a parser tells which characters it may start consuming
+# input with: when the next character is not in `chars` (and is ASCII, or
+# `wide` is false), or at the end of the input, the parser consumes nothing
+# -- it fails at the current index, or, if `nullable`, maybe succeeds there.
+# `None` stands for a parser we know nothing about.
+##########################################################################
+
+
+_First = namedtuple('_First', 'chars wide nullable')
+
+_NULLABLE = _First(frozenset(), False, True)
+_FAILING = _First(frozenset(), False, False)
+
+_ASCII = [chr(c) for c in range(128)]
+
+
+def _ascii_subset(predicate):
+    '''The FIRST set of the characters satisfying a `str.isxxx` predicate.'''
+    return _First(frozenset(c for c in _ASCII if predicate(c)), True, False)
+
+
+def _first_of_sequence(firsts, nullable=True):
+    '''FIRST set of running parsers one after another, `firsts` are thunks
+    since later parsers only matter when the former ones are nullable.'''
+    chars, wide = frozenset(), False
+    for first in firsts:
+        first = first()
+        if first is None:
+            return None
+        chars, wide = chars | first.chars, wide or first.wide
+        if not first.nullable:
+            return _First(chars, wide, False)
+    return _First(chars, wide, nullable)
+
+
+def _first_of_alternatives(firsts):
+    chars, wide, nullable = frozenset(), False, False
+    for first in firsts:
+        if first is None:
+            return None
+        chars, wide, nullable = chars | first.chars, wide or first.wide, nullable or first.nullable
+    return _First(chars, wide, nullable)
+
+
+def _operands_of(p, memo):
+    '''The parsers the `Expression` `p` may run at the index it starts at:
+    the term and the prefix operators, and the infix and postfix operators
+    too unless the term always consumes input.'''
+    kinds = ('prefix',) if _nullable(p.term, memo) is False else ('prefix', 'infix', 'postfix')
+    return (p.term,) + tuple(op for op, fixity in zip(p.operators, p.fixities) if fixity[0] in kinds)
+
+
+def _first(p, memo):
+    '''Compute the FIRST set of `p`, see `_First`.'''
+    key = id(p)
+    if key not in memo:
+        memo[key] = None  # assume nothing for recursive references
+        memo[key] = _compute_first(p, memo)
+    return memo[key]
+
+
+def _compute_first(p, memo):
+    if isinstance(p, Literal):
+        if not isinstance(p.s, str) or not p.s and p.skips is not None:
+            return None
+        return _First(frozenset(p.s[:1]), False, not p.s)
+    if isinstance(p, OneOf):
+        if isinstance(p.chars, str) or isinstance(p.chars, (set, frozenset, list, tuple)) \
+                and all(isinstance(c, str) and len(c) == 1 for c in p.chars):
+            return _First(frozenset(p.chars), False, False)
+        return None
+    if isinstance(p, Satisfy):
+        if getattr(p.predicate, '__objclass__', None) is str and p.predicate.__name__.startswith('is'):
+            return _ascii_subset(p.predicate)
+        return None
+    if isinstance(p, Regex):
+        first = _regex_first(p.exp)
+        return None if p.skips is not None and first is not None and first.nullable else first
+    if isinstance(p, (Eof, Cut)):
+        return _NULLABLE
+    if isinstance(p, SuccessWith):
+        return None if p.advance else _NULLABLE
+    if isinstance(p, FailWith):
+        return _FAILING
+    if isinstance(p, (Desc, Unit, Exclude, Excepts, Map, Result, Spanned, Viewed, Interned)):
+        return _first(p.parser, memo)
+    if isinstance(p, Forward):
+        return None if p.parser is None else _first(p.parser, memo)
+    if isinstance(p, Lookahead):
+        # it succeeds without consuming input, but only on the chars of `parser`.
+        inner = _first(p.parser, memo)
+        return _NULLABLE if inner is None else inner._replace(nullable=True)
+    if isinstance(p, Option):
+        inner = _first(p.parser, memo)
+        return inner and inner._replace(nullable=True)
+    if isinstance(p, Bind):
+        inner = _first(p.parser, memo)
+        return None if inner is None or inner.nullable else inner
+    if isinstance(p, (Compose, Sequence, Skip, EndsWith, Fold)):
+        return _first_of_sequence(partial(_first, q, memo) for q in p.children)
+    if isinstance(p, Between):
+        return _first_of_sequence(partial(_first, q, memo) for q in (p.open, p.parser, p.close))
+    if isinstance(p, (Choice, TryChoice, Dispatch)):
+        return _first_of_alternatives(_first(q, memo) for q in p.parsers)
+    if isinstance(p, Expression):
+        return _first_of_alternatives(_first(q, memo) for q in _operands_of(p, memo))
+    if isinstance(p, Times):
+        inner = _first(p.parser, memo)
+        return inner and inner._replace(nullable=inner.nullable or p.mint == 0 or p.maxt == 0)
+    if isinstance(p, TakeWhile):
+        inner = _first(p.parser, memo)
+        return inner and inner._replace(nullable=inner.nullable or p.mint == 0)
+    if isinstance(p, Separated):
+        inner = _first(p.parser, memo)
+        if inner is None or inner.nullable:
+            return None  # the separator may consume input after all.
+        return inner._replace(nullable=p.mint == 0)
+    return None
+
+
+def _regex_first(exp):
+    '''Compute the FIRST set of a compiled regular expression.'''
+    if not isinstance(exp.pattern, str) or exp.flags & re.IGNORECASE:
+        return None
+    try:
+        from re import _parser as sre_parse  # Python 3.11+
+    except ImportError:
+        import sre_parse  # type: ignore[no-redef]
+    ascii_only = bool(exp.flags & re.ASCII)
+    categories = {
+        sre_parse.CATEGORY_DIGIT: str.isdigit,
+        sre_parse.CATEGORY_SPACE: str.isspace,
+        sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+    }
+
+    def charset(items):
+        chars, wide = set(), False
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                chars.add(chr(av))
+            elif op is sre_parse.RANGE:
+                chars.update(chr(c) for c in range(av[0], min(av[1], 127) + 1))
+                wide = wide or av[1] > 127
+            elif op is sre_parse.CATEGORY and av in categories:
+                chars.update(c for c in _ASCII if categories[av](c))
+                wide = wide or not ascii_only
+            else:
+                return None
+        return _First(frozenset(chars), wide, False)
+
+    def item(op, av):
+        if op is sre_parse.LITERAL:
+            return _First(frozenset(chr(av)), False, False)
+        if op is sre_parse.IN:
+            return charset(av)
+        if op is sre_parse.BRANCH:
+            return _first_of_alternatives(sequence(branch) for branch in av[1])
+        if op is sre_parse.SUBPATTERN:
+            if av[1] & re.IGNORECASE:
+                return None
+            return sequence(av[-1])
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            inner = sequence(av[2])
+            return inner and inner._replace(nullable=inner.nullable or av[0] == 0)
+        return None
+
+    def sequence(items):
+        return _first_of_sequence(lambda op=op, av=av: item(op, av) for op, av in items)
+
+    try:
+        return sequence(sre_parse.parse(exp.pattern, exp.flags))
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+class Dispatch(Parser):
+    '''Alternatives tried like `Choice` (or `TryChoice` if `backtrack`), but
+    only those that may start with the next character, in their original
+    order, as told by their FIRST sets. Built by `optimize()`.'''
+
+    params, child_params = ('parsers', 'backtrack'), ('parsers',)
+
+    def __init__(self, parsers, backtrack):
+        self.parsers, self.backtrack = parsers, backtrack
+        memo = {}
+        firsts = [_first(p, memo) for p in parsers]
+        # alternatives we must always try: unknown ones, nullable ones and the last.
+        always = [f is None or f.nullable or i == len(parsers) - 1 for i, f in enumerate(firsts)]
+        self.default = tuple(p for p, a in zip(parsers, always) if a)
+        self.wide = tuple(p for p, f, a in zip(parsers, firsts, always) if a or f.wide)
+        self.table = {}
+        for c in frozenset().union(*(f.chars for f in firsts if f is not None)):
+            self.table[c] = tuple(p for p, f, a in zip(parsers, firsts, always)
+                                  if a or c in f.chars or f.wide and c >= '\x80')
+
+    def __call__(self, text, index):
+        if _metering:
+            _step(self, index)
+        if not isinstance(text, str):
+            candidates = self.parsers
+        elif index < len(text):
+            c = text[index]
+            candidates = self.table.get(c)
+            if candidates is None:
+                candidates = self.default if c < '\x80' else self.wide
+        else:
+            candidates = self.default
+        backtrack = self.backtrack
+        for p in candidates:
+            res = p(text, index)
+            if res.status or (not backtrack and res.index != index):
+                return res
+        return res
+
+
+def _dispatch(parsers, backtrack):
+    '''Dispatch on the next character to the alternatives that may start with
+    it. Returns None when FIRST sets do not help.'''
+    memo = {}
+    firsts = [_first(p, memo) for p in parsers[:-1]]
+    if all(f is None or f.nullable for f in firsts):
+        return None
+    return Dispatch(parsers, backtrack)
+
+
+def _is_const(p):
+    '''Whether `p` always succeeds without consuming any input.'''
+    return isinstance(p, SuccessWith) and not p.advance
+
+
+def _alternatives_of(p, backtrack):
+    '''The alternatives of `p` if it is a `^` (when `backtrack`) or a `|` choice.'''
+    if isinstance(p, TryChoice if backtrack else Choice):
+        return p.parsers
+    if isinstance(p, Dispatch) and p.backtrack == backtrack:
+        return p.parsers
+    return None
+
+
+def _optimize_alternatives(parsers, backtrack):
+    '''Flatten nested alternatives, drop the ones that cannot contribute to
+    the result, then dispatch on the next character when possible.'''
+    pending, alternatives = list(reversed(parsers)), []
+    while pending:
+        p = pending.pop()
+        last = not pending
+        nested = _alternatives_of(p, backtrack)
+        if nested is not None:
+            pending.extend(reversed(nested))
+        elif not last and isinstance(p, Desc):
+            # failures of a non-last alternative are never reported as is.
+            pending.append(p.parser)
+        elif not last and isinstance(p, FailWith):
+            continue
+        else:
+            alternatives.append(p)
+            if isinstance(p, SuccessWith):
+                break  # the rest is unreachable
+    if len(alternatives) == 1:
+        return alternatives[0]
+    alternatives = tuple(alternatives)
+    dispatched = _dispatch(alternatives, backtrack)
+    if dispatched is not None:
+        return dispatched
+    return TryChoice(alternatives) if backtrack else Choice(alternatives)
+
+
+def _optimize_compose(parsers):
+    pending, chain = list(reversed(parsers)), []
+    while pending:
+        p = pending.pop()
+        last = not pending
+        if isinstance(p, Compose):
+            pending.extend(reversed(p.parsers))
+        elif not last and _is_const(p):
+            continue
+        elif not last and isinstance(p, Result):
+            # the constant is discarded anyway.
+            pending.append(p.parser)
+        else:
+            chain.append(p)
+            if isinstance(p, FailWith):
+                break  # the rest is unreachable
+    if len(chain) > 1 and _is_const(chain[-1]):
+        return _optimize_result(_optimize_compose(chain[:-1]), chain[-1].value)
+    if len(chain) > 1 and isinstance(chain[-1], Result):
+        return Result(_optimize_compose(chain[:-1] + [chain[-1].parser]), chain[-1].value)
+    return chain[0] if len(chain) == 1 else Compose(tuple(chain))
+
+
+def _optimize_result(p, value):
+    if isinstance(p, Result):
+        p = p.parser
+    if _is_const(p):
+        return success_with(value)
+    return Result(p, value)
+
+
+def _optimize_sequence(parsers, shape):
+    if not parsers:
+        return Sequence(parsers, shape)
+    children = []
+
+    def flatten(p):
+        if isinstance(p, Sequence) and p.parsers:
+            return reshape(p.parsers, p.shape)
+        children.append(p)
+        return len(children) - 1
+
+    def reshape(parsers, shape):
+        return tuple(flatten(parsers[s]) if isinstance(s, int) else reshape(parsers, s) for s in shape)
+
+    shape = reshape(parsers, shape)
+    return Sequence(tuple(children), shape)
+
+
+def _optimize_desc(p, description):
+    if isinstance(p, Desc):
+        p = p.parser
+    if isinstance(p, SuccessWith):
+        return p
+    if isinstance(p, FailWith):
+        return fail_with(description)
+    return Desc(p, description)
+
+
+def _optimize_map(p, fn, star):
+    if isinstance(p, Map):
+        return Map(p.parser, _Then(p.fn, fn, star), p.star)
+    return Map(p, fn, star)
+
+
+_rewrites = {
+    Choice: lambda p: _optimize_alternatives(p.parsers, False),
+    TryChoice: lambda p: _optimize_alternatives(p.parsers, True),
+    Dispatch: lambda p: _optimize_alternatives(p.parsers, p.backtrack),
+    Compose: lambda p: _optimize_compose(p.parsers),
+    Result: lambda p: _optimize_result(p.parser, p.value),
+    Sequence: lambda p: _optimize_sequence(p.parsers, p.shape),
+    Desc: lambda p: _optimize_desc(p.parser, p.description),
+    Map: lambda p: _optimize_map(p.parser, p.fn, p.star),
+}
+
+
+def _rewrite(p):
+    rewrite = _rewrites.get(type(p))
+    return p if rewrite is None else rewrite(p)
+
+
+def _collapse(parents, p):
+    '''Collapse a chain of `|`, `^` or `>>` before optimizing its operands,
+    which would otherwise take time quadratic in its length.'''
+    if type(p) not in (Choice, TryChoice, Compose):
+        return p
+    pending, operands = list(reversed(p.parsers)), []
+    while pending:
+        q = pending.pop()
+        if type(q) is type(p) and parents[id(q)] == 1:
+            pending.extend(reversed(q.parsers))
+        else:
+            operands.append(q)
+    return p if len(operands) == len(p.parsers) else type(p)(tuple(operands))
+
+
+def optimize(p):
+    '''Rewrite the grammar `p` into an equivalent one that is cheaper to run.
+
+    The optimized parser produces exactly the same results and errors as `p`.
+    Parsers that wrap arbitrary functions (including the bodies of `generate`)
+    are opaque to the optimizer and kept as they are.'''
+    parents = {}
+    for q in walk(p):
+        for child in q.children:
+            parents[id(child)] = parents.get(id(child), 0) + 1
+    return transform(p, _rewrite, partial(_collapse, parents))
+
+
+##########################################################################
+# Grammar analysis
+#
+# `analyze()` looks for performance hazards in a finished grammar, without
+# parsing anything: repetitions of parsers that may succeed without consuming
+# input, alternatives that an earlier alternative always shadows, and cycles
+# of parsers that call themselves again at the same index (left recursion).
+# It relies on the FIRST sets above for nullability.
+##########################################################################
+
+
+class GrammarWarning(UserWarning):
+    '''A hazard found in a grammar by `analyze()`. `kind` is one of
+    `'left-recursion'`, `'nullable-repetition'` and `'shadowed-alternative'`,
+    `parsers` are the parsers involved.'''
+
+    def __init__(self, kind, message, parsers):
+        super(GrammarWarning, self).__init__(message)
+        self.kind, self.message, self.parsers = kind, message, parsers
+
+    def __str__(self):
+        return '{}: {}'.format(self.kind, self.message)
+
+
+def _describe(p):
+    return _rule_name(p) or _shorten(repr(p))
+
+
+def _nullable(p, memo):
+    '''Whether `p` may succeed without consuming input (None if unknown).'''
+    first = _first(p, memo)
+    return None if first is None else first.nullable
+
+
+def _left_children(p, memo):
+    '''The children `p` may run at the index it starts at.'''
+    if isinstance(p, Expression):
+        return _operands_of(p, memo)
+    if isinstance(p, (Compose, Sequence, Skip, EndsWith, Fold, Between, Separated)):
+        if isinstance(p, Between):
+            children = (p.open, p.parser, p.close)
+        elif isinstance(p, Separated):
+            children = (p.parser, p.sep)
+        else:
+            children = p.children
+        left = []
+        for q in children:
+            left.append(q)
+            if not _nullable(q, memo):
+                break
+        return left
+    return p.children
+
+
+def _left_recursion(p, memo):
+    '''The strongly connected components of the graph of `_left_children`
+    with a cycle, by Tarjan's algorithm.'''
+    numbers, lowlinks, stack, on_stack, cycles = {}, {}, [], set(), []
+    for root in walk(p):
+        if id(root) in numbers:
+            continue
+        pending = [(root, iter(_left_children(root, memo)))]
+        numbers[id(root)] = lowlinks[id(root)] = len(numbers)
+        stack.append(root)
+        on_stack.add(id(root))
+        while pending:
+            q, children = pending[-1]
+            child = next(children, None)
+            if child is not None:
+                if id(child) not in numbers:
+                    numbers[id(child)] = lowlinks[id(child)] = len(numbers)
+                    stack.append(child)
+                    on_stack.add(id(child))
+                    pending.append((child, iter(_left_children(child, memo))))
+                elif id(child) in on_stack:
+                    lowlinks[id(q)] = min(lowlinks[id(q)], numbers[id(child)])
+                continue
+            pending.pop()
+            if pending:
+                parent = pending[-1][0]
+                lowlinks[id(parent)] = min(lowlinks[id(parent)], lowlinks[id(q)])
+            if lowlinks[id(q)] == numbers[id(q)]:
+                component = []
+                while True:
+                    r = stack.pop()
+                    on_stack.discard(id(r))
+                    component.append(r)
+                    if r is q:
+                        break
+                if len(component) > 1 or id(q) in set(map(id, _left_children(q, memo))):
+                    cycles.append(component[::-1])
+    return cycles
+
+
+def _never_fails(p):
+    while isinstance(p, (Desc, Map, Result, Unit, Lookahead, Spanned, Viewed, Interned)):
+        p = p.parser
+    if isinstance(p, (Times, TakeWhile)):
+        return p.mint == 0
+    return isinstance(p, Option) or isinstance(p, SuccessWith) and not p.advance
+
+
+def _prefix(p):
+    '''The literal string `p` matches, or the characters `p` matches one of.'''
+    while isinstance(p, (Desc, Map, Result, Unit)):
+        p = p.parser
+    if isinstance(p, Literal) and isinstance(p.s, str):
+        return p.s, None
+    if isinstance(p, OneOf) and isinstance(p.chars, str):
+        return None, frozenset(p.chars)
+    return None, None
+
+
+def _shadows(p, q):
+    '''Whether the alternative `p` succeeds wherever the later `q` would.'''
+    if _never_fails(p):
+        return True
+    (s, chars), (t, other) = _prefix(p), _prefix(q)
+    if s is not None:
+        if len(s) == 1:
+            chars = frozenset(s)
+        elif t is not None:
+            return t.startswith(s)
+    if chars is None:
+        return False
+    if t is not None:
+        return t[:1] in chars if t else False
+    return other is not None and other <= chars
+
+
+def _repeats_nullable(p, memo):
+    if isinstance(p, TakeWhile):
+        return _nullable(p.parser, memo)
+    if isinstance(p, Times):
+        return p.maxt == float('inf') and _nullable(p.parser, memo)
+    if isinstance(p, Separated):
+        return p.maxt == float('inf') and _nullable(p.parser, memo) and _nullable(p.sep, memo)
+    return False
+
+
+def _flatten_alternatives(p, seen):
+    '''The alternatives of a chain of `|` or `^`, marking the nested ones `seen`.'''
+    backtrack = isinstance(p, TryChoice) or isinstance(p, Dispatch) and p.backtrack
+    pending, alternatives = list(reversed(p.parsers)), []
+    while pending:
+        q = pending.pop()
+        nested = _alternatives_of(q, backtrack)
+        if nested is not None:
+            seen.add(id(q))
+            pending.extend(reversed(nested))
+        else:
+            alternatives.append(q)
+    return alternatives
+
+
+def analyze(p):
+    '''Find the performance hazards of the grammar `p` before parsing with it,
+    and return them as a list of `GrammarWarning`:
+
+    - `'left-recursion'`: parsers calling themselves again at the same index,
+      which fails with a `RecursionError`;
+    - `'nullable-repetition'`: `many` (or `sepBy` with a nullable separator,
+      or `take_while`) of a parser that may succeed without consuming input,
+      which stops after an empty match or never stops;
+    - `'shadowed-alternative'`: alternatives of `|` or `^` that never run
+      since an earlier one always succeeds (`optional`, `many`, ...), or
+      succeeds whenever they would (`string('a') | string('ab')`).
+
+    Parsers that wrap arbitrary functions (including the bodies of `generate`)
+    are opaque and assumed to be fine.'''
+    memo, warnings = {}, []
+    for cycle in _left_recursion(p, memo):
+        names = [_rule_name(q) for q in cycle if _rule_name(q) is not None] or [_describe(cycle[0])]
+        message = 'left recursion through {}'.format(' -> '.join(names + names[:1]))
+        warnings.append(GrammarWarning('left-recursion', message, cycle))
+    seen = set()
+    for q in walk(p):
+        if _repeats_nullable(q, memo):
+            message = '{} repeats {}, which may succeed without consuming input'.format(
+                _describe(q), _describe(q.parser))
+            warnings.append(GrammarWarning('nullable-repetition', message, [q, q.parser]))
+        if isinstance(q, (Choice, TryChoice, Dispatch)) and id(q) not in seen:
+            alternatives = _flatten_alternatives(q, seen)
+            for i, r in enumerate(alternatives):
+                for s in alternatives[:i]:
+                    if _shadows(s, r):
+                        message = '{} is shadowed by {}'.format(_describe(r), _describe(s))
+                        warnings.append(GrammarWarning('shadowed-alternative', message, [s, r]))
+                        break
+    return warnings
+
+
+##########################################################################
+# Text.Parsec.Number
+#
+# The parsers of numbers below are built on first access (see `__getattr__`),
+# so that importing parsec does not pay for the ones a program never uses.
+##########################################################################
+
+def _identity(x):
+    return x
+
+def _digits_value(base, digits):
+    try:
+        return int(digits, base)
+    except ValueError:  # beyond the limit of `sys.set_int_max_str_digits()`
+        return reduce(lambda accumulation, digit: accumulation * base + int(digit, base), digits, 0)
+
+def number(base, digit):
+    return many1_str(digit).parsecmap(partial(_digits_value, base))
+
+def _numeral(pattern, convert, parser):
+    '''`parser`, but a match of the regular expression `pattern`, which must
+    match exactly where `parser` succeeds, is converted by `convert` at once.'''
+    return regex(pattern).parsecmap(convert) | parser
+
+def _prefixed_value(base, s):
+    return _digits_value(base, s[1:])
+
+_bases = {'x': 16, 'X': 16, 'o': 8, 'O': 8, 'b': 2, 'B': 2}
+
+def _natural_value(s):
+    base = _bases.get(s[1:2])
+    return _digits_value(10, s) if base is None else _digits_value(base, s[2:])
+
+def _integer_value(s):
+    if s[0] == '-':
+        return -_natural_value(s[1:])
+    return _natural_value(s[1:] if s[0] == '+' else s)
+
+# "0x1f", "0o17", "0b11", "017" (= 17) or "0"; a prefix without digits is an error.
+_natural = r'0(?:[xX][0-9A-Fa-f]+|[oO][0-7]+|[bB][01]+|(?![xXoObB])\d*)|(?!0)\d+'
+
+_floating = r'[-+]?[0-9]+(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'
+
+
+def _scientific():
+    from decimal import Decimal
+    return regex(_floating).parsecmap(Decimal).desc("scientific")
+
+
+_builders = {
+    'sign': lambda: string("-").result(operator.neg).desc("'-'") | optional(string("+").desc("'+'")).result(_identity),
+
+    'binary_digit': lambda: one_of("01").desc("binary_digit"),
+    'binary_number': lambda: number(2, _built('binary_digit')).desc("binary_number"),
+    'binary': lambda: _numeral(r'[bB][01]+', partial(_prefixed_value, 2),
+                               one_of("bB") >> _built('binary_number')).desc("binary"),
+
+    'octal_digit': lambda: one_of("01234567").desc("octal_digit"),
+    'octal_number': lambda: number(8, _built('octal_digit')).desc("octal_number"),
+    'octal': lambda: _numeral(r'[oO][0-7]+', partial(_prefixed_value, 8),
+                              one_of("oO") >> _built('octal_number')).desc("octal"),
+
+    'hexadecimal_digit': lambda: one_of("0123456789ABCDEFabcdef").desc("hexadecimal_digit"),
+    'hexadecimal_number': lambda: number(16, _built('hexadecimal_digit')).desc("hexadecimal_number"),
+    'hexadecimal': lambda: _numeral(r'[xX][0-9A-Fa-f]+', partial(_prefixed_value, 16),
+                                    one_of("xX") >> _built('hexadecimal_number')).desc("hexadecimal"),
+
+    'decimal_number': lambda: _numeral(r'\d+', partial(_digits_value, 10),
+                                       number(10, digit())).desc("decimal_number"),
+    'decimal': lambda: _built('decimal_number'),
+
+    'zero_number': lambda: string("0") >> (_built('hexadecimal') | _built('octal') | _built('binary')
+                                           | _built('decimal') | success_with(0)),
+    'natural': lambda: _numeral(_natural, _natural_value, _built('zero_number') | _built('decimal')),
+    'integer': lambda: _numeral(r'[-+]?(?:{})'.format(_natural), _integer_value,
+                                _built('sign').apply(_built('natural'))),
+
+    'floating': lambda: regex(_floating).parsecmap(float).desc("floating"),
+    'scientific': _scientific,
+}
+
+# and the fixed-width fields of binary data.
+_builders.update((name, partial(Unpack, fmt, True)) for name, fmt in _fields.items())
+
+
+def _built(name):
+    '''The module level parser `name` of `_builders`, built once.'''
+    value = globals().get(name)
+    if value is None:
+        # not skipping anything, even when first accessed in a `skipping` block.
+        with skipping(None):
+            built = _builders[name]()
+        # threads racing to build it all get the first one.
+        value = globals().setdefault(name, built)
+    return value
+
+
+def __getattr__(name):
+    if name in _builders:
+        return _built(name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# `from parsec import *` gives the parsers of `_builders` too (and builds them).
+__all__ = [
+    'expected_arguments', 'ParseError', 'ParseBudgetExceeded', 'Span', 'Value', 'ParseStats',
+    'Backtracking', 'find_backtracking', 'Parser', 'Bind', 'Compose', 'Sequence', 'Choice',
+    'TryChoice', 'Longest', 'Skip', 'EndsWith', 'Excepts', 'Map', 'Result', 'Spanned', 'Desc',
+    'ResultCache', 'parse', 'bind', 'compose', 'joint', 'choice', 'try_choice', 'try_choices',
+    'try_choices_longest', 'skip', 'ends_with', 'excepts', 'parsecmap', 'parsecapp', 'result',
+    'mark', 'spanned', 'desc', 'walk', 'transform', 'Generate', 'generate', 'Times', 'times',
+    'count', 'Option', 'optional', 'many', 'many1', 'many_str', 'many1_str', 'Separated',
+    'separated', 'sepBy', 'sepBy1', 'endBy', 'endBy1', 'sepEndBy', 'sepEndBy1', 'Fold', 'many_fold',
+    'sepBy_fold', 'chainl1', 'chainr1', 'Satisfy', 'OneOf', 'NoneOf', 'Eof', 'Literal', 'Regex',
+    'TakeWhile', 'TakeUntil', 'satisfy', 'any', 'one_of', 'none_of', 'space', 'spaces', 'letter',
+    'digit', 'eof', 'string', 'regex', 'keyword', 'Skipping', 'skipping', 'take_while',
+    'take_while1', 'skip_while', 'take_until', 'newline', 'crlf', 'end_of_line', 'Unpack', 'Take',
+    'LengthPrefixed', 'struct_fmt', 'take', 'length_prefixed', 'SuccessWith', 'FailWith', 'Exclude',
+    'Lookahead', 'Unit', 'Viewed', 'Interned', 'Between', 'Forward', 'Cut', 'success_with',
+    'fail_with', 'exclude', 'lookahead', 'unit', 'as_view', 'interned', 'between',
+    'forward_declare', 'cut', 'fix', 'validate', 'Infix', 'Prefix', 'Postfix', 'Expression',
+    'build_expression_parser', 'Dispatch', 'optimize', 'GrammarWarning', 'analyze', 'number',
+] + list(_builders)
+
+if sys.version_info < (3, 7):
+    # no module `__getattr__` (PEP 562) before Python 3.7.
+    for _name in _builders:
+        _built(_name)
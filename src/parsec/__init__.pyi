@@ -4,6 +4,9 @@
 import collections as C
 import collections.abc as CA
 import re
+import struct
+import threading
+from decimal import Decimal
 import typing as T
 
 _U = T.TypeVar('_U')
@@ -12,6 +15,8 @@ _W = T.TypeVar('_W')
 _VS = T.TypeVar('_VS', bound=CA.Sequence)
 _LocInfo = tuple[int, int]
 
+__version__: str
+
 CH = T.TypeVar('CH')
 Text = CA.Sequence["CH"]
 
@@ -25,6 +30,47 @@ class ParseError(RuntimeError):
     def loc(self) -> str: ...
     def __str__(self) -> str: ...
 
+class ParseBudgetExceeded(ParseError):
+    limit: str
+    stats: ParseStats
+    def __init__(self, limit: str, text: Text, index: int, stats: ParseStats) -> None: ...
+
+class Span:
+    text: Text
+    start: int
+    end: int
+    def __init__(self, text: Text, start: int, end: int) -> None: ...
+    def locs(self) -> tuple[_LocInfo, _LocInfo]: ...
+    @property
+    def start_loc(self) -> _LocInfo: ...
+    @property
+    def end_loc(self) -> _LocInfo: ...
+    @property
+    def fragment(self) -> Text: ...
+
+class ParseStats:
+    steps: int
+    max_depth: int
+    peak_index: int
+    def __init__(self) -> None: ...
+
+class Backtracking:
+    parser: Parser
+    text: Text
+    rule: str
+    positions: list[tuple[int, int]]
+    def __init__(self, parser: Parser, text: Text, positions: list[tuple[int, int]]) -> None: ...
+    @property
+    def evaluations(self) -> int: ...
+
+def find_backtracking(
+    parser: Parser,
+    text: Text,
+    threshold: int = ...,
+    max_steps: T.Optional[int] = ...,
+    timeout: T.Optional[float] = ...,
+) -> list[Backtracking]: ...
+
 class Value(C.namedtuple('Value', 'status index value expected'), T.Generic[_U]):
     @staticmethod
     def success(index: int, actual: _U) -> Value[_U]: ...
@@ -39,11 +85,43 @@ class Value(C.namedtuple('Value', 'status index value expected'), T.Generic[_U])
     def __str__(self) -> str: ...
 
 class Parser(T.Generic[_U]):
+    params: T.ClassVar[tuple[str, ...]]
+    child_params: T.ClassVar[tuple[str, ...]]
+    shared: T.ClassVar[bool]
     def __init__(self, fn: CA.Callable[[Text, int], Value[_U]]) -> None: ...
     def __call__(self, text: Text, index: int) -> Value[_U]: ...
-    def parse(self, text: Text) -> _U: ...
-    def parse_partial(self, text: Text) -> tuple[_U, Text]: ...
-    def parse_strict(self, text: Text) -> _U: ...
+    @property
+    def args(self) -> tuple[T.Any, ...]: ...
+    @property
+    def children(self) -> tuple[Parser, ...]: ...
+    def with_children(self, children: CA.Iterable[Parser]) -> Parser[_U]: ...
+    def parse(
+        self,
+        text: Text,
+        max_steps: T.Optional[int] = ...,
+        max_depth: T.Optional[int] = ...,
+        max_length: T.Optional[int] = ...,
+        timeout: T.Optional[float] = ...,
+        stats: T.Optional[ParseStats] = ...,
+    ) -> _U: ...
+    def parse_partial(
+        self,
+        text: Text,
+        max_steps: T.Optional[int] = ...,
+        max_depth: T.Optional[int] = ...,
+        max_length: T.Optional[int] = ...,
+        timeout: T.Optional[float] = ...,
+        stats: T.Optional[ParseStats] = ...,
+    ) -> tuple[_U, Text]: ...
+    def parse_strict(
+        self,
+        text: Text,
+        max_steps: T.Optional[int] = ...,
+        max_depth: T.Optional[int] = ...,
+        max_length: T.Optional[int] = ...,
+        timeout: T.Optional[float] = ...,
+        stats: T.Optional[ParseStats] = ...,
+    ) -> _U: ...
     @T.overload
     def bind(self, fn: CA.Callable[[_U], Parser[_V]]) -> Parser[_V]: ...
     @T.overload
@@ -75,7 +153,14 @@ class Parser(T.Generic[_U]):
     ) -> Parser[_W]: ...
     def result(self, res: _V) -> Parser[_V]: ...
     def mark(self) -> Parser[tuple[_LocInfo, _U, _LocInfo]]: ...
+    def spanned(self) -> Parser[tuple[_U, Span]]: ...
     def desc(self, description: str) -> Parser[_U]: ...
+    def cache_results(self, max_entries: int = ..., max_bytes: int = ..., failures: bool = ...) -> ResultCache[_U]: ...
+    def optimize(self) -> Parser[_U]: ...
+    def analyze(self) -> list[GrammarWarning]: ...
+    @staticmethod
+    def forward() -> Forward: ...
+    def compile(self) -> Parser[_U]: ...
     def __or__(self, other: Parser[_V]) -> Parser[_U | _V]: ...
     def __xor__(self, other: Parser[_V]) -> Parser[_U | _V]: ...
     def __add__(self, other: Parser[_V]) -> Parser[tuple[_U, _V]]: ...
@@ -87,6 +172,80 @@ class Parser(T.Generic[_U]):
     def __lt__(self, other: Parser[_V]) -> Parser[_U]: ...
     def __truediv__(self, other: Parser[_V]) -> Parser[_U]: ...
 
+class Bind(Parser[_V]):
+    parser: Parser
+    fn: CA.Callable[..., Parser[_V]]
+    def __init__(self, parser: Parser, fn: CA.Callable[..., Parser[_V]]) -> None: ...
+
+class Compose(Parser[_U]):
+    parsers: tuple[Parser, ...]
+    def __init__(self, parsers: tuple[Parser, ...]) -> None: ...
+
+class Sequence(Parser[tuple[T.Any, ...]]):
+    parsers: tuple[Parser, ...]
+    shape: tuple[T.Any, ...]
+    def __init__(self, parsers: tuple[Parser, ...], shape: T.Optional[tuple[T.Any, ...]] = ...) -> None: ...
+
+class Choice(Parser[_U]):
+    parsers: tuple[Parser[_U], ...]
+    def __init__(self, parsers: tuple[Parser[_U], ...]) -> None: ...
+
+class TryChoice(Parser[_U]):
+    parsers: tuple[Parser[_U], ...]
+    def __init__(self, parsers: tuple[Parser[_U], ...]) -> None: ...
+
+class Longest(Parser[_U]):
+    parsers: tuple[Parser[_U], ...]
+    def __init__(self, parsers: tuple[Parser[_U], ...]) -> None: ...
+
+class Skip(Parser[_U]):
+    parser: Parser[_U]
+    other: Parser
+    def __init__(self, parser: Parser[_U], other: Parser) -> None: ...
+
+class EndsWith(Parser[_U]):
+    parser: Parser[_U]
+    other: Parser
+    def __init__(self, parser: Parser[_U], other: Parser) -> None: ...
+
+class Excepts(Parser[_U]):
+    parser: Parser[_U]
+    other: Parser
+    def __init__(self, parser: Parser[_U], other: Parser) -> None: ...
+
+class Map(Parser[_V]):
+    parser: Parser
+    fn: CA.Callable[..., _V]
+    star: bool
+    def __init__(self, parser: Parser, fn: CA.Callable[..., _V], star: bool = ...) -> None: ...
+
+class Result(Parser[_V]):
+    parser: Parser
+    value: _V
+    def __init__(self, parser: Parser, value: _V) -> None: ...
+
+class Spanned(Parser[tuple[_U, Span]]):
+    parser: Parser[_U]
+    def __init__(self, parser: Parser[_U]) -> None: ...
+
+class Desc(Parser[_U]):
+    parser: Parser[_U]
+    description: str
+    def __init__(self, parser: Parser[_U], description: str) -> None: ...
+
+class ResultCache(Parser[_U]):
+    parser: Parser[_U]
+    max_entries: int
+    max_bytes: int
+    failures: bool
+    entries: C.OrderedDict[tuple[str, Text], tuple[bool, T.Any]]
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    def __init__(self, parser: Parser[_U], max_entries: int = ..., max_bytes: int = ..., failures: bool = ...) -> None: ...
+    def clear(self) -> None: ...
+
 def parse(p: Parser[_V], text: Text, index: int) -> _V: ...
 @T.overload
 def bind(p: Parser[_U], fn: CA.Callable[[_U], Parser[_V]]) -> Parser[_V]: ...
@@ -101,11 +260,24 @@ def try_choices_longest(*parsers: Parser[_U]) -> Parser[_U]: ...
 def skip(pa: Parser[_U], pb: Parser) -> Parser[_U]: ...
 def ends_with(pa: Parser[_U], pb: Parser) -> Parser[_U]: ...
 def excepts(pa: Parser[_U], pb: Parser) -> Parser[_U]: ...
-def parsecmap(p: Parser[_U], fn: CA.Callable[[_U], _V]) -> Parser[_V]: ...
+@T.overload
+def parsecmap(p: Parser, fn: CA.Callable[..., _V], star: T.Literal[True]) -> Parser[_V]: ...
+@T.overload
+def parsecmap(p: Parser[_U], fn: CA.Callable[[_U], _V], star: T.Literal[False] = ...) -> Parser[_V]: ...
 def parsecapp(p: Parser[CA.Callable[[_U], _V]], other: Parser[_U]) -> Parser[_V]: ...
 def result(p: Parser, res: _U) -> Parser[_U]: ...
 def mark(p: Parser[_U]) -> Parser[tuple[_LocInfo, _U, _LocInfo]]: ...
+def spanned(p: Parser[_U]) -> Parser[tuple[_U, Span]]: ...
 def desc(p: Parser[_U], description: str) -> Parser[_U]: ...
+def walk(p: Parser) -> CA.Iterator[Parser]: ...
+def transform(
+    p: Parser[_U], fn: CA.Callable[[Parser], Parser], expand: T.Optional[CA.Callable[[Parser], Parser]] = ...
+) -> Parser[_U]: ...
+
+class Generate(Parser[_U]):
+    fn: CA.Callable[[], CA.Generator[Parser, T.Any, T.Any]]
+    def __init__(self, fn: CA.Callable[[], CA.Generator[Parser, T.Any, T.Any]]) -> None: ...
+
 @T.overload
 def generate(
     fn: str,
@@ -116,28 +288,224 @@ def generate(
 def generate(
     fn: CA.Callable[[], CA.Generator[Parser[_U], _U, Parser[_V] | _V]]
 ) -> Parser[_V]: ...
-def times(
-    p: Parser[_U], mint: int, maxt: T.Optional[float] = ...
-) -> Parser[list[_U]]: ...
+class Times(Parser[list[_U]]):
+    parser: Parser[_U]
+    mint: int
+    maxt: float
+    sink: T.Optional[CA.Callable[[_U], T.Any]]
+    def __init__(
+        self, parser: Parser[_U], mint: int, maxt: float, sink: T.Optional[CA.Callable[[_U], T.Any]] = ...
+    ) -> None: ...
+
+class Option(Parser[T.Any]):
+    parser: Parser
+    default_value: T.Any
+    def __init__(self, parser: Parser, default_value: T.Any = ...) -> None: ...
+
+class Separated(Parser[list[_U]]):
+    parser: Parser[_U]
+    sep: Parser
+    mint: int
+    maxt: float
+    end: T.Optional[bool]
+    sink: T.Optional[CA.Callable[[_U], T.Any]]
+    def __init__(
+        self,
+        parser: Parser[_U],
+        sep: Parser,
+        mint: int,
+        maxt: float,
+        end: T.Optional[bool] = ...,
+        sink: T.Optional[CA.Callable[[_U], T.Any]] = ...,
+    ) -> None: ...
+
+@T.overload
+def times(p: Parser[_U], mint: int, maxt: T.Optional[float] = ..., sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def times(p: Parser[_U], mint: int, maxt: T.Optional[float], sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def times(p: Parser[_U], mint: int, *, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
 def count(p: Parser[_U], n: int) -> Parser[list[_U]]: ...
 def optional(
     p: Parser[_U], default_value: T.Optional[_V] = ...
 ) -> Parser[_U | _V | None]: ...
-def many(p: Parser[_U]) -> Parser[list[_U]]: ...
-def many1(p: Parser[_U]) -> Parser[list[_U]]: ...
+@T.overload
+def many(p: Parser[_U], sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def many(p: Parser[_U], sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def many1(p: Parser[_U], sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def many1(p: Parser[_U], sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+def many_str(p: Parser[str]) -> Parser[str]: ...
+def many1_str(p: Parser[str]) -> Parser[str]: ...
+@T.overload
 def separated(
     p: Parser[_U],
     sep: Parser,
     mint: int,
     maxt: T.Optional[int] = ...,
     end: T.Optional[bool] = ...,
+    sink: None = ...,
 ) -> Parser[list[_U]]: ...
-def sepBy(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
-def sepBy1(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
-def endBy(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
-def endBy1(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
-def sepEndBy(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
-def sepEndBy1(p: Parser[_U], sep: Parser) -> Parser[list[_U]]: ...
+@T.overload
+def separated(
+    p: Parser[_U],
+    sep: Parser,
+    mint: int,
+    maxt: T.Optional[int] = ...,
+    end: T.Optional[bool] = ...,
+    *,
+    sink: CA.Callable[[_U], T.Any],
+) -> Parser[int]: ...
+@T.overload
+def sepBy(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def sepBy(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def sepBy1(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def sepBy1(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def endBy(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def endBy(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def endBy1(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def endBy1(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def sepEndBy(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def sepEndBy(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+@T.overload
+def sepEndBy1(p: Parser[_U], sep: Parser, sink: None = ...) -> Parser[list[_U]]: ...
+@T.overload
+def sepEndBy1(p: Parser[_U], sep: Parser, sink: CA.Callable[[_U], T.Any]) -> Parser[int]: ...
+class Fold(Parser[_V]):
+    init: Parser[_V]
+    parser: Times[T.Any] | Separated[T.Any]
+    step: CA.Callable[[_V, T.Any], _V]
+    def __init__(
+        self, init: Parser[_V], parser: Times[_U] | Separated[_U], step: CA.Callable[[_V, _U], _V]
+    ) -> None: ...
+
+def many_fold(p: Parser[_U], init: _V, step: CA.Callable[[_V, _U], _V]) -> Parser[_V]: ...
+def sepBy_fold(p: Parser[_U], sep: Parser, init: _V, step: CA.Callable[[_V, _U], _V]) -> Parser[_V]: ...
+def chainl1(p: Parser[_U], op: Parser[CA.Callable[[_U, _U], _U]]) -> Parser[_U]: ...
+def chainr1(p: Parser[_U], op: Parser[CA.Callable[[_U, _U], _U]]) -> Parser[_U]: ...
+
+class Satisfy(Parser[_U]):
+    predicate: CA.Callable[[_U], bool]
+    failure: T.Optional[str]
+    def __init__(self, predicate: CA.Callable[[_U], bool], failure: T.Optional[str] = ...) -> None: ...
+
+class OneOf(Parser[_U]):
+    chars: CA.Container[_U]
+    def __init__(self, chars: CA.Container[_U]) -> None: ...
+
+class NoneOf(Parser[_U]):
+    chars: CA.Container[_U]
+    def __init__(self, chars: CA.Container[_U]) -> None: ...
+
+class Eof(Parser[None]):
+    def __init__(self) -> None: ...
+
+class Literal(Parser[_VS]):
+    s: _VS
+    skips: re.Pattern | None
+    in_bytes: bool
+    def __init__(self, s: _VS, skips: re.Pattern | None = ...) -> None: ...
+
+class Regex(Parser[str]):
+    exp: re.Pattern
+    skips: re.Pattern | None
+    combined: re.Pattern | None
+    def __init__(self, exp: re.Pattern, skips: re.Pattern | None = ...) -> None: ...
+
+class TakeWhile(Parser[T.Optional[str]]):
+    parser: Parser
+    mint: int
+    discard: bool
+    pattern: T.Optional[re.Pattern]
+    byte_pattern: T.Optional[re.Pattern]
+    def __init__(self, parser: Parser, mint: int = ..., discard: bool = ...) -> None: ...
+
+class TakeUntil(Parser[str]):
+    s: str
+    def __init__(self, s: str) -> None: ...
+
+class SuccessWith(Parser[_U]):
+    value: _U
+    advance: bool
+    def __init__(self, value: _U, advance: bool = ...) -> None: ...
+
+class FailWith(Parser[T.Any]):
+    message: str
+    def __init__(self, message: str) -> None: ...
+
+class Unpack(Parser[T.Any]):
+    fmt: str
+    single: bool
+    struct: struct.Struct
+    def __init__(self, fmt: str, single: bool = ...) -> None: ...
+
+class Take(Parser[T.Any]):
+    n: int | None
+    def __init__(self, n: int | None = ...) -> None: ...
+
+class LengthPrefixed(Parser[_U]):
+    prefix: Parser[int]
+    body: Parser[_U]
+    def __init__(self, prefix: Parser[int], body: Parser[_U]) -> None: ...
+
+class Exclude(Parser[_U]):
+    parser: Parser[_U]
+    exclude: Parser
+    def __init__(self, parser: Parser[_U], exclude: Parser) -> None: ...
+
+class Lookahead(Parser[_U]):
+    parser: Parser[_U]
+    def __init__(self, parser: Parser[_U]) -> None: ...
+
+class Unit(Parser[_U]):
+    parser: Parser[_U]
+    def __init__(self, parser: Parser[_U]) -> None: ...
+
+class Viewed(Parser[Span]):
+    parser: Parser
+    def __init__(self, parser: Parser) -> None: ...
+
+class _Tables(threading.local):
+    table: dict[T.Any, T.Any] | None
+    text_id: int | None
+
+class Interned(Parser[_U]):
+    parser: Parser[_U]
+    max_size: int
+    tables: _Tables
+    def __init__(self, parser: Parser[_U], max_size: int = ...) -> None: ...
+    def intern(self, text: Text, value: _U) -> _U: ...
+
+class Between(Parser[_U]):
+    open: Parser
+    close: Parser
+    parser: Parser[_U]
+    def __init__(self, open: Parser, close: Parser, parser: Parser[_U]) -> None: ...
+
+class Forward(Parser[_U]):
+    parser: T.Optional[Parser[_U]]
+    def __init__(self, parser: T.Optional[Parser[_U]] = ...) -> None: ...
+    def define(self, parser: Parser[_U]) -> Forward[_U]: ...
+
+class Cut(Parser[None]):
+    def __init__(self) -> None: ...
+
+class Dispatch(Parser[_U]):
+    parsers: tuple[Parser[_U], ...]
+    backtrack: bool
+    def __init__(self, parsers: tuple[Parser[_U], ...], backtrack: bool) -> None: ...
+
 def satisfy(predicate: CA.Callable[[_U], bool]) -> Parser[_U]: ...
 def any() -> Parser: ...
 def one_of(s: CA.Container[_U]) -> Parser[_U]: ...
@@ -149,17 +517,96 @@ def digit() -> Parser[str]: ...
 def eof() -> Parser[None]: ...
 def string(s: _VS) -> Parser[_VS]: ...
 def regex(exp: str | re.Pattern, flags: re.RegexFlag = ...) -> Parser[str]: ...
+def keyword(word: str) -> Parser[str]: ...
+
+class _Lexing(threading.local):
+    skip: re.Pattern | None
+
+class Skipping:
+    skip: re.Pattern | None
+    outer: list[re.Pattern | None]
+    parser: Parser
+    def __init__(self, skip: re.Pattern | None) -> None: ...
+    def __enter__(self) -> Parser: ...
+    def __exit__(self, *exc_info: T.Any) -> None: ...
+
+def skipping(pattern: str | bytes | re.Pattern | None, flags: re.RegexFlag = ...) -> Skipping: ...
+def take_while(predicate: CA.Callable[[str], bool] | CA.Container[str]) -> Parser[str]: ...
+def take_while1(predicate: CA.Callable[[str], bool] | CA.Container[str]) -> Parser[str]: ...
+def skip_while(predicate: CA.Callable[[str], bool] | CA.Container[str]) -> Parser[None]: ...
+def take_until(s: str) -> Parser[str]: ...
 def newline() -> Parser[str]: ...
 def crlf() -> Parser[str]: ...
 def end_of_line() -> Parser[str]: ...
+def struct_fmt(fmt: str) -> Parser[tuple[T.Any, ...]]: ...
+def take(n: int | None = ...) -> Parser[memoryview]: ...
+@T.overload
+def length_prefixed(prefix: Parser[int]) -> Parser[memoryview]: ...
+@T.overload
+def length_prefixed(prefix: Parser[int], body: Parser[_U]) -> Parser[_U]: ...
+u8: Parser[int]
+i8: Parser[int]
+u16le: Parser[int]
+u16be: Parser[int]
+i16le: Parser[int]
+i16be: Parser[int]
+u32le: Parser[int]
+u32be: Parser[int]
+i32le: Parser[int]
+i32be: Parser[int]
+u64le: Parser[int]
+u64be: Parser[int]
+i64le: Parser[int]
+i64be: Parser[int]
+f32le: Parser[float]
+f32be: Parser[float]
+f64le: Parser[float]
+f64be: Parser[float]
 def success_with(value: _U, advance: bool = False) -> Parser[_U]: ...
 def fail_with(message: str) -> Parser: ...
 def exclude(p: Parser[_U], exclude: Parser) -> Parser[_U]: ...
 def lookahead(p: Parser[_U]) -> Parser[_U]: ...
 def unit(p: Parser[_U]) -> Parser[_U]: ...
+def as_view(p: Parser) -> Parser[Span]: ...
+def interned(p: Parser[_U], max_size: int = ...) -> Parser[_U]: ...
 def between(open: Parser[_U], close: Parser[_U], parser: Parser[_U]) -> Parser[_U]: ...
+def forward_declare() -> Forward: ...
+def cut() -> Cut: ...
+def fix(fn: CA.Callable[[Forward[_U]], Parser[_U]]) -> Parser[_U]: ...
 def validate(predicate: CA.Callable[[_U], bool]) -> Parser[_U]: ...
 
+class Infix(T.NamedTuple, T.Generic[_U]):
+    parser: Parser[CA.Callable[[_U, _U], _U]]
+    assoc: T.Literal['left', 'right', 'none'] = ...
+
+class Prefix(T.NamedTuple, T.Generic[_U]):
+    parser: Parser[CA.Callable[[_U], _U]]
+
+class Postfix(T.NamedTuple, T.Generic[_U]):
+    parser: Parser[CA.Callable[[_U], _U]]
+
+class Expression(Parser[_U]):
+    term: Parser[_U]
+    operators: tuple[Parser, ...]
+    fixities: tuple[tuple[str, int, T.Optional[str]], ...]
+    def __init__(
+        self, term: Parser[_U], operators: tuple[Parser, ...], fixities: tuple[tuple[str, int, T.Optional[str]], ...]
+    ) -> None: ...
+    def climb(self, text: Text, index: int, min_level: int) -> Value[_U]: ...
+
+def build_expression_parser(
+    table: CA.Sequence[CA.Sequence[Infix[_U] | Prefix[_U] | Postfix[_U]]], term: Parser[_U]
+) -> Expression[_U]: ...
+def optimize(p: Parser[_U]) -> Parser[_U]: ...
+
+class GrammarWarning(UserWarning):
+    kind: T.Literal['left-recursion', 'nullable-repetition', 'shadowed-alternative']
+    message: str
+    parsers: list[Parser]
+    def __init__(self, kind: str, message: str, parsers: list[Parser]) -> None: ...
+
+def analyze(p: Parser) -> list[GrammarWarning]: ...
+
 sign: Parser[CA.Callable[[_U], _U]]
 
 def number(base: int, digit: Parser[str]) -> Parser[int]: ...
@@ -182,3 +629,6 @@ decimal: Parser[int]
 zero_number: Parser[int]
 natural: Parser[int]
 integer: Parser[int]
+
+floating: Parser[float]
+scientific: Parser[Decimal]
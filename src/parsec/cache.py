@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Keep optimized and compiled grammars on disk across processes.
+
+Building a large grammar and optimizing it can dominate the startup of a
+short-lived program. `cached()` pickles the finished grammar into a cache
+directory under a fingerprint of its definition and of the parsec version,
+and the next process loads it from there instead of building it again.
+
+Only grammars that can be pickled are cached: the functions they hold (e.g.
+given to `parsecmap`, `bind` or `satisfy`) must be defined at the top level
+of a module. Other grammars are built every time, with a warning.
+
+Loading a pickle runs whatever code it names, so the cache directory must be
+trusted as much as the program itself: it should not be writable by other
+users, nor be chosen (by `$PARSEC_CACHE_DIR`) by someone who is not.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import hashlib
+import inspect
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import warnings
+
+from . import __version__, optimize
+
+
+def default_directory():
+    '''`$PARSEC_CACHE_DIR`, or `~/.cache/parsec`. The grammars cached there
+    are loaded by `pickle`, which may run any code: the directory must not be
+    writable by anyone the program does not trust.'''
+    return os.environ.get('PARSEC_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'parsec')
+
+
+def fingerprint(build, key=None):
+    '''Fingerprint of the grammar built by `build()`: its name, the source
+    code of the module defining it, `key` (for whatever else the grammar
+    depends on), and the versions of parsec and Python.'''
+    try:
+        source = inspect.getsource(inspect.getmodule(build))
+    except (OSError, TypeError):
+        source = repr(marshal.dumps(build.__code__))
+    digest = hashlib.sha256()
+    for part in (__version__, sys.version_info[:2], _name(build), source, key):
+        digest.update(repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cached(build, directory=None, key=None, compile=False):
+    '''Return the grammar built by `build()`, optimized, and compiled if
+    `compile`, from the cache `directory` (see `default_directory()`) when an
+    earlier process already did the work.
+
+    `key` should change whenever the grammar changes without the module of
+    `build` changing, e.g. when it is built from other modules or from data.'''
+    directory = directory or default_directory()
+    name = _name(build) + ('.compiled' if compile else '')
+    path = os.path.join(directory, '{}-{}.pickle'.format(name, fingerprint(build, key)))
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:  # pylint: disable=broad-except
+        pass  # a missing or unreadable cache entry is rebuilt.
+
+    grammar = optimize(build())
+    if compile:
+        grammar = grammar.compile()
+    try:
+        data = pickle.dumps(grammar, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        warnings.warn('grammar {} cannot be cached: {}'.format(name, e))
+        return grammar
+    try:
+        _write(directory, name, path, data)
+    except (IOError, OSError) as e:
+        warnings.warn('grammar {} cannot be cached: {}'.format(name, e))
+    return grammar
+
+
+def _name(build):
+    return '{}.{}'.format(build.__module__, getattr(build, '__qualname__', build.__name__))
+
+
+def _write(directory, name, path, data):
+    '''Write `data` to `path` atomically, removing the stale entries of `name`.'''
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)  # not writable by others, see `default_directory()`.
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.' + name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+    for entry in os.listdir(directory):
+        if entry.startswith(name + '-') and entry.endswith('.pickle') and os.path.join(directory, entry) != path:
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
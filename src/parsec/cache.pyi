@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections.abc as CA
+import typing as T
+
+from . import Parser
+
+_U = T.TypeVar('_U')
+
+def default_directory() -> str: ...
+def fingerprint(build: CA.Callable[[], Parser], key: T.Any = ...) -> str: ...
+def cached(
+    build: CA.Callable[[], Parser[_U]],
+    directory: T.Optional[str] = ...,
+    key: T.Any = ...,
+    compile: bool = ...,
+) -> Parser[_U]: ...
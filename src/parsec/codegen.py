@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Compile a grammar into specialized Python source code.
+
+`compile_parser()` turns a finished combinator graph into one Python module
+with a function per parser, where leaves (strings, regular expressions,
+characters, ...) are inlined into their parents, `times`/`many`/`separated`
+become plain loops and intermediate results live in local variables: the
+generated functions return `(index, value)` tuples on success and the same
+failure `Value` the interpreted parser would. Parsers wrapping arbitrary
+functions (`generate` bodies included) are called as they are.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import marshal
+
+from . import Parser, Value, Satisfy, OneOf, NoneOf, Eof, Literal, Regex, SuccessWith, FailWith, optimize
+from . import Times, Separated, Span, _builds_parsers, _current_budget, _Sink, _Folding
+
+
+class Compiled(Parser):
+    '''The grammar `parser` compiled to Python code, see `compile_parser`.
+    Inputs other than `str`, and parses with limits, are handed to `parser`
+    itself.'''
+
+    params = ('parser',)
+    shared = True  # compiling the same grammar again gives the same parser.
+
+    def __init__(self, parser, source=None, consts=None, code=None):
+        self.parser = parser
+        if source is None:
+            source, consts = _Compiler().build(parser)
+        self.source, self.consts = source, consts
+        self.code = compile(source, '<parsec.codegen>', 'exec') if code is None else marshal.loads(code)
+        namespace = dict(consts, _failure=Value.failure, _literal_failure=_literal_failure,
+                         _Sink=_Sink, _Folding=_Folding, _Span=Span)
+        exec(self.code, namespace)
+        self.entry = namespace['_p0']
+        self._builds = _builds_parsers(parser)  # not a child, for `walk`.
+
+    def __reduce__(self):
+        # the generated functions cannot be pickled, but their (compiled) source can.
+        return (Compiled, (self.parser, self.source, self.consts, marshal.dumps(self.code)))
+
+    def __call__(self, text, index):
+        # the budgets of a parse are counted by the interpreted grammar.
+        if not isinstance(text, str) or _current_budget() is not None:
+            return self.parser(text, index)
+        res = self.entry(text, index)
+        return res if res[0] is False else Value(True, res[0], res[1], None)
+
+
+def compile_parser(p):
+    '''Optimize the grammar `p` and compile it into specialized Python code.
+
+    The compiled parser produces exactly the same results and errors as `p`.'''
+    return Compiled(optimize(p))
+
+
+def generate_source(p):
+    '''The Python source code `compile_parser()` generates for the grammar `p`.'''
+    return compile_parser(p).source
+
+
+def _literal_failure(text, index, s):
+    '''The failure of `string(s)`, see `Literal`.'''
+    matched, slen, tlen = 0, len(s), len(text)
+    while matched < slen and index + matched < tlen and text[index + matched] == s[matched]:
+        matched = matched + 1
+    return Value.failure(index + matched, s)
+
+
+class _Step(object):
+    '''Code running a parser at some index: `pre` are the statements to run
+    first, then `ok` tells whether it succeeded, `next`/`value` give the
+    success and `fail` the failure `Value` (all of them valid expressions,
+    even when `ok` is constant). `moves` tells whether the failure
+    may be at another index, and `result` names the `(index, value)`/failure
+    result when the parser has been called as a function.'''
+
+    def __init__(self, pre, ok, next, value, fail, moves, result=None):
+        self.pre, self.ok, self.next, self.value, self.fail = pre, ok, next, value, fail
+        self.moves, self.result = moves, result
+
+
+class _Compiler(object):
+    '''Emit one function per parser of a grammar.'''
+
+    def __init__(self):
+        self.names = {}
+        self.keep = []  # the ids in `names` must stay unique
+        self.functions = []
+        self.tables = []
+        self.consts = {}
+
+    def build(self, p):
+        '''The source code of the functions running `p` (the first, `_p0`,
+        being the entry) and the values of the constants it refers to.'''
+        self.function(p)
+        return '\n'.join(self.functions + self.tables) + '\n', self.consts
+
+    def const(self, value):
+        '''An expression evaluating to `value`.'''
+        if value is None or type(value) in (bool, int, str):
+            return repr(value)
+        name = '_c{}'.format(len(self.consts))
+        self.consts[name] = value
+        return name
+
+    def function(self, p, body=None, key=None):
+        '''The name of the function running `p` (or the arguments `p` of the
+        emitter `body`), emitted on first use.'''
+        key = id(p) if key is None else key
+        if key not in self.names:
+            name = self.names[key] = '_p{}'.format(len(self.names))
+            self.keep.append(p)
+            _Function(self, name).emit(p, body)
+        return self.names[key]
+
+    def table(self, entries):
+        name = '_t{}'.format(len(self.tables))
+        self.tables.append('{} = {{{}}}'.format(name, ', '.join(
+            '{!r}: {}'.format(c, fn) for c, fn in sorted(entries.items()))))
+        return name
+
+
+class _Function(object):
+    '''Emit the function `name` running a parser.'''
+
+    def __init__(self, compiler, name):
+        self.compiler, self.name = compiler, name
+        self.lines, self.count, self.need_n = [], 0, False
+
+    def fresh(self, prefix):
+        self.count += 1
+        return '{}{}'.format(prefix, self.count)
+
+    def emit(self, p, body):
+        if body is not None:
+            body(self, *p)
+        else:
+            # parsers are emitted by the `emit_<class name>` methods below.
+            emit = getattr(self, 'emit_' + type(p).__name__, None)
+            if emit is None or type(p).__module__ != Parser.__module__:
+                emit = self.emit_opaque
+            elif getattr(p, 'cut_at', None) is not None:
+                emit = self.emit_opaque  # failures after a `cut()` are raised.
+            emit(p)
+        header = ['def {}(text, index):'.format(self.name)]
+        if self.need_n:
+            header.append('    n = len(text)')
+        self.compiler.functions.append('\n'.join(header + self.lines) + '\n')
+
+    def line(self, code, depth=1):
+        self.lines.append('    ' * depth + code)
+
+    # Running children.
+
+    def step(self, p, i):
+        '''A `_Step` running `p` at the index `i`, inlined for leaves.'''
+        const = self.compiler.const
+        t = type(p)
+        if t is Literal and isinstance(p.s, str):
+            end = '{} + {}'.format(i, len(p.s)) if p.s else i
+            if p.skips is not None:
+                end = '{}.match(text, {}).end()'.format(const(p.skips), end)
+            if not p.s:
+                return _Step([], 'True', end, "''", '_failure({}, None)'.format(i), False)
+            return _Step([], 'text.startswith({!r}, {})'.format(p.s, i), end,
+                         repr(p.s), '_literal_failure(text, {}, {!r})'.format(i, p.s), len(p.s) > 1)
+        if t in (OneOf, NoneOf, Satisfy):
+            self.need_n = True
+            if t is Satisfy and getattr(p.predicate, '__objclass__', None) is str:
+                test = 'text[{}].{}()'.format(i, p.predicate.__name__)
+                failure = p.failure or 'does not satisfy predicate'
+            elif t is Satisfy:
+                test = '{}(text[{}])'.format(const(p.predicate), i)
+                failure = p.failure or 'does not satisfy predicate'
+            else:
+                chars = repr(p.chars) if isinstance(p.chars, str) else const(p.chars)
+                test = 'text[{}] {} {}'.format(i, 'in' if t is OneOf else 'not in', chars)
+                failure = p.failure
+            return _Step([], '{} < n and {}'.format(i, test), '{} + 1'.format(i), 'text[{}]'.format(i),
+                         '_failure({}, {})'.format(i, const(failure)), False)
+        if t is Eof:
+            self.need_n = True
+            return _Step([], '{} >= n'.format(i), i, 'None', "_failure({}, 'EOF')".format(i), False)
+        if t is Regex:
+            m = self.fresh('m')
+            end, value = '{}.end()'.format(m), '{}.group(0)'.format(m)
+            if p.combined is not None:
+                # what is skipped after the token is the group after those of the token.
+                pre = ['{} = {}.match(text, {})'.format(m, const(p.combined), i)]
+                value = 'text[{}:{}.start({})]'.format(i, m, p.exp.groups + 1)
+            else:
+                pre = ['{} = {}.match(text, {})'.format(m, const(p.exp), i)]
+                if p.skips is not None:
+                    end = '{}.match(text, {}).end()'.format(const(p.skips), end)
+            return _Step(pre, '{} is not None'.format(m), end, value,
+                         '_failure({}, {})'.format(i, const(p.exp.pattern)), False)
+        if t is SuccessWith:
+            return _Step([], 'True', '{} + 1'.format(i) if p.advance else i, const(p.value),
+                         '_failure({}, None)'.format(i), False)
+        if t is FailWith:
+            return _Step([], 'False', i, 'None', '_failure({}, {})'.format(i, const(p.message)), False)
+        r = self.fresh('r')
+        pre = ['{} = {}(text, {})'.format(r, self.compiler.function(p), i)]
+        return _Step(pre, '{}[0] is not False'.format(r), '{}[0]'.format(r), '{}[1]'.format(r), r, True, r)
+
+    def run(self, p, i, depth=1):
+        '''Emit the statements of running `p` at `i`.'''
+        s = self.step(p, i)
+        for code in s.pre:
+            self.line(code, depth)
+        return s
+
+    def unless(self, ok, depth):
+        '''Emit the test that `ok` does not hold.'''
+        for positive, negative in ((' is not False', ' is False'), (' is not None', ' is None')):
+            if ok.endswith(positive) and ' ' not in ok[:-len(positive)]:
+                return self.line('if {}{}:'.format(ok[:-len(positive)], negative), depth)
+        self.line('if not ({}):'.format(ok), depth)
+
+    def then(self, p, i, value=True, depth=1):
+        '''Run `p` at `i`, returning its failure. Returns the names holding the
+        index and (if `value`) the value after it succeeded.'''
+        s = self.run(p, i, depth)
+        if s.ok != 'True':
+            self.unless(s.ok, depth)
+            self.line('return ' + s.fail, depth + 1)
+        j = self.fresh('i')
+        self.line('{} = {}'.format(j, s.next), depth)
+        if not value:
+            return j, None
+        v = self.fresh('v')
+        self.line('{} = {}'.format(v, s.value), depth)
+        return j, v
+
+    def tail(self, p, i, depth=1):
+        '''Return the result of `p` at `i`.'''
+        if type(p) not in _INLINED:
+            self.line('return {}(text, {})'.format(self.compiler.function(p), i), depth)
+            return
+        s = self.run(p, i, depth)
+        if s.ok == 'False':
+            self.line('return ' + s.fail, depth)
+            return
+        if s.ok != 'True':
+            self.line('if {}:'.format(s.ok), depth)
+            depth = depth + 1
+        self.line('return ({}, {})'.format(s.next, s.value), depth)
+        if s.ok != 'True':
+            self.line('return ' + s.fail, depth - 1)
+
+    def succeed(self, s, depth=1):
+        '''Return the success of the step `s` if it succeeded.'''
+        if s.result is not None:
+            self.line('if {}:'.format(s.ok), depth)
+            self.line('return ' + s.result, depth + 1)
+        elif s.ok != 'False':
+            self.line('if {}:'.format(s.ok), depth)
+            self.line('return ({}, {})'.format(s.next, s.value), depth + 1)
+
+    # Combinators.
+
+    def emit_opaque(self, p):
+        r = self.fresh('r')
+        self.line('{} = {}(text, index)'.format(r, self.compiler.const(p)))
+        self.line('return ({0}[1], {0}[2]) if {0}[0] else {0}'.format(r))
+
+    def emit_Compose(self, p):
+        i = 'index'
+        for child in p.parsers[:-1]:
+            i, _ = self.then(child, i, value=False)
+        self.tail(p.parsers[-1], i)
+
+    def emit_Sequence(self, p):
+        if not p.parsers:
+            return self.emit_opaque(p)
+        i, values = 'index', []
+        for child in p.parsers:
+            i, v = self.then(child, i)
+            values.append(v)
+        self.line('return ({}, {})'.format(i, _shape(p.shape, values) if not p.flat else _tuple(values)))
+
+    def emit_alternatives(self, parsers, backtrack):
+        for child in parsers[:-1]:
+            s = self.run(child, 'index')
+            self.succeed(s)
+            if not backtrack and s.moves and s.ok != 'True':
+                f = s.result or self.fresh('f')
+                if s.result is None:
+                    self.line('{} = {}'.format(f, s.fail))
+                self.line('if {}[1] != index:'.format(f))
+                self.line('return ' + f, 2)
+        self.tail(parsers[-1], 'index')
+
+    def emit_Choice(self, p):
+        self.emit_alternatives(p.parsers, False)
+
+    def emit_TryChoice(self, p):
+        self.emit_alternatives(p.parsers, True)
+
+    def emit_Dispatch(self, p):
+        compiler, body = self.compiler, _Function.emit_alternatives
+
+        def alternatives(candidates):
+            key = (body, p.backtrack) + tuple(map(id, candidates))
+            return compiler.function((candidates, p.backtrack), body, key)
+
+        table = compiler.table(dict((c, alternatives(candidates)) for c, candidates in p.table.items()))
+        default, wide = alternatives(p.default), alternatives(p.wide)
+        self.need_n = True
+        self.line('if index < n:')
+        self.line('c = text[index]', 2)
+        self.line("return ({}.get(c) or ({} if c < '\\x80' else {}))(text, index)".format(table, default, wide), 2)
+        self.line('return {}(text, index)'.format(default))
+
+    def emit_Times(self, p):
+        self.emit_repeat(p, None)
+
+    def emit_repeat(self, p, sep, values=None, value='values'):
+        '''Emit the loop of the repetition `p`, collecting into `values`, and
+        returning `value`.'''
+        const, inf = self.compiler.const, p.maxt == float('inf')
+        mint, maxt = const(p.mint), const(p.maxt)
+        if values is None:
+            values = '[]' if p.sink is None else '_Sink({})'.format(const(p.sink))
+            value = 'values' if p.sink is None else 'len(values)'
+        self.repeat_value = value
+        self.line('cnt, values = 0, {}'.format(values))
+        if sep is not None:
+            self.line('values_index = index')
+        self.line('while True:' if inf else 'while cnt < {}:'.format(maxt))
+        (self.emit_times_body if sep is None else self.emit_separated_body)(p, mint, maxt, inf)
+        self.line('return ({}, {})'.format('index' if sep is None else 'values_index', self.repeat_value))
+
+    def emit_times_body(self, p, mint, maxt, inf):
+        s = self.run(p.parser, 'index', 2)
+        self.line('if {}:'.format(s.ok), 2)
+        self.line('j = {}'.format(s.next), 3)
+        if inf:
+            self.line('if j == index:', 3)
+            self.line('break', 4)
+        self.line('values.append({})'.format(s.value), 3)
+        self.line('index, cnt = j, cnt + 1', 3)
+        self.line('else:', 2)
+        self.line('if cnt >= {}:'.format(mint), 3)
+        self.line('break', 4)
+        self.line('return ' + s.fail, 3)
+        if not inf:
+            self.line('if cnt >= {}:'.format(maxt), 2)
+            self.line('break', 3)
+        self.need_n = True
+        self.line('if index >= n:', 2)
+        self.line('if cnt >= {}:'.format(mint), 3)
+        self.line('break', 4)
+        s = self.run(p.parser, 'index', 3)
+        self.line('if index != ({} if {} else {}[1]):'.format(s.next, s.ok, s.fail), 3)
+        self.line("return _failure(index, 'already meets the end, no enough text')", 4)
+
+    def emit_TakeWhile(self, p):
+        if p.pattern is not None:
+            self.line('end = {}.match(text, index).end()'.format(self.compiler.const(p.pattern)))
+        elif type(p.parser) in (Satisfy, OneOf, NoneOf):
+            self.line('end = index')
+            self.line('while True:')
+            s = self.run(p.parser, 'end', 2)
+            self.unless(s.ok, 2)
+            self.line('break', 3)
+            self.line('end += 1', 2)
+        else:
+            return self.emit_opaque(p)
+        if p.mint:
+            self.line('if end - index < {}:'.format(p.mint))
+            self.line('return ' + self.run(p.parser, 'end', 2).fail, 2)
+        self.line('return (end, {})'.format('None' if p.discard else 'text[index:end]'))
+
+    def emit_Separated(self, p):
+        self.emit_repeat(p, p.sep)
+
+    def emit_Fold(self, p):
+        if type(p.parser) not in (Times, Separated) or p.parser.sink is not None:
+            return self.emit_opaque(p)
+        i, v = self.then(p.init, 'index')
+        self.line('index = {}'.format(i))
+        folding = '_Folding({}, {})'.format(self.compiler.const(p.step), v)
+        self.emit_repeat(p.parser, p.parser.sep if type(p.parser) is Separated else None, folding, 'values.value')
+
+    def emit_separated_body(self, p, mint, maxt, inf):
+        s = self.run(p.parser, 'index', 2)
+        self.unless(s.ok, 2)
+        self.line('if cnt < {}:'.format(mint), 3)
+        self.line('return ' + s.fail, 4)
+        self.line('return (values_index, {})'.format(self.repeat_value), 3)
+        self.line('current_value = {}'.format(s.value), 2)
+        self.line('index = current_value_index = {}'.format(s.next), 2)
+        self.line('cnt += 1', 2)
+        s = self.run(p.sep, 'index', 2)
+        self.line('if {}:'.format(s.ok), 2)
+        self.line('index = {}'.format(s.next), 3)
+        if p.end in [True, None]:
+            self.line('current_value_index = index', 3)
+        self.line('else:', 2)
+        if p.end is True:
+            self.line('if cnt <= {}:'.format(mint), 3)
+            self.line('return ' + s.fail, 4)
+            self.line('return (values_index, {})'.format(self.repeat_value), 3)
+        else:
+            self.line('if cnt < {}:'.format(mint), 3)
+            self.line('return ' + s.fail, 4)
+            self.line('values.append(current_value)', 3)
+            self.line('return (current_value_index, {})'.format(self.repeat_value), 3)
+        self.line('values_index = current_value_index', 2)
+        self.line('values.append(current_value)', 2)
+
+    def emit_Option(self, p):
+        s = self.run(p.parser, 'index')
+        self.succeed(s)
+        self.line('return (index, {})'.format(self.compiler.const(p.default_value)))
+
+    def emit_Map(self, p):
+        i, v = self.then(p.parser, 'index')
+        self.line('return ({}, {}({}{}))'.format(i, self.compiler.const(p.fn), '*' if p.star else '', v))
+
+    def emit_Result(self, p):
+        i, _ = self.then(p.parser, 'index', value=False)
+        self.line('return ({}, {})'.format(i, self.compiler.const(p.value)))
+
+    def emit_Spanned(self, p):
+        i, v = self.then(p.parser, 'index')
+        self.line('return ({0}, ({1}, _Span(text, index, {0})))'.format(i, v))
+
+    def emit_Viewed(self, p):
+        i, _ = self.then(p.parser, 'index', value=False)
+        self.line('return ({0}, _Span(text, index, {0}))'.format(i))
+
+    def emit_Interned(self, p):
+        i, v = self.then(p.parser, 'index')
+        self.line('return ({}, {}.intern(text, {}))'.format(i, self.compiler.const(p), v))
+
+    def emit_Desc(self, p):
+        s = self.run(p.parser, 'index')
+        self.succeed(s)
+        if s.moves and s.ok != 'True':
+            f = s.result or self.fresh('f')
+            if s.result is None:
+                self.line('{} = {}'.format(f, s.fail))
+            self.line('if {}[1] != index:'.format(f))
+            self.line('return ' + f, 2)
+        self.line('return _failure(index, {})'.format(self.compiler.const(p.description)))
+
+    def emit_Skip(self, p):
+        self.emit_ends(p, True)
+
+    def emit_EndsWith(self, p):
+        self.emit_ends(p, False)
+
+    def emit_ends(self, p, consume):
+        i, v = self.then(p.parser, 'index')
+        s = self.run(p.other, i)
+        self.succeed(_Step([], s.ok, s.next if consume else i, v, None, False))
+        f = self.fresh('f')
+        self.line('{} = {}'.format(f, s.fail))
+        self.line("return _failure({0}[1], 'ends with {{}}'.format({0}[3]))".format(f))
+
+    def emit_Excepts(self, p):
+        i, v = self.then(p.parser, 'index')
+        s = self.run(p.other, i)
+        self.line('if {}:'.format(s.ok))
+        self.line('return _failure({}, \'should not be "{{}}"\'.format({}))'.format(i, s.value), 2)
+        self.line('return ({}, {})'.format(i, v))
+
+    def emit_Lookahead(self, p):
+        self.emit_unit(p, 'index')
+
+    def emit_Unit(self, p):
+        self.emit_unit(p, None)
+
+    def emit_unit(self, p, index):
+        s = self.run(p.parser, 'index')
+        self.succeed(_Step([], s.ok, index or s.next, s.value, None, False))
+        self.line('return _failure(index, {}[3])'.format(s.fail))
+
+    def emit_Exclude(self, p):
+        s = self.run(p.exclude, 'index')
+        self.line('if {}:'.format(s.ok))
+        self.line("return _failure(index, 'something other than {{}}'.format({}))".format(s.value), 2)
+        self.tail(p.parser, 'index')
+
+    def emit_Between(self, p):
+        i, _ = self.then(p.open, 'index', value=False)
+        i, v = self.then(p.parser, i)
+        s = self.run(p.close, i)
+        self.succeed(_Step([], s.ok, s.next, v, None, False))
+        self.line('return ' + s.fail)
+
+    def emit_Cut(self, p):
+        self.line('return (index, None)')
+
+    def emit_Forward(self, p):
+        # recursive references call the function of the definition by name.
+        if p.parser is None:
+            return self.emit_opaque(p)
+        self.tail(p.parser, 'index')
+
+    def emit_Bind(self, p):
+        i, v = self.then(p.parser, 'index')
+        fn = self.compiler.const(p.fn)
+        call = '{}({}, index)'.format(fn, v) if p.args_count == 2 else '{}({})'.format(fn, v)
+        self.line('r = {}(text, {})'.format(call, i))
+        self.line('return (r[1], r[2]) if r[0] else r')
+
+
+_INLINED = (Literal, OneOf, NoneOf, Satisfy, Eof, Regex, SuccessWith, FailWith)
+
+
+def _tuple(values):
+    return '({},)'.format(values[0]) if len(values) == 1 else '({})'.format(', '.join(values))
+
+
+def _shape(shape, values):
+    return _tuple([values[s] if isinstance(s, int) else _shape(s, values) for s in shape])
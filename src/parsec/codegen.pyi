@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import types
+import typing as T
+
+from . import Parser, Text, Value
+
+_U = T.TypeVar('_U')
+
+class Compiled(Parser[_U]):
+    parser: Parser[_U]
+    source: str
+    consts: dict[str, T.Any]
+    code: types.CodeType
+    entry: T.Callable[[str, int], T.Any]
+    def __init__(
+        self,
+        parser: Parser[_U],
+        source: T.Optional[str] = ...,
+        consts: T.Optional[dict[str, T.Any]] = ...,
+        code: T.Optional[bytes] = ...,
+    ) -> None: ...
+    def __call__(self, text: Text, index: int) -> Value[_U]: ...
+
+def compile_parser(p: Parser[_U]) -> Compiled[_U]: ...
+def generate_source(p: Parser) -> str: ...
@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Ready-made grammars built with parsec.py.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
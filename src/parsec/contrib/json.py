@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+A JSON (RFC 8259) grammar, optionally with comments and trailing commas.
+
+`loads()` parses a JSON document like `json.loads` does, with the same
+`object_hook`, `object_pairs_hook`, `parse_float` and `parse_int` hooks,
+and raises `ParseError` on invalid input. Every token is a single regular
+expression and the document grammar is compiled (see `parsec.codegen`) the
+first time a combination of options is used. `value()` gives the grammar of
+a JSON value itself, to be embedded into other grammars.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import re
+from functools import lru_cache, partial
+
+from .. import forward_declare, interned, regex, sepBy, sepEndBy, eof, skipping
+
+_whitespace = r'[ \t\n\r]*'
+_whitespace_and_comments = r'(?:[ \t\n\r]+|//[^\n]*|/\*(?:[^*]|\*(?!/))*\*/)*'
+
+_string = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_number = r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'
+
+_escapes = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_escape = re.compile(r'\\(?:u([0-9a-fA-F]{4})|(.))')
+
+
+def _unescape(match):
+    code = match.group(1)
+    return _escapes[match.group(2)] if code is None else chr(int(code, 16))
+
+
+def _string_value(s):
+    body = s.rstrip(' \t\n\r')[1:-1]
+    if '\\' not in body:
+        return body
+    body = _escape.sub(_unescape, body)
+    if '\\u' in s:
+        # join the surrogate pairs of characters beyond the BMP, leave lone ones.
+        body = body.encode('utf-16-le', 'surrogatepass').decode('utf-16-le', 'surrogatepass')
+    return body
+
+
+def _number_value(s):
+    # int() and float() allow surrounding whitespace.
+    return float(s) if '.' in s or 'e' in s or 'E' in s else int(s)
+
+
+def _number_value_with(parse_int, parse_float, s):
+    s = s.rstrip(' \t\n\r')
+    return parse_float(s) if '.' in s or 'e' in s or 'E' in s else parse_int(s)
+
+
+def value(comments=False, trailing_commas=False,
+          object_hook=None, object_pairs_hook=None, parse_float=None, parse_int=None):
+    '''The grammar of a JSON value followed by whitespace (and comments if
+    `comments`). Arrays and objects may end with a comma if `trailing_commas`.
+    The hooks are those of `json.loads`.'''
+    # the tokens skip JSON's whitespace, whatever the grammar of a caller skips.
+    with skipping(None):
+        return _value(comments, trailing_commas, object_hook, object_pairs_hook, parse_float, parse_int)
+
+
+def _value(comments, trailing_commas, object_hook, object_pairs_hook, parse_float, parse_int):
+    comment = regex(_whitespace_and_comments)
+
+    def token(pattern):
+        # one regular expression for the token and the whitespace after it,
+        # which the values of strings and numbers are stripped of.
+        if comments:
+            return regex(pattern) << comment
+        return regex(pattern + _whitespace)
+
+    separated = sepEndBy if trailing_commas else sepBy
+    comma, colon = token(','), token(':')
+
+    json_value = forward_declare()
+    quoted = token(_string).parsecmap(_string_value).desc('string')
+    if parse_float in (None, float) and parse_int in (None, int):
+        number = token(_number).parsecmap(_number_value)
+    else:
+        number = token(_number).parsecmap(partial(_number_value_with, parse_int or int, parse_float or float))
+    array = token(r'\[') >> separated(json_value, comma) << token(r'\]')
+    # like `json.loads`, the keys of all objects are shared (per document).
+    key = interned(quoted)
+    json_object = token(r'\{') >> separated(key + (colon >> json_value), comma) << token(r'\}')
+    if object_pairs_hook is not None:
+        json_object = json_object.parsecmap(object_pairs_hook)
+    else:
+        json_object = json_object.parsecmap(dict)
+        if object_hook is not None:
+            json_object = json_object.parsecmap(object_hook)
+    json_value.define(quoted
+                      | number.desc('number')
+                      | json_object
+                      | array
+                      | token('true').result(True)
+                      | token('false').result(False)
+                      | token('null').result(None))
+    return json_value
+
+
+def document(**options):
+    '''The compiled grammar of a whole JSON document, see `value()` for the
+    `options`. The documents of the last 32 combinations of options used are
+    cached (hooks are compared by identity, so pass the same functions).'''
+    return _document(tuple(sorted(options.items())))
+
+
+@lru_cache(maxsize=32)
+def _document(options):
+    options = dict(options)
+    with skipping(None):
+        whitespace = regex(_whitespace_and_comments if options.get('comments') else _whitespace)
+    return (whitespace >> value(**options) << eof()).compile()
+
+
+def loads(text, **options):
+    '''Parse the JSON document `text`, see `value()` for the `options`.'''
+    return document(**options).parse(text)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections.abc as CA
+import typing as T
+
+from .. import Parser
+
+def value(
+    comments: bool = ...,
+    trailing_commas: bool = ...,
+    object_hook: T.Optional[CA.Callable[[dict[str, T.Any]], T.Any]] = ...,
+    object_pairs_hook: T.Optional[CA.Callable[[list[tuple[str, T.Any]]], T.Any]] = ...,
+    parse_float: T.Optional[CA.Callable[[str], T.Any]] = ...,
+    parse_int: T.Optional[CA.Callable[[str], T.Any]] = ...,
+) -> Parser: ...
+def document(**options: T.Any) -> Parser: ...
+def loads(text: str, **options: T.Any) -> T.Any: ...
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Test the on-disk cache of grammars.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from parsec import *
+from parsec.cache import cached, fingerprint
+from parsec.codegen import Compiled
+
+
+def build_grammar():
+    item = regex(r'[0-9]+').parsecmap(int) | string('x').result(0)
+    return sepBy(item, string(',')) << eof()
+
+
+def build_opaque_grammar():
+    return many(letter()).parsecmap(lambda letters: ''.join(letters))
+
+
+class CacheTest(unittest.TestCase):
+    '''Test the implementation of `cached`.'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cached(self):
+        grammar = cached(build_grammar, self.directory)
+        self.assertEqual(grammar.parse('1,x,3'), [1, 0, 3])
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        loaded = cached(build_grammar, self.directory)
+        self.assertIsNot(loaded, grammar)
+        self.assertEqual(loaded.parse('1,x,3'), [1, 0, 3])
+        self.assertRaises(ParseError, loaded.parse, '1,y')
+
+    def test_compiled(self):
+        grammar = cached(build_grammar, self.directory, compile=True)
+        loaded = cached(build_grammar, self.directory, compile=True)
+        self.assertIsInstance(loaded, Compiled)
+        self.assertEqual(loaded.source, grammar.source)
+        self.assertEqual(loaded.parse('1,x,3'), [1, 0, 3])
+
+    def test_key(self):
+        self.assertEqual(fingerprint(build_grammar), fingerprint(build_grammar))
+        self.assertNotEqual(fingerprint(build_grammar), fingerprint(build_grammar, key=2))
+        self.assertNotEqual(fingerprint(build_grammar), fingerprint(build_opaque_grammar))
+
+        cached(build_grammar, self.directory)
+        cached(build_grammar, self.directory, key=2)
+        # the stale entry has been replaced.
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_corrupted(self):
+        cached(build_grammar, self.directory)
+        for entry in os.listdir(self.directory):
+            with open(os.path.join(self.directory, entry), 'wb') as f:
+                f.write(b'garbage')
+        self.assertEqual(cached(build_grammar, self.directory).parse('1'), [1])
+
+    def test_unpicklable(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            grammar = cached(build_opaque_grammar, self.directory)
+        self.assertEqual(grammar.parse('ab1'), 'ab')
+        self.assertEqual(len(caught), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Test the code generator of parsec.py.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import itertools
+import random
+import re
+import unittest
+
+from parsec import *
+from parsec.codegen import Compiled, compile_parser, generate_source
+
+
+def _count(n, value):
+    return n + 1
+
+
+def _concat(x, y):
+    return repr(x) + repr(y)
+
+
+def _skipping(build):
+    with skipping(r' |,'):
+        return build()
+
+
+class CodegenTest(unittest.TestCase):
+    '''Compare compiled grammars with the interpreted ones.'''
+
+    texts = [''.join(t) for n in range(4) for t in itertools.product('ab1 ,', repeat=n)]
+
+    leaves = [
+        lambda: string('a'), lambda: string('ab'), lambda: string(''), lambda: letter(),
+        lambda: digit(), lambda: one_of('ab'), lambda: none_of('a'), lambda: eof(),
+        lambda: regex(r'[0-9]+'), lambda: regex(r'\s*'), lambda: success_with(0),
+        lambda: string('b').result(1), lambda: fail_with('fail'), lambda: any(),
+        lambda: satisfy(lambda c: c in 'b,', 'b or ,'), lambda: string(['a']),
+        lambda: take_while('ab'), lambda: take_while1(str.isdigit), lambda: skip_while(' '),
+        lambda: take_until(','), lambda: many1_str(none_of(',').desc('no ,')),
+        lambda: _skipping(lambda: string('a')), lambda: _skipping(lambda: string('')),
+        lambda: _skipping(lambda: regex(r'[0-9]+')), lambda: _skipping(lambda: regex(r'B', re.I)),
+        lambda: _skipping(lambda: keyword('ab')),
+    ]
+
+    def grammar(self, depth):
+        if depth == 0 or random.random() < 0.2:
+            return random.choice(self.leaves)()
+        p, q = self.grammar(depth - 1), self.grammar(depth - 1)
+        # separated elements consume input, or the loop would never end.
+        e = one_of('ab') + p
+        return random.choice([
+            lambda: p | q, lambda: p ^ q, lambda: p + q, lambda: p >> q, lambda: p << q,
+            lambda: p < q, lambda: p / q, lambda: p.result(2), lambda: p.desc('p'),
+            lambda: p.parsecmap(repr), lambda: optional(p, 'default'), lambda: many(p),
+            lambda: many1(p), lambda: times(p, 1, 2), lambda: sepBy(e, q), lambda: sepEndBy1(e, q),
+            lambda: endBy(e, q), lambda: separated(p, q, 1, 2), lambda: lookahead(p),
+            lambda: unit(p), lambda: exclude(p, q), lambda: between(p, q, p), lambda: p.mark(), lambda: spanned(p),
+            lambda: as_view(p), lambda: interned(p.parsecmap(repr)),
+            lambda: p >= (lambda value: q), lambda: try_choices_longest(p, q), lambda: joint(p),
+            lambda: many(p, sink=id), lambda: sepEndBy(e, q, sink=id), lambda: many_fold(p, 0, _count),
+            lambda: sepBy_fold(e, q, '', _concat), lambda: chainl1(p, q.result(_concat)),
+        ])()
+
+    def assertCompiled(self, parser, texts):
+        compiled = compile_parser(parser)
+        # the failures of `try_choices_longest` show the (optimized) choices.
+        if not all(not isinstance(p, Longest) for p in walk(parser)):
+            parser = compiled.parser
+        for text in texts:
+            self.assertEqual(compiled(text, 0), parser(text, 0), (text, compiled.source))
+        return compiled
+
+    def test_differential(self):
+        random.seed(0)
+        for _ in range(300):
+            self.assertCompiled(self.grammar(4), self.texts)
+
+    def test_source(self):
+        parser = many(digit()) + (string('a') | string('b'))
+        source = generate_source(parser)
+        self.assertIn('while True:', source)
+        self.assertIn('.isdigit()', source)
+        self.assertIn("text.startswith('a', ", source)
+
+    def test_compiled(self):
+        parser = sepBy(regex(r'\d+').parsecmap(int), string(','))
+        compiled = parser.compile()
+        self.assertIsInstance(compiled, Compiled)
+        self.assertEqual(compiled.parse('1,2,3'), [1, 2, 3])
+        self.assertEqual((compiled << eof()).parse('1,2'), [1, 2])
+        self.assertRaises(ParseError, compiled.parse_strict, '1,2,')
+        # non-str input is left to the interpreted grammar.
+        self.assertEqual(many(one_of('ab')).compile().parse(['a', 'b', 'c']), ['a', 'b'])
+
+    def test_generate(self):
+        @generate
+        def pair():
+            key = yield letter()
+            yield string('=')
+            value = yield digit()
+            return key, value
+
+        parser = sepBy(pair, string(';'))
+        self.assertCompiled(parser, ['a=1;b=2', 'a=1;b', '', '1'])
+
+    def test_skipping(self):
+        with skipping(r'\s+|#[^\n]*') as ignore:
+            name, number = regex(r'[a-z]+'), regex(r'\d+', re.I)
+            parser = ignore >> sepBy(name + (string('=') >> number), string(';'))
+        source = generate_source(parser)
+        # a token and what is skipped after it are matched at once.
+        self.assertIn('.start(1)]', source)
+        compiled = self.assertCompiled(parser, [' a = 1 ; b=2 # x\n', 'a=1;', 'a = # x\n 1 ;b', '#'])
+        self.assertEqual(compiled.parse(' a = 1 ;\n b=2 # x'), [('a', '1'), ('b', '2')])
+        with skipping(r'\s+|(#[^\n]*)'):
+            word, pair = regex(r'[a-z]+'), regex(r'([a-z])=(\d)')
+        self.assertEqual(self.assertCompiled(word + word, ['abc #c\n def', 'abc  ']).parse('abc #c\n def'),
+                         ('abc', 'def'))
+        self.assertEqual(self.assertCompiled(pair, ['a=1 #c', 'a=']).parse('a=1 #c'), 'a=1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Test the JSON grammar of parsec.contrib.json.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import json
+import unittest
+from collections import OrderedDict
+from decimal import Decimal
+
+from parsec import *
+from parsec.contrib.json import _document, loads, value
+
+
+class JsonTest(unittest.TestCase):
+    '''Compare parsec.contrib.json with the json module.'''
+
+    valid = [
+        '0', '-0', '12', '-1.5e3', '1E-2', '"a"', 'true', 'false', 'null', '[]', '{}', ' [ 1 , 2 ] ',
+        '{"a": [1, {"b": null}], "c": "d"}', '"\\"\\\\\\/\\b\\f\\n\\r\\t"', '"\\u00e9\\ud83d\\ude00"',
+        '"\\ud83d"', '"é😀"', '[[[[]]]]', '{"a": 1, "a": 2}', '\n{\r\n\t"x" : 10}\n',
+    ]
+
+    invalid = [
+        '', ' ', '01', '1.', '.5', '+1', '-', '"a', '"\\x"', '"\\u12"', '"a\nb"', '[1,]', '[1 2]',
+        '{"a"}', '{"a":}', '{a: 1}', '{"a": 1,}', 'tru', 'nul', '[] []', '// c\n1', "'a'",
+    ]
+
+    def test_valid(self):
+        for text in self.valid:
+            self.assertEqual(loads(text), json.loads(text), text)
+
+    def test_invalid(self):
+        for text in self.invalid:
+            self.assertRaises(ValueError, json.loads, text)
+            self.assertRaises(ParseError, loads, text)
+
+    def test_types(self):
+        self.assertIs(type(loads('1')), int)
+        self.assertIs(type(loads('1.0')), float)
+        self.assertIs(type(loads('1e2')), float)
+
+    def test_extensions(self):
+        text = '/* config */ {\n  "a": [1, 2,], // two\n  "b": {"c": true,},\n}'
+        self.assertEqual(loads(text, comments=True, trailing_commas=True), {'a': [1, 2], 'b': {'c': True}})
+        self.assertRaises(ParseError, loads, text, trailing_commas=True)
+        self.assertRaises(ParseError, loads, text, comments=True)
+        self.assertEqual(loads('[1 /* , 2 */]', comments=True), [1])
+
+    def test_hooks(self):
+        text = '{"b": 1.10, "a": [2, {"c": 3}]}'
+        hooks = [dict(object_pairs_hook=OrderedDict), dict(object_hook=lambda d: sorted(d.items())),
+                 dict(parse_float=Decimal), dict(parse_int=str), dict(parse_float=float, parse_int=int)]
+        for options in hooks:
+            self.assertEqual(loads(text, **options), json.loads(text, **options), options)
+
+    def test_cached_documents(self):
+        for i in range(100):
+            self.assertEqual(loads('[1]', parse_int=lambda s: int(s) + i), [1 + i])
+        self.assertLessEqual(_document.cache_info().currsize, 32)
+
+    def test_shared_keys(self):
+        rows = loads('[{"name": 1, "size": 2}, {"name": 3, "size": 4}]')
+        self.assertEqual([[id(k) for k in row] for row in rows[1:]], [[id(k) for k in rows[0]]])
+
+    def test_value(self):
+        parser = string('config') >> string(' ') >> value()
+        self.assertEqual(parser.parse('config {"a": [true]} '), {'a': [True]})
+        # the tokens of JSON do not skip what those of a caller's grammar do.
+        with skipping(r'\s+|#[^\n]*'):
+            parser = string('config') >> value()
+        self.assertEqual(parser.parse('config [1 ]'), [1])
+        self.assertRaises(ParseError, parser.parse, 'config [1 #c\n]')
+        self.assertRaises(ParseError, loads, '[1 #c\n]')
+
+
+if __name__ == '__main__':
+    unittest.main()
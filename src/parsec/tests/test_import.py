@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Test what importing parsec costs, in a fresh interpreter.
+'''
+
+__author__ = 'He Tao, sighingnow@gmail.com'
+
+import os
+import subprocess
+import sys
+import unittest
+
+import parsec
+
+_script = '''
+import re, sys  # `re` imports `sre_parse` itself, before Python 3.11.
+before = set(sys.modules)
+import parsec
+print(' '.join(sorted(set(sys.modules) - before)))
+print(' '.join(name for name in parsec._builders if name in vars(parsec)))
+'''
+
+
+def run(*args):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(parsec.__file__)))
+    return subprocess.run([sys.executable] + list(args), env=env, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+# Python 3.6 has no module `__getattr__` (PEP 562), so parsec builds all of
+# its parsers at import there.
+_lazy = sys.version_info >= (3, 7)
+
+
+class ImportTest(unittest.TestCase):
+    '''Test the laziness of `import parsec`.'''
+
+    @unittest.skipUnless(_lazy, 'requires Python 3.7')
+    def test_lazy(self):
+        modules, built = run('-c', _script).stdout.split('\n')[:2]
+        # the slow modules parsec itself would import (the standard library
+        # is free to import anything else), see benchmarks/bench_import.py.
+        for module in ('decimal', 'inspect', 'sre_parse', 'parsec.codegen'):
+            self.assertNotIn(module, modules.split())
+        self.assertEqual(built, '')
+
+    def test_built_on_access(self):
+        self.assertIs(parsec.decimal, parsec.decimal_number)
+        self.assertEqual(parsec.integer.parse('-0x1f'), -31)
+        self.assertIn('integer', vars(parsec))
+        self.assertIn('scientific', parsec.__all__)
+        self.assertIn('u16le', parsec.__all__)
+        self.assertEqual(parsec.u16le.parse(b'\1\0'), 1)
+        with self.assertRaises(AttributeError):
+            parsec.no_such_parser
+
+    def test_all(self):
+        names = {}
+        exec('from parsec import *', names)
+        for name in ('re', 'sys', 'time', 'struct', 'partial', 'reduce'):
+            self.assertNotIn(name, names)
+        for name in ('Parser', 'string', 'skipping', 'integer'):
+            self.assertIn(name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
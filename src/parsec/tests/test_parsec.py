@@ -9,12 +9,27 @@ Test the basic functions of parsec.py.
 
 __author__ = 'He Tao, sighingnow@gmail.com'
 
+import gc
+import mmap
+import operator
+import pickle
 import re
 import random
+import struct
+import tempfile
 import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import reduce
 
 from parsec import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class ParseErrorTest(unittest.TestCase):
     def test_loc_info_should_throw_on_invalid_index(self):
         with self.assertRaises(ValueError):
@@ -237,6 +252,49 @@ class ParsecPrimTest(unittest.TestCase):
         with self.assertRaises(ParseError):
             parser.parse("1")
 
+    def test_spanned(self):
+        parser = many1(spanned(many(letter())) << string('\n'))
+        text = 'asdf\nqwer\n'
+        lines = parser.parse(text)
+        self.assertEqual(lines[1][0], ['q', 'w', 'e', 'r'])
+        span = lines[1][1]
+        self.assertEqual((span.start, span.end), (5, 9))
+        self.assertEqual(span, Span(text, 5, 9))
+        # spans are only equal within one text.
+        self.assertNotEqual(span, Span('', 5, 9))
+        self.assertNotEqual(span, Span(''.join(text), 5, 9))
+        self.assertEqual(len({span, Span(text, 5, 9), Span('', 5, 9)}), 2)
+        self.assertEqual(span.fragment, 'qwer')
+        self.assertEqual((span.start_loc, span.end_loc), ((1, 0), (1, 4)))
+        text = 'ab\n\ncd\ne'
+        for start in range(len(text) + 1):
+            for end in range(start, len(text) + 1):
+                span = Span(text, start, end)
+                self.assertEqual(span.start_loc, ParseError.loc_info(text, start))
+                self.assertEqual(span.end_loc, ParseError.loc_info(text, end))
+        tokens = ['b', 'c']
+        self.assertEqual(string('b').spanned().parse_partial(tokens), (('b', Span(tokens, 0, 1)), ['c']))
+        self.assertEqual(mark(string('b')).parse(['b']), ((0, 0), 'b', (0, 1)))
+
+    def test_span_lines(self):
+        class Text(str):  # unlike `str`, a text that can be referred to weakly.
+            pass
+
+        text = Text('ab\ncd')
+        spans = [Span(text, 0, 1), Span(text, 4, 5)]
+        self.assertEqual([span.start_loc for span in spans], [(0, 0), (1, 1)])
+        self.assertIs(spans[0]._lines, spans[1]._lines)
+        # the index of the lines of the last text does not keep it alive.
+        text, spans = weakref.ref(text), None
+        gc.collect()
+        self.assertIsNone(text())
+        # nor does the parse that used it, once it is over.
+        text = Text('a\nb')
+        self.assertEqual(sepBy(mark(letter()), string('\n')).parse(text), [((0, 0), 'a', (0, 1)), ((1, 0), 'b', (1, 1))])
+        text = weakref.ref(text)
+        gc.collect()
+        self.assertIsNone(text())
+
     def test_choice_with_compose(self):
         parser = (string('\\') >> string('y')) | string('z')
         self.assertEqual(parser.parse('\\y'), 'y')
@@ -296,6 +354,25 @@ class ParsecCombinatorTest(unittest.TestCase):
         self.assertRaises(ParseError, parser.parse, '')
         self.assertRaises(ParseError, parser.parse, '1')
 
+    def test_sink(self):
+        values = []
+        parser = many(letter(), sink=values.append)
+        self.assertEqual(parser.parse('xyz1'), 3)
+        self.assertEqual(values, ['x', 'y', 'z'])
+
+        values = []
+        parser = endBy1(letter(), string(','), sink=values.append) + many1(digit(), sink=values.append)
+        self.assertEqual(parser.parse('x,y,1'), (2, 1))
+        self.assertEqual(values, ['x', 'y', '1'])
+        # values are handed over as soon as they are parsed, even if the parse fails later.
+        del values[:]
+        self.assertRaises(ParseError, parser.parse, 'x,y,z')
+        self.assertEqual(values, ['x', 'y'])
+
+        values = []
+        self.assertEqual(sepBy(letter(), string(','), sink=values.append).parse('x,y,'), 2)
+        self.assertEqual(values, ['x', 'y'])
+
     def test_separated(self):
         parser = separated(string('x'), string(','), 2, 4)
         self.assertEqual(parser.parse('x,x,x') , ['x', 'x', 'x'])
@@ -361,6 +438,27 @@ class ParsecCombinatorTest(unittest.TestCase):
         self.assertRaises(ParseError, parser.parse, ('1'))
         self.assertRaises(ParseError, parser.parse, ('1,'))
 
+    def test_fold(self):
+        number = regex(r'[0-9]+').parsecmap(int)
+        parser = many_fold(number << spaces(), 0, lambda total, n: total + n)
+        self.assertEqual(parser.parse('1 2 3'), 6)
+        self.assertEqual(parser.parse('x'), 0)
+        parser = sepBy_fold(number, string(','), (), lambda values, n: values + (n,))
+        self.assertEqual(parser.parse('1,2,3,'), (1, 2, 3))
+        self.assertEqual(parser.parse(''), ())
+        self.assertRaises(ParseError, many_fold(string('ab'), 0, lambda n, _: n + 1).parse_strict, 'ababa')
+
+    def test_chain(self):
+        number = regex(r'[0-9]+').parsecmap(int)
+        minus = string('-').result(lambda x, y: x - y)
+        power = string('^').result(lambda x, y: x ** y)
+        self.assertEqual(chainl1(number, minus).parse('10-2-3'), 5)
+        self.assertEqual(chainl1(number, minus).parse_partial('10-'), (10, '-'))
+        self.assertEqual(chainr1(number, power).parse('2^3^2'), 512)
+        self.assertEqual(chainr1(number, minus).parse('10-2-3'), 11)
+        self.assertEqual(chainr1(number, minus).parse('7'), 7)
+        self.assertRaises(ParseError, chainl1(number, minus).parse, '-1')
+
     def test_endBy(self):
         parser = endBy(letter(), string(','))
         self.assertEqual(parser.parse_strict('x,')    , ['x'])
@@ -431,6 +529,54 @@ class ParsecCombinatorTest(unittest.TestCase):
 
         self.assertEqual(bracketed_expr.parse("((x))"), 'x')
 
+    def test_forward(self):
+        expr = forward_declare()
+        atom = regex(r'[a-z]+')
+        expr.define(atom | between(string('('), string(')'), sepBy(expr, string(' '))))
+        self.assertEqual(expr.parse('a'), 'a')
+        self.assertEqual(expr.parse('(a (b c) ())'), ['a', ['b', 'c'], []])
+        self.assertRaises(ParseError, expr.parse_strict, '(a')
+        self.assertRaises(ValueError, expr.define, atom)
+        self.assertRaises(ValueError, Parser.forward().parse, 'a')
+
+        optimized = expr.optimize()
+        self.assertIsInstance(optimized, Forward)
+        self.assertIn(optimized, list(walk(optimized.parser)))
+        self.assertEqual(optimized.parse('(a (b c) ())'), ['a', ['b', 'c'], []])
+        compiled = expr.compile()
+        self.assertEqual(compiled.parse('(a (b c) ())'), ['a', ['b', 'c'], []])
+        self.assertRaises(ParseError, compiled.parse_strict, '(a')
+
+    def test_cut(self):
+        keyword = string('if') >> cut() >> string(' x')
+        parser = keyword ^ regex('[a-z]+')
+        self.assertEqual(parser.parse('if x'), ' x')
+        with self.assertRaises(ParseError) as context:
+            parser.parse('iffy')
+        self.assertEqual(context.exception.index, 2)
+        self.assertRaises(ParseError, parser.optimize().parse, 'iffy')
+        self.assertRaises(ParseError, parser.compile().parse, 'iffy')
+        self.assertEqual(parser.compile().parse('if x'), ' x')
+
+        parser = many((string('a') + cut()) + string('b'))
+        self.assertEqual(parser.parse_partial('ababc'), ([(('a', None), 'b')] * 2, 'c'))
+        self.assertRaises(ParseError, parser.parse, 'abac')
+        parser = optional(between(string('(') >> cut(), string(')'), string('a')), 'none')
+        self.assertEqual(parser.parse('x'), 'none')
+        self.assertRaises(ParseError, parser.parse, '(a')
+
+        @generate
+        def assignment():
+            name = yield regex('[a-z]+')
+            yield string('=') << cut()
+            value = yield regex('[0-9]+')
+            return name, value
+
+        parser = assignment ^ regex('[a-z]+=?')
+        self.assertEqual(parser.parse('a=1'), ('a', '1'))
+        self.assertEqual(parser.parse('a'), 'a')
+        self.assertRaises(ParseError, parser.parse, 'a=b')
+
     def test_validate(self):
         parser = any() >= validate(str.isalpha)
         self.assertEqual(parser.parse("a"), "a")
@@ -469,6 +615,103 @@ class ParsecCharTest(unittest.TestCase):
         self.assertRaises(ParseError, parser.parse, 'c')
         self.assertEqual(parser.parse('d'), 'd')
 
+    def test_take_while(self):
+        for parser in [take_while('ab'), take_while(lambda c: c in 'ab'), many_str(one_of('ab'))]:
+            self.assertEqual(parser.parse('abac'), 'aba')
+            self.assertEqual(parser.parse('c'), '')
+            self.assertEqual(parser.parse(['a', 'b', 'c']), ['a', 'b'])
+        self.assertEqual(take_while(str.isspace).parse(' \t\nx'), ' \t\n')
+        self.assertEqual(many_str(none_of('"')).parse('ab"c'), 'ab')
+        self.assertEqual(skip_while('ab').parse_partial('abc'), (None, 'c'))
+
+        parser = take_while1(str.isdigit)
+        self.assertEqual(parser.parse('12a'), '12')
+        self.assertEqual(parser('a', 0), many1(satisfy(str.isdigit))('a', 0))
+        parser = many1_str(one_of('ab').desc('a or b'))
+        self.assertEqual(parser('c', 0), many1(one_of('ab').desc('a or b'))('c', 0))
+        # other parsers repeat as `many` does.
+        parser = many1_str(string('ab'))
+        self.assertEqual(parser.parse('ababa'), 'abab')
+        self.assertEqual(parser('aa', 0), many1(string('ab'))('aa', 0))
+
+    def test_take_until(self):
+        parser = take_until('*/')
+        self.assertEqual(parser.parse_partial('a * b */ c'), ('a * b ', '*/ c'))
+        self.assertEqual(parser.parse('*/'), '')
+        self.assertEqual(parser.parse(list('ab*/')), ['a', 'b'])
+        self.assertRaises(ParseError, parser.parse, 'a * b')
+
+    def test_skipping(self):
+        with skipping(r'\s+|;[^\n]*') as ignore:
+            lparen, rparen = string('('), string(')')
+            number = regex(r'\d+').parsecmap(int)
+            with skipping(None):
+                quote = string("'")
+        sexpr = forward_declare()
+        sexpr.define(number | (lparen >> many(sexpr) << rparen) | (quote >> sexpr))
+        program = ignore >> many(sexpr)
+        self.assertEqual(program.parse(' (1 ; one\n (2 3)) 4 ; end'), [[1, [2, 3]], 4])
+        self.assertEqual(program.parse_partial("' (1)"), ([], "' (1)"))
+        self.assertEqual(string('(').parse_partial('( '), ('(', ' '))
+        self.assertEqual(repr(lparen), "Literal('(', {!r})".format(lparen.skips))
+        self.assertEqual(pickle.loads(pickle.dumps(program)).parse('(1 2) ;'), [[1, 2]])
+        # the same as skipping with a parser after every token.
+        ignored = regex(r'(?:\s+|;[^\n]*)*')
+        for text in ['12 ;x\n', '12', '12;', ' 12', '']:
+            self.assertEqual(number(text, 0), (regex(r'\d+').parsecmap(int) << ignored)(text, 0))
+        # what is skipped may have groups of its own, and so may the token.
+        with skipping(r'\s+|(#[^\n]*)'):
+            word, pair = regex(r'[a-z]+'), regex(r'([a-z])=(\d)')
+        self.assertEqual(word.parse('abc  '), 'abc')
+        self.assertEqual((word + word).parse('abc #c\n def'), ('abc', 'def'))
+        self.assertEqual(pair.parse('a=1 #c'), 'a=1')
+        # regular expressions of other flags are matched apart from what is skipped.
+        with skipping(r'\s+'):
+            tokens = [regex(r'(?i)ab'), regex(r'ab', re.I)]
+        with skipping(rb'\s+'):
+            tokens.append(string(b'ab'))
+        self.assertIsNone(tokens[0].combined)
+        self.assertEqual(tokens[0].parse_partial('AB  c'), ('AB', 'c'))
+        self.assertEqual(tokens[1].parse_partial('aB\tc'), ('aB', 'c'))
+        self.assertEqual(tokens[2].parse_partial(b'ab\n c'), (b'ab', b'c'))
+
+    def test_keyword(self):
+        parser = keyword('if')
+        self.assertEqual(parser.parse_partial('if x'), ('if', ' x'))
+        self.assertEqual(parser.parse('if'), 'if')
+        self.assertRaises(ParseError, parser.parse, 'iffy')
+        with skipping(r'\s'):
+            parser = keyword('if') + keyword('x')
+        self.assertEqual(parser.parse('if  x '), ('if', 'x'))
+
+    def test_scan_bytes(self):
+        for text in [b'\t 1 2\r\nx', bytearray(b'\t 1 2\r\nx'), memoryview(b'\t 1 2\r\nx')]:
+            self.assertEqual(bytes(take_while(b' \t12').parse_partial(text)[0]), b'\t 1 2')
+            self.assertEqual(bytes(take_while(lambda c: c not in b'\r\n').parse_partial(text)[0]), b'\t 1 2')
+            self.assertEqual(skip_while(lambda c: c < 0x30).parse_partial(text)[0], None)
+            self.assertEqual(bytes((take_until(b'\r\n') << string(b'\r\n')).parse_partial(text)[0]), b'\t 1 2')
+            self.assertRaises(ParseError, take_until(b'\n\n').parse, text)
+        self.assertEqual(many_str(none_of(b'"')).parse_partial(b'ab"c'), (b'ab', b'"c'))
+        self.assertEqual(take_while1(b'x').parse(b'xx'), b'xx')
+        self.assertRaises(ParseError, take_while1(b'x').parse, b'y')
+        # predicates on characters are not scanned as bytes.
+        self.assertIsNone(take_while(lambda c: c.isspace()).byte_pattern)
+        self.assertIsNone(take_while(str.isspace).byte_pattern)
+        self.assertEqual(take_while(lambda c: c == 'a').parse(b'aa'), b'')
+        # nor are they called before there are bytes to scan.
+        calls = []
+        parser = take_while(lambda c: calls.append(c) or c < 0x30)
+        self.assertEqual((parser.byte_pattern, calls), (None, []))
+        self.assertEqual(parser.parse(b' 0'), b' ')
+        self.assertEqual(calls, [0x20, 0x30])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_scan_numpy(self):
+        text = numpy.frombuffer(b'  12,34\n', dtype=numpy.uint8)
+        self.assertEqual(skip_while(b' ').parse_partial(text)[0], None)
+        self.assertEqual(take_while(b' ').parse_partial(text)[0].tobytes(), b'  ')
+        self.assertEqual(take_until(b'\n').parse_partial(text)[0].tobytes(), b'  12,34')
+
     def test_exclude(self):
         parser = exclude(string("test"), string("should-be-excluded"))
         self.assertEqual(parser.parse("test"), "test")
@@ -484,6 +727,79 @@ class ParsecCharTest(unittest.TestCase):
         self.assertEqual(parser.parse("abc"), "abc")
         self.assertEqual(parser.parse("a"), "a")
 
+    def test_as_view(self):
+        text = 'abc 123'
+        for word in (regex(r'[a-z]+'), many1_str(letter())):
+            view = as_view(word).parse_partial(text)[0]
+            self.assertEqual((view, str(view), view.fragment), (Span(text, 0, 3), 'abc', 'abc'))
+            self.assertIs(view.text, text)
+        self.assertEqual(as_view(regex(r'[0-9]+'))('abc', 0), Value.failure(0, '[0-9]+'))
+        self.assertEqual(as_view(string('a')).parse(['a']).fragment, ['a'])
+
+    def test_interned(self):
+        key = interned(regex(r'[a-z]+'), max_size=2)
+        parser = sepBy((key << string('=')) + regex(r'[0-9]+'), string(','))
+        text = ','.join('{}={}'.format(k, i) for i, k in enumerate(['ab', 'cd', 'ab', 'ef', 'cd', 'ef']))
+        keys = [k for k, _ in parser.parse(text)]
+        self.assertEqual(keys, ['ab', 'cd', 'ab', 'ef', 'cd', 'ef'])
+        self.assertIs(keys[0], keys[2])
+        self.assertIs(keys[1], keys[4])
+        self.assertIsNot(keys[3], keys[5])  # beyond `max_size`.
+        self.assertEqual(key.tables.table, {'ab': 'ab', 'cd': 'cd'})
+        parser.parse('gh=1')
+        self.assertEqual(key.tables.table, {'gh': 'gh'})
+
+class ParsecBinaryTest(unittest.TestCase):
+    '''Test the parsers of binary data.'''
+
+    def test_fields(self):
+        data = struct.pack('<BbHhIiQq', 1, -1, 2, -2, 3, -3, 4, -4) + struct.pack('>HiQfd', 5, -5, 6, 0.5, 0.25)
+        parser = joint(u8, i8, u16le, i16le, u32le, i32le, u64le, i64le, u16be, i32be, u64be, f32be, f64be) << eof()
+        self.assertEqual(parser.parse(data), (1, -1, 2, -2, 3, -3, 4, -4, 5, -5, 6, 0.5, 0.25))
+        self.assertEqual(f32le.parse(struct.pack('<f', 1.5)), 1.5)
+        self.assertEqual(struct_fmt('<IHH').parse(bytearray(struct.pack('<IHH', 7, 8, 9))), (7, 8, 9))
+        self.assertEqual(u32be.parse(memoryview(b'\0\0\1\0')), 256)
+        self.assertEqual(u32le(b'\0\0\1', 0), Value.failure(0, '4 bytes'))
+        # other inputs fail rather than raise, so alternatives are tried.
+        self.assertFalse(struct_fmt('<H')('ab', 0).status)
+        self.assertEqual((u8 | string('x')).parse('x'), 'x')
+        self.assertEqual(pickle.loads(pickle.dumps(struct_fmt('>hh'))).parse(b'\0\1\0\2'), (1, 2))
+
+    def test_take(self):
+        data = bytearray(b'abcdef')
+        value, rest = take(4).parse_partial(data)
+        self.assertIsInstance(value, memoryview)
+        self.assertEqual((bytes(value), rest), (b'abcd', b'ef'))
+        data[0:1] = b'A'  # a view of the input, not a copy.
+        self.assertEqual(bytes(value), b'Abcd')
+        del value
+        self.assertEqual(bytes(take().parse(b'abc')), b'abc')
+        self.assertEqual(take(2).parse('abc'), 'ab')
+        self.assertEqual(take(4)(b'abc', 0), Value.failure(0, '4 bytes'))
+        self.assertEqual(take(0).parse(b'abc'), b'')
+        self.assertRaises(ValueError, take, -1)
+
+    def test_length_prefixed(self):
+        frame = length_prefixed(u16be)
+        self.assertEqual(bytes(frame.parse(b'\0\3abc')), b'abc')
+        self.assertEqual(frame(b'\0\4abc', 0), Value.failure(2, '4 bytes'))
+        # the body cannot read past the frame, and fails where it does in the input.
+        records = many(length_prefixed(u8, many(u16le) << eof()))
+        self.assertEqual(records.parse(b'\4\1\0\2\0\2\3\0'), [[1, 2], [3]])
+        self.assertEqual(records.parse_partial(b'\3\1\0\2\0'), ([], b'\3\1\0\2\0'))
+        res = length_prefixed(u8, u32le)(b'\2\1\0\0\0', 0)
+        self.assertEqual((res.status, res.index, res.expected), (False, 1, '4 bytes'))
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(struct.pack('<I', 5) + b'hello\r\n')
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                parser = length_prefixed(u32le) + (take_until(b'\r\n') << string(b'\r\n'))
+                frame, rest = parser.parse(data)
+                self.assertEqual((bytes(frame), bytes(rest)), (b'hello', b''))
+                del frame, rest
+
 class ParsecNumberTest(unittest.TestCase):
     '''Test the implementation of Text.Parsec.Number.'''
 
@@ -493,6 +809,7 @@ class ParsecNumberTest(unittest.TestCase):
         self.assertEqual(parser.parse('1'), 1)
         self.assertEqual(parser.parse('10'), 10)
         self.assertEqual(parser.parse('9999'), 9999)
+        self.assertEqual(parser.parse('9' * 5000), 10 ** 5000 - 1)
 
     def test_binary(self):
         parser = binary
@@ -538,6 +855,508 @@ class ParsecNumberTest(unittest.TestCase):
         self.assertEqual(parser.parse('0x10'), 0x10)
         self.assertEqual(parser.parse('+0x10'), 0x10)
         self.assertEqual(parser.parse('-0x10'), -0x10)
+        self.assertEqual(parser.parse('017'), 17)
+        self.assertEqual(parser.parse_partial('0a'), (0, 'a'))
+        self.assertRaises(ParseError, parser.parse, '0x')
+        self.assertRaises(ParseError, parser.parse, '-')
+
+    def test_floating(self):
+        parser = floating
+        self.assertEqual(parser.parse('0'), 0.0)
+        self.assertEqual(parser.parse('-1.5'), -1.5)
+        self.assertEqual(parser.parse('+2.5e-3'), 2.5e-3)
+        self.assertEqual(parser.parse('1E10'), 1e10)
+        self.assertEqual(parser.parse_partial('1.e'), (1.0, '.e'))
+        self.assertRaises(ParseError, parser.parse, '.5')
+
+    def test_scientific(self):
+        parser = scientific
+        self.assertEqual(parser.parse('0.1'), Decimal('0.1'))
+        self.assertEqual(parser.parse('-1.25e-300'), Decimal('-1.25e-300'))
+        self.assertRaises(ParseError, parser.parse, 'e1')
+
+class ParsecExprTest(unittest.TestCase):
+    '''Test the implementation of Text.Parsec.Expr.'''
+
+    def setUp(self):
+        def token(s):
+            return string(s) << spaces()
+
+        self.expr = forward_declare()
+        term = (regex(r'[0-9]+').parsecmap(int) | (token('(') >> self.expr << token(')'))) << spaces()
+        self.expr.define(build_expression_parser([
+            [Prefix(token('-').result(operator.neg))],
+            [Postfix(token('!').result(lambda x: x * 10))],
+            [Infix(token('^').result(operator.pow), 'right')],
+            [Infix(token('*').result(operator.mul)), Infix(token('/').result(operator.floordiv))],
+            [Infix(token('+').result(operator.add)), Infix(token('-').result(operator.sub))],
+            [Infix(token('==').result(operator.eq), 'none')],
+        ], term))
+
+    def test_precedence(self):
+        parser = self.expr
+        self.assertEqual(parser.parse('1 + 2 * 3'), 7)
+        self.assertEqual(parser.parse('(1 + 2) * 3'), 9)
+        self.assertEqual(parser.parse('2 * 3 ^ 2 + 1'), 19)
+        self.assertEqual(parser.parse('-2 ^ 2'), 4)
+        self.assertEqual(parser.parse('-(1 + 2) * 3'), -9)
+        self.assertEqual(parser.parse('- 2 ! + 1'), -19)
+        self.assertEqual(parser.parse('2!!'), 200)
+        self.assertEqual(parser.parse('1 + 1 == 2'), True)
+
+    def test_associativity(self):
+        parser = self.expr
+        self.assertEqual(parser.parse('10 - 2 - 3'), 5)
+        self.assertEqual(parser.parse('8 / 2 / 2'), 2)
+        self.assertEqual(parser.parse('2 ^ 3 ^ 2'), 512)
+        self.assertEqual(parser.parse_partial('1 == 1 == 1'), (True, '== 1'))
+        self.assertRaises(ValueError, Infix, string('+'), 'both')
+        self.assertRaises(TypeError, build_expression_parser, [[string('+')]], digit())
+
+    def test_failure(self):
+        parser = self.expr
+        self.assertRaises(ParseError, parser.parse, '1 +')
+        self.assertRaises(ParseError, parser.parse, '- +')
+        self.assertEqual(parser.parse_partial('1 ) 2'), (1, ') 2'))
+        self.assertEqual(parser.optimize().parse('1 + 2 * 3'), 7)
+        self.assertEqual(parser.compile().parse('1 + 2 * 3'), 7)
+
+class ParseBudgetTest(unittest.TestCase):
+    '''Test the limits of a parse.'''
+
+    def setUp(self):
+        # exponential on "aaa...": every `^` tries its alternatives again.
+        self.exponential = forward_declare()
+        self.exponential.define((string('a') + self.exponential + string('b'))
+                                ^ (string('a') + self.exponential + string('c'))
+                                ^ string('a'))
+        self.nested = forward_declare()
+        self.nested.define(string('x') | (string('(') >> self.nested << string(')')))
+
+    def test_steps(self):
+        stats = ParseStats()
+        self.assertEqual(self.exponential.parse('aab', stats=stats), (('a', 'a'), 'b'))
+        self.assertGreater(stats.steps, 0)
+        with self.assertRaises(ParseBudgetExceeded) as context:
+            self.exponential.parse('a' * 30, max_steps=10000)
+        error = context.exception
+        self.assertIsInstance(error, ParseError)
+        self.assertEqual(error.limit, 'max_steps')
+        self.assertEqual(error.stats.steps, 10001)
+        self.assertEqual(error.index, error.stats.peak_index)
+
+    def test_depth(self):
+        stats = ParseStats()
+        self.assertEqual(self.nested.parse_strict('((x))', max_depth=3, stats=stats), 'x')
+        self.assertEqual(stats.max_depth, 3)
+        self.assertEqual(stats.peak_index, 5)
+        with self.assertRaises(ParseBudgetExceeded) as context:
+            self.nested.parse('(' * 10 + 'x' + ')' * 10, max_depth=5)
+        self.assertEqual(context.exception.limit, 'max_depth')
+        self.assertEqual(context.exception.index, 5)
+
+    def test_length_and_timeout(self):
+        with self.assertRaises(ParseBudgetExceeded) as context:
+            self.nested.parse('x' * 10, max_length=5)
+        self.assertEqual(context.exception.limit, 'max_length')
+        with self.assertRaises(ParseBudgetExceeded) as context:
+            self.exponential.parse('a' * 30, timeout=0.01)
+        self.assertEqual(context.exception.limit, 'timeout')
+
+    def test_compiled(self):
+        compiled = self.exponential.compile()
+        self.assertEqual(compiled.parse('aab'), (('a', 'a'), 'b'))
+        self.assertRaises(ParseBudgetExceeded, compiled.parse, 'a' * 30, max_steps=10000)
+
+    def test_find_backtracking(self):
+        self.assertEqual(find_backtracking(self.nested, '((x))'), [])
+        exponential = forward_declare()
+        ab = (string('a') + exponential + string('b')).desc('ab')
+        exponential.define(ab ^ (string('a') + exponential + string('c')) ^ string('a'))
+        found = find_backtracking(exponential, 'aaaac')
+        self.assertEqual(found[0].rule, 'ab')
+        self.assertIs(found[0].parser, ab)
+        self.assertEqual(found[0].positions, [(4, 16), (3, 8), (2, 4)])
+        self.assertEqual(found[0].evaluations, 28)
+        self.assertEqual(str(found[0]),
+                         'ab evaluated 28 times at 3 positions: 0:4 (16 times), 0:3 (8 times), 0:2 (4 times)')
+        self.assertEqual(find_backtracking(exponential, 'aaaac', threshold=4)[0].positions, [(4, 16), (3, 8)])
+        # stopped after `max_steps`
+        self.assertEqual(len(find_backtracking(exponential, 'a' * 30 + 'c', max_steps=1000)[0].positions), 6)
+
+        @generate
+        def pair():
+            a = yield letter()
+            b = yield letter()
+            return a + b
+        found = find_backtracking(many((pair + string('!')) ^ (pair + string('?'))), 'ab?cd?', threshold=1)
+        self.assertEqual([(b.rule, b.positions) for b in found], [('pair', [(0, 2), (3, 2)])])
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    '''Test one grammar shared by threads.'''
+
+    def setUp(self):
+        self.value = forward_declare()
+        key = interned(regex(r'[a-z]+'))
+        pair = (key << string(':')) + self.value
+        self.value.define(regex(r'[0-9]+').parsecmap(int)
+                          | (string('{') >> sepBy(pair, string(',')) << string('}')))
+        random.seed(0)
+        self.texts = [self.document(3) for _ in range(40)]
+
+    def document(self, depth):
+        if depth == 0 or random.random() < 0.3:
+            return str(random.randrange(1000))
+        return '{' + ','.join('{}:{}'.format(random.choice(['ab', 'cd', 'ef']), self.document(depth - 1))
+                              for _ in range(random.randint(1, 4))) + '}'
+
+    def keys(self, value):
+        if isinstance(value, int):
+            return []
+        return [k for k, _ in value] + [k for _, v in value for k in self.keys(v)]
+
+    def test_shared(self):
+        for parser in (self.value, self.value.optimize(), self.value.compile()):
+            expected = [parser.parse(text) for text in self.texts]
+            with ThreadPoolExecutor(8) as pool:
+                for _ in range(5):
+                    self.assertEqual(list(pool.map(parser.parse, self.texts)), expected)
+                    for value in pool.map(parser.parse, self.texts):
+                        keys = self.keys(value)
+                        self.assertEqual(len(set(map(id, keys))), len(set(keys)))
+
+    def test_budgets(self):
+        text = max(self.texts, key=len)
+        stats = ParseStats()
+        self.value.parse(text, stats=stats)
+
+        def parse(limit):
+            if limit is None:
+                return self.value.parse(text), None
+            own = ParseStats()
+            return self.value.parse(text, max_steps=limit, stats=own), own.steps
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(parse, [None, stats.steps] * 20))
+        self.assertTrue(all(steps in (None, stats.steps) for _, steps in results))
+        with ThreadPoolExecutor(8) as pool:
+            with self.assertRaises(ParseBudgetExceeded):
+                list(pool.map(parse, [None, stats.steps - 1] * 20))
+
+class ResultCacheTest(unittest.TestCase):
+    '''Test the results remembered across parses.'''
+
+    def setUp(self):
+        self.parser = sepBy(regex(r'[a-z]+'), string(',')).cache_results(max_entries=3)
+
+    def test_hits(self):
+        parser = self.parser
+        first = parser.parse('a,b')
+        self.assertIs(parser.parse('a,b'), first)
+        self.assertEqual(parser.parse_partial('a,b;'), (['a', 'b'], ';'))
+        self.assertEqual(parser.parse_strict('a,b'), ['a', 'b'])
+        self.assertRaises(ParseError, parser.parse_strict, 'a,b;')
+        self.assertEqual((parser.hits, parser.misses), (1, 4))
+        self.assertEqual((len(parser.entries), parser.evictions), (3, 1))
+        # within other parsers, and with limits, nothing is remembered.
+        self.assertEqual((parser << string(';')).parse('c;'), ['c'])
+        self.assertEqual(parser.parse('a,b', max_steps=100), first)
+        self.assertEqual(parser.parse(['a']), [])  # a list of tokens, which `regex` fails on.
+        self.assertEqual((parser.hits, parser.misses), (1, 4))
+
+    def test_failures(self):
+        parser = string('a').cache_results()
+        for _ in range(2):
+            with self.assertRaises(ParseError) as e:
+                parser.parse('b')
+            self.assertEqual((e.exception.text, e.exception.index), ('b', 0))
+        self.assertEqual((parser.hits, parser.misses), (1, 1))
+        parser = string('a').cache_results(failures=False)
+        for _ in range(2):
+            self.assertRaises(ParseError, parser.parse, 'b')
+        self.assertEqual((parser.hits, parser.misses), (0, 2))
+
+    def test_size(self):
+        parser = many(letter()).cache_results(max_bytes=200)
+        parser.parse('a' * 100)
+        parser.parse('b' * 100)
+        self.assertEqual((len(parser.entries), parser.evictions), (1, 1))
+        parser.parse('c' * 1000)
+        self.assertEqual(len(parser.entries), 1)
+        parser.clear()
+        self.assertEqual((len(parser.entries), parser.size, parser.hits), (0, 0, 0))
+
+    def test_threads(self):
+        texts = ['a,b', 'c', 'd,e,f', 'a,b'] * 50
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(self.parser.parse, texts))
+        self.assertEqual(results, [text.split(',') for text in texts])
+        self.assertEqual(self.parser.hits + self.parser.misses, len(texts))
+
+class ParsecOptimizeTest(unittest.TestCase):
+    '''Test the implementation of the grammar optimizer.'''
+
+    texts = ['', 'a', 'b', 'c', 'ab', 'ba', 'abc', 'aab', 'a,b', 'a,b,', 'abab', 'x']
+
+    def assertEquivalent(self, parser):
+        optimized = parser.optimize()
+        for text in self.texts:
+            self.assertEqual(optimized(text, 0), parser(text, 0), text)
+        return optimized
+
+    def test_choice(self):
+        parser = self.assertEquivalent(string('a') | string('ab') | string('b') | string('c'))
+        self.assertIsInstance(parser, Dispatch)
+        self.assertEqual(len(parser.parsers), 4)
+
+        parser = self.assertEquivalent((string('a') | string('b')).desc('ab') | string('c').desc('c'))
+        self.assertIsInstance(parser, Dispatch)
+        self.assertIsInstance(parser.parsers[-1], Desc)
+
+        parser = self.assertEquivalent(fail_with('never') | string('a') | success_with(1) | string('b'))
+        self.assertIsInstance(parser, Dispatch)
+        self.assertEqual(len(parser.parsers), 2)
+
+        parser = self.assertEquivalent(any() | none_of('a') | none_of('b'))
+        self.assertIsInstance(parser, Choice)
+        self.assertEqual(len(parser.parsers), 3)
+
+    def test_try_choice(self):
+        parser = self.assertEquivalent(try_choices(string('ab'), string('a'), string('b'), string('abc')))
+        self.assertIsInstance(parser, Dispatch)
+        self.assertEqual(len(parser.parsers), 4)
+
+        self.assertEquivalent((string('ab') | string('a')) ^ string('aab'))
+
+    def test_expression(self):
+        # after a term matching nothing, an infix operator is the first input.
+        term = optional(regex(r'\d+').parsecmap(int), 0)
+        expr = build_expression_parser([[Infix(string('+').result(operator.add))],
+                                        [Postfix(string('!').result(operator.neg))]], term)
+        parser = (expr + string(';')) | string('+z') | string('!z')
+        for text in ['+1;', '!;', '1+2!;', '+z', ';']:
+            self.assertEqual(parser.optimize()(text, 0), parser(text, 0), text)
+            self.assertEqual(parser.compile()(text, 0), parser(text, 0), text)
+        self.assertEqual(parser.optimize().parse('+1;'), (1, ';'))
+        self.assertEqual(parser.compile().parse('+1;'), (1, ';'))
+
+    def test_dispatch(self):
+        alternatives = [
+            string('ab'), regex(r'[0-9]+|c'), letter(), optional(string('b')), eof(),
+            one_of('ab') + string(','), regex(r'\s*x'), many1(none_of('a')), string('a').desc('A'),
+            lookahead(digit()), lookahead(string('b')) >> string('b,'),
+        ]
+        for i in range(len(alternatives)):
+            for j in range(i + 1, len(alternatives)):
+                parsers = alternatives[i:j + 1]
+                self.assertEquivalent(reduce(choice, parsers))
+                self.assertEquivalent(reduce(try_choice, parsers))
+
+        parser = self.assertEquivalent(letter() | digit() | string(','))
+        self.assertIsInstance(parser, Dispatch)
+        self.assertEqual(parser.parse('\u00e9'), '\u00e9')
+        self.assertEqual(parser.parse('\u0663'), '\u0663')
+        self.assertEqual(parser.parse(['a']), 'a')
+        self.assertRaises(ParseError, parser.parse, '.')
+
+    def test_joint(self):
+        parser = self.assertEquivalent(string('a') + string('b') + (string('c') + string('a')))
+        self.assertIsInstance(parser, Sequence)
+        self.assertEqual(len(parser.parsers), 4)
+        self.assertEqual(parser.parse('abca'), (('a', 'b'), ('c', 'a')))
+
+        self.assertEquivalent(joint(string('a'), string('b')) + joint(string('c')))
+
+    def test_compose(self):
+        parser = self.assertEquivalent(string('a') >> string('b') >> string('c'))
+        self.assertIsInstance(parser, Compose)
+        self.assertEqual(len(parser.parsers), 3)
+
+        parser = self.assertEquivalent(string('a').result(1) >> string('b').result(2))
+        self.assertIsInstance(parser, Result)
+        self.assertIsInstance(parser.parser, Compose)
+
+        self.assertEquivalent(success_with(0) >> string('a') >> fail_with('stop') >> string('b'))
+
+    def test_desc(self):
+        parser = self.assertEquivalent(desc(desc(string('a'), 'inner'), 'outer'))
+        self.assertIsInstance(parser, Desc)
+        self.assertIsInstance(parser.parser, Literal)
+        self.assertEqual(parser.description, 'outer')
+
+        @generate('a generated parser')
+        def fn():
+            yield string('a')
+            return string('b')
+
+        parser = self.assertEquivalent(fn)
+        self.assertIsInstance(parser, Desc)
+        self.assertIsInstance(parser.parser, Generate)
+
+    def test_parsecmap(self):
+        parser = self.assertEquivalent(many(letter()).parsecmap(len).parsecmap(str))
+        self.assertIsInstance(parser.parser, Times)
+
+        self.assertEquivalent((string('a') + string('b')).parsecmap(lambda x, y: y + x, star=True).parsecmap(len))
+
+    def test_nested(self):
+        self.assertEquivalent(sepBy(string('a') | string('b'), string(',')) << eof())
+        self.assertEquivalent(times(string('a') ^ string('ab'), 1, 3) + optional(string('c') | string('b')))
+
+    def test_long_chain(self):
+        keywords = ['kw{};'.format(i) for i in range(3000)]
+        parser = reduce(try_choice, [string(keyword) for keyword in keywords]).optimize()
+        self.assertIsInstance(parser, Dispatch)
+        self.assertEqual(len(parser.parsers), 3000)
+        self.assertEqual(parser.parse('kw2999;'), 'kw2999;')
+
+    def test_opaque(self):
+        parser = Parser(lambda text, index: Value.success(index, None))
+        self.assertIs(parser.optimize(), parser)
+
+        parser = many(letter())
+        self.assertIs(parser.optimize(), parser)
+
+class Opaque(Parser):
+    '''A parser defined outside of parsec, which is not shared.'''
+
+class ParserGraphTest(unittest.TestCase):
+    '''Test the inspection and rebuilding of combinator graphs.'''
+
+    def test_children(self):
+        a, b, c = string('a'), string('b'), string('c')
+        self.assertEqual((a + b).children, (a, b))
+        self.assertEqual(separated(a, b, 1, 2).children, (a, b))
+        self.assertEqual(separated(a, b, 1, 2).args, (a, b, 1, 2, None, None))
+        self.assertEqual(between(a, b, c).parser.children, (a, b, c))
+        self.assertEqual(a.children, ())
+        self.assertEqual(a.args, ('a',))
+
+    def test_with_children(self):
+        a, b, c = string('a'), string('b'), string('c')
+        parser = times(a, 1, 3)
+        self.assertIs(parser.with_children((a,)), parser)
+        rebuilt = parser.with_children((b,))
+        self.assertIsInstance(rebuilt, Times)
+        self.assertEqual(rebuilt.args, (b, 1, 3, None))
+        self.assertEqual(rebuilt.parse('bbbb'), ['b', 'b', 'b'])
+        self.assertEqual((a | b).with_children((c, b)).parse('c'), 'c')
+
+    def test_repr(self):
+        self.assertEqual(repr(string('a') >> one_of('bc')), "Compose((Literal('a'), OneOf('bc')))")
+
+    def test_walk(self):
+        a, b = string('a'), string('b')
+        shared = a | b
+        parser = shared + many(shared) + a
+        nodes = list(walk(parser))
+        self.assertIs(nodes[0], parser)
+        self.assertEqual(len(nodes), len(set(map(id, nodes))))
+        self.assertEqual(sum(isinstance(p, Literal) for p in nodes), 2)
+        self.assertEqual(sum(isinstance(p, Choice) for p in nodes), 1)
+
+    def test_transform(self):
+        shared = string('a') | string('b')
+        parser = shared + many(shared)
+
+        def upper(p):
+            return string(p.s.upper()) if isinstance(p, Literal) else p
+
+        transformed = transform(parser, upper)
+        self.assertEqual(transformed.parse('ABA'), ('A', ['B', 'A']))
+        self.assertRaises(ParseError, transformed.parse, 'a')
+        self.assertIs(transformed.parsers[0], transformed.parsers[1].parser)
+        self.assertIs(transform(parser, lambda p: p), parser)
+
+    def test_shared(self):
+        self.assertIs(string('('), string('('))
+        self.assertIs(spaces(), spaces())
+        self.assertIs(regex(r'\s*'), regex(r'\s*'))
+        self.assertIs(string('a') | digit(), string('a') | digit())
+        self.assertIs(many(letter(), sink=len), many(letter(), sink=len))
+        self.assertIsNot(string(1), string(True))
+        self.assertIsNot(success_with(0.0), success_with(-0.0))
+        self.assertIsNot(string(['a']), string(['a']))
+        self.assertIsNot(forward_declare(), forward_declare())
+        self.assertIsNot(Opaque(len), Opaque(len))
+        # the parsers are only shared while they are in use.
+        shared = weakref.ref(string('unused'))
+        gc.collect()
+        self.assertIsNone(shared())
+
+    def test_not_shared_while_parsing(self):
+        same = []
+
+        @generate
+        def built():
+            yield string('a')
+            same.append(string('b') is string('b'))
+
+        def mapped(value):
+            same.append(string('b') is string('b'))
+            return value
+
+        built.parse('a')
+        built.compile().parse('a')
+        (built < eof()).parse_strict('a')
+        string('a').parsecmap(mapped).parse('a')
+        self.assertEqual(same, [False, False, False, True])
+        # nor at all, once the parses building parsers are over.
+        self.assertIs(string('b'), string('b'))
+
+class GrammarAnalysisTest(unittest.TestCase):
+    '''Test the static analysis of grammars.'''
+
+    def assertKinds(self, parser, kinds):
+        warnings = parser.analyze()
+        self.assertEqual([w.kind for w in warnings], kinds)
+        return warnings
+
+    def test_left_recursion(self):
+        term = regex(r'[0-9]+').desc('term')
+        expr = forward_declare()
+        expr.define(((expr + string('+') + term).desc('sum') | term).desc('expr'))
+        warning, = self.assertKinds(expr, ['left-recursion'])
+        self.assertEqual(warning.message, 'left recursion through expr -> sum -> expr')
+        self.assertIn(expr, warning.parsers)
+
+        a, b = forward_declare(), forward_declare()
+        a.define((optional(spaces()) >> b) | string('y'))
+        b.define(a + string('z'))
+        self.assertKinds(a, ['left-recursion'])
+        b = forward_declare()
+        b.define(string('(') >> many(b) << string(')'))
+        self.assertKinds(b, [])
+        # a lookahead consumes no input, whatever it looks at.
+        c = forward_declare()
+        c.define((lookahead(string('x')) >> c) | string('y'))
+        self.assertKinds(c, ['left-recursion'])
+
+    def test_nullable_repetition(self):
+        self.assertKinds(many(optional(string('a'))), ['nullable-repetition'])
+        self.assertKinds(many(string('a')), [])
+        self.assertKinds(times(optional(string('a')), 0, 3), [])
+        self.assertKinds(sepBy(optional(string('a')), spaces()), ['nullable-repetition'])
+        self.assertKinds(sepBy(optional(string('a')), string(',')), [])
+        self.assertKinds(TakeWhile(optional(string('a'))), ['nullable-repetition'])
+        self.assertKinds(many(lookahead(string('a'))), ['nullable-repetition'])
+        self.assertKinds(many(lookahead(string('a')) >> string('a')), [])
+
+    def test_shadowed_alternative(self):
+        warnings = self.assertKinds(string('a') | string('ab') | optional(string('c')) | string('d'),
+                                    ['shadowed-alternative', 'shadowed-alternative'])
+        self.assertEqual(warnings[0].message, "Literal('ab') is shadowed by Literal('a')")
+        self.assertEqual(warnings[1].parsers[1].s, 'd')
+        self.assertKinds(one_of('abc') ^ string('b').result(1) ^ letter() ^ one_of('ab'),
+                         ['shadowed-alternative', 'shadowed-alternative'])
+        self.assertKinds(string('ab') | string('a') | one_of('ab'), [])
+        self.assertKinds(letter() | digit(), [])
+
+    def test_examples(self):
+        from parsec.contrib.json import value
+        self.assertKinds(value(comments=True, trailing_commas=True), [])
+        self.assertKinds((string('a') | string('b')).optimize(), [])
 
 class ParserGeneratorTest(unittest.TestCase):
     '''Test the implementation of Parser Generator.(generate)'''